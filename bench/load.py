@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import math
+import time
+
+READ_SIZE = 1024 * 1024 # Bodies are read and discarded in pieces of this size
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _discard(reader: asyncio.StreamReader, length: int, on_data) -> int:
+    remaining = length
+    while remaining:
+        data = await reader.read(min(READ_SIZE, remaining))
+        if not data:
+            raise ConnectionError("connection closed mid-body")
+        remaining -= len(data)
+        on_data(len(data))
+    return length
+
+
+async def _read_response(reader: asyncio.StreamReader, method: str, on_data) -> tuple[int, int, bool]:
+    """Reads one response, calling on_data(n) as body bytes arrive; returns (status, body bytes, connection reusable)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ", 2)[:2]
+    status = int(status)
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if method == "HEAD" or status in (204, 304) or status < 200:
+        return status, 0, keep_alive
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()).strip():
+                    pass
+                return status, total, keep_alive
+            total += await _discard(reader, size, on_data)
+            await reader.readexactly(2)
+    if "content-length" in headers:
+        return status, await _discard(reader, int(headers["content-length"]), on_data), keep_alive
+    total = 0 # Body ends when the server closes the connection
+    while True:
+        data = await reader.read(READ_SIZE)
+        if not data:
+            return status, total, False
+        total += len(data)
+        on_data(len(data))
+
+
+class _Stats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.requests = 0
+        self.bytes = 0 # Counted as they arrive, so long downloads cut off by the deadline still count
+        self.errors = 0 # Connection failures and 4xx/5xx responses
+        self.statuses: dict[int, int] = {}
+
+
+async def _client(host: str, port: int, paths, headers: str, measure_from: float, deadline: float, stats: _Stats):
+    def on_data(n: int):
+        if time.perf_counter() >= measure_from:
+            stats.bytes += n
+
+    reader = writer = None
+    try:
+        while time.perf_counter() < deadline:
+            path = next(paths)
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port, limit=256 * 1024)
+                started = time.perf_counter()
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{headers}\r\n".encode("latin-1"))
+                status, nbytes, keep_alive = await _read_response(reader, "GET", on_data)
+                finished = time.perf_counter()
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                if time.perf_counter() >= measure_from:
+                    stats.errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                await asyncio.sleep(0.01)
+                continue
+            if started >= measure_from: # Requests issued during warm-up are not counted
+                stats.latencies.append(finished - started)
+                stats.requests += 1
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+                if status >= 400:
+                    stats.errors += 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _run(host, port, paths, concurrency, duration, warmup, headers):
+    stats = _Stats()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    clients = []
+    for i in range(concurrency):
+        offset = (i * 7919) % len(paths) # Clients walk the same paths from different starting points
+        clients.append(asyncio.ensure_future(_client(host, port, itertools.cycle(paths[offset:] + paths[:offset]), headers, measure_from, deadline, stats)))
+    await asyncio.wait(clients, timeout=deadline - time.perf_counter())
+    for client in clients:
+        client.cancel() # Responses still in flight at the deadline count only for the bytes received
+    await asyncio.gather(*clients, return_exceptions=True)
+    return stats
+
+
+def run_load(host: str, port: int, paths: list[str], concurrency: int, duration: float, warmup: float = 1.0, headers: dict | None = None) -> dict:
+    """Drives the server with `concurrency` keep-alive clients looping over paths; returns a summary."""
+    header_text = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    stats = asyncio.run(_run(host, port, paths, concurrency, duration, warmup, header_text))
+    latencies = sorted(stats.latencies)
+    return {
+        "requests": stats.requests,
+        "errors": stats.errors,
+        "statuses": {str(k): v for k, v in sorted(stats.statuses.items())},
+        "requests_per_s": stats.requests / duration,
+        "mb_per_s": stats.bytes / duration / 1_000_000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
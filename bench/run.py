@@ -0,0 +1,242 @@
+"""Benchmark runner: starts the server through ServerManager for each scenario and drives it.
+
+    python -m bench.run                         # all scenarios, results table
+    python -m bench.run -s small_files -d 5     # one scenario, 5 s measurement
+    python -m bench.run --save-baseline main    # store results in bench/baselines/main.json
+    python -m bench.run --compare main          # compare against a stored baseline, exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import psutil
+
+import config
+from bench.load import run_load
+from bench.scenarios import SCENARIOS
+from core.server_manager import ServerManager
+
+SEED = 1729 # Fixtures and blocklists are identical from run to run
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+READY_TIMEOUT_S = 60.0
+SAMPLE_INTERVAL_S = 0.25
+COMPARED_METRICS = ( # (key, higher is better)
+    ("requests_per_s", True),
+    ("mb_per_s", True),
+    ("p50_ms", False),
+    ("p99_ms", False),
+)
+
+
+class ResourceSampler(threading.Thread):
+    """Samples RSS and CPU time of the server processes and their children during the measured window."""
+
+    def __init__(self, pids: list[int], warmup: float):
+        super().__init__(daemon=True)
+        self._roots = [psutil.Process(pid) for pid in pids]
+        self._warmup = warmup
+        self._stop_event = threading.Event()
+        self.peak_rss = 0
+        self.cpu_percent = 0.0
+
+    def _processes(self):
+        processes = []
+        for root in self._roots:
+            try:
+                processes += [root] + root.children(recursive=True)
+            except psutil.Error:
+                pass
+        return processes
+
+    def _cpu_seconds(self) -> float:
+        total = 0.0
+        for process in self._processes():
+            try:
+                times = process.cpu_times()
+                total += times.user + times.system
+            except psutil.Error:
+                pass
+        return total
+
+    def run(self):
+        if self._stop_event.wait(self._warmup):
+            return
+        cpu_start, started = self._cpu_seconds(), time.perf_counter()
+        while not self._stop_event.wait(SAMPLE_INTERVAL_S):
+            rss = 0
+            for process in self._processes():
+                try:
+                    rss += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            self.peak_rss = max(self.peak_rss, rss)
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            self.cpu_percent = (self._cpu_seconds() - cpu_start) / elapsed * 100
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def port_in_use(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.5)
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def run_scenario(scenario, engine: str, workers: int, processes: int, duration: float, warmup: float) -> dict:
+    rng = random.Random(SEED)
+    folder = Path(tempfile.mkdtemp(prefix=f"hfs-bench-{scenario.name}-"))
+    server_log = deque(maxlen=50) # Shown only if the server fails to start
+    manager = ServerManager(folder, log_callback=server_log.append, engine=engine, worker_threads=workers, processes=processes)
+    try:
+        paths = scenario.build(folder, rng)
+        for route in config.RATE_LIMITS:
+            manager.set_rate_limit(route, 0, 1) # The load would otherwise be measured against 429s
+        if not manager.start() or not manager.wait_ready(READY_TIMEOUT_S):
+            manager.process_log_queue()
+            raise RuntimeError("server did not become ready:\n" + "\n".join(server_log))
+        if scenario.blocklist is not None:
+            manager.push_blocklist(scenario.blocklist(rng))
+            time.sleep(1.0) # Applied asynchronously by the server's control thread
+        sampler = ResourceSampler(manager.get_pids(), warmup)
+        sampler.start()
+        try:
+            result = run_load("127.0.0.1", config.SERVER_PORT, paths, scenario.concurrency, duration, warmup, scenario.headers)
+        finally:
+            sampler.stop()
+        result["server_rss_mb"] = sampler.peak_rss / 1_000_000
+        result["server_cpu_percent"] = sampler.cpu_percent
+        result["concurrency"] = scenario.concurrency
+        return result
+    finally:
+        manager.shutdown()
+        manager.process_log_queue()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def environment(engine: str, workers: int, processes: int, duration: float, warmup: float) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=config.BASE_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "engine": engine,
+        "workers": workers,
+        "processes": processes,
+        "duration_s": duration,
+        "warmup_s": warmup,
+        "seed": SEED,
+    }
+
+
+def print_results(results: dict):
+    header = f"{'scenario':<16} {'req/s':>10} {'MB/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>8} {'CPU %':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<16} {r['requests_per_s']:>10.1f} {r['mb_per_s']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['errors']:>7} {r['server_rss_mb']:>8.1f} {r['server_cpu_percent']:>7.0f}")
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> int:
+    """Prints current vs baseline per metric; returns the number of regressions beyond threshold."""
+    meta = baseline.get("environment", {})
+    print(f"\nCompared with baseline from {meta.get('timestamp', '?')} (commit {meta.get('commit') or '?'}, engine {meta.get('engine', '?')}):")
+    regressions = 0
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            print(f"  {name}: not in baseline")
+            continue
+        for key, higher_is_better in COMPARED_METRICS:
+            if key.endswith("_ms") and not (previous.get("requests") and current["requests"]):
+                continue # No completed request on one side: there is no latency to compare
+            old, new = previous.get(key, 0.0), current[key]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif -worse > threshold:
+                flag = "  improved"
+            print(f"  {name:<16} {key:<15} {old:>10.2f} -> {new:>10.2f} ({change:+6.1f}%){flag}")
+    print(f"{regressions} regression(s) beyond {threshold:g}%.")
+    return regressions
+
+
+def main(argv=None) -> int:
+    names = [scenario.name for scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Load-test the file server and compare against baselines.")
+    parser.add_argument("-s", "--scenario", action="append", choices=names, help="scenario to run (repeatable; default all)")
+    parser.add_argument("-e", "--engine", default=config.SERVER_ENGINE, choices=config.SERVER_ENGINES)
+    parser.add_argument("-w", "--workers", type=int, default=config.SERVER_WORKER_THREADS, help="server worker threads")
+    parser.add_argument("-p", "--processes", type=int, default=config.SERVER_PROCESSES, help="server processes")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each measurement")
+    parser.add_argument("--save-baseline", metavar="NAME", help="store the results as bench/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare against bench/baselines/NAME.json")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default 10)")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name:<16} {scenario.description} (concurrency {scenario.concurrency})")
+        return 0
+    baseline = None
+    if args.compare:
+        try:
+            with open(BASELINE_DIR / f"{args.compare}.json", "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline {args.compare}: {e}", file=sys.stderr)
+            return 2
+    if port_in_use(config.SERVER_PORT):
+        print(f"Error: port {config.SERVER_PORT} is in use; stop the running server first.", file=sys.stderr)
+        return 2
+
+    results = {}
+    for scenario in SCENARIOS:
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        print(f"Running {scenario.name}: {scenario.description}...", file=sys.stderr)
+        try:
+            results[scenario.name] = run_scenario(scenario, args.engine, args.workers, args.processes, args.duration, args.warmup)
+        except Exception as e:
+            print(f"Error in scenario {scenario.name}: {e}", file=sys.stderr)
+    if not results:
+        return 2
+    print_results(results)
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(args.engine, args.workers, args.processes, args.duration, args.warmup), "results": results}, f, indent=2)
+        print(f"Baseline saved to {path}", file=sys.stderr)
+    if baseline is not None and compare(baseline, results, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import ipaddress
+import random
+from pathlib import Path
+from typing import Callable, NamedTuple
+from urllib.parse import quote
+
+
+class Scenario(NamedTuple):
+    name: str
+    description: str
+    build: Callable[[Path, random.Random], list[str]] # Fills the served folder, returns the paths to request
+    concurrency: int
+    blocklist: Callable[[random.Random], list[str]] | None = None # Entries pushed to the server before the run
+    headers: dict | None = None
+
+
+def _write_files(folder: Path, names, sizes) -> list[str]:
+    for name, size in zip(names, sizes):
+        with open(folder / name, "wb") as f:
+            f.write(b"x" * size)
+    return list(names)
+
+
+def listing(count: int):
+    def build(folder: Path, rng: random.Random) -> list[str]:
+        _write_files(folder, [f"file_{i:06d}.txt" for i in range(count)], [0] * count)
+        return ["/"]
+    return build
+
+
+def small_files(folder: Path, rng: random.Random) -> list[str]:
+    names = [f"small_{i:05d}.bin" for i in range(2000)]
+    _write_files(folder, names, [rng.randint(512, 16 * 1024) for _ in names])
+    rng.shuffle(names)
+    return [f"/open/{quote(name)}" for name in names]
+
+
+def large_file(folder: Path, rng: random.Random) -> list[str]:
+    with open(folder / "large.bin", "wb") as f:
+        f.truncate(256 * 1024 * 1024) # Sparse: measures the serving path, not the disk
+    return ["/download/large.bin"]
+
+
+def single_small_file(folder: Path, rng: random.Random) -> list[str]:
+    _write_files(folder, ["small.txt"], [4096])
+    return ["/open/small.txt"]
+
+
+def blocklist(count: int):
+    """Random IPv4/IPv6 addresses and CIDR ranges that never cover the loopback client."""
+    def entries(rng: random.Random) -> list[str]:
+        result = []
+        for i in range(count):
+            if i % 4 == 3:
+                result.append(str(ipaddress.IPv6Address((0x20010db8 << 96) | rng.getrandbits(96))))
+            elif i % 4 == 2:
+                result.append(f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/24")
+            else:
+                result.append(f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}")
+        return result
+    return entries
+
+
+SCENARIOS = [
+    Scenario("listing_10", "Listing page of a folder with 10 files", listing(10), concurrency=16),
+    Scenario("listing_10k", "Listing page of a folder with 10,000 files", listing(10_000), concurrency=4),
+    Scenario("listing_100k", "Listing page of a folder with 100,000 files", listing(100_000), concurrency=2),
+    Scenario("small_files", "Storm of requests for 2,000 files of 0.5-16 KiB", small_files, concurrency=32),
+    Scenario("large_download", "Repeated downloads of a 256 MiB file", large_file, concurrency=4),
+    Scenario("blocklist_10", "Small file requests with 10 blocklist entries", single_small_file, concurrency=16, blocklist=blocklist(10)),
+    Scenario("blocklist_100k", "Small file requests with 100,000 blocklist entries", single_small_file, concurrency=16, blocklist=blocklist(100_000)),
+    Scenario("many_clients", "500 concurrent keep-alive clients fetching small files", small_files, concurrency=500),
+]
@@ -0,0 +1,121 @@
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import quote
+
+
+class AccessRecord(NamedTuple):
+    ts: float
+    ip: str
+    route: str # Flask endpoint name, '-' when no route matched
+    path: str # URL-quoted request path
+    status: int
+    bytes: int # Response Content-Length, 0 when streamed without a known length
+    duration_ms: float # Time until the response was ready to send
+
+
+def format_record(record: AccessRecord) -> str:
+    """Formats a record as one tab-separated line."""
+    return f"{record.ts:.3f}\t{record.ip}\t{record.route}\t{record.path}\t{record.status}\t{record.bytes}\t{record.duration_ms:.1f}\n"
+
+
+def rotated_paths(log_path: Path, backup_count: int) -> list[Path]:
+    return [log_path.with_name(f"{log_path.name}.{i}") for i in range(1, backup_count + 1)]
+
+
+class AccessLogWriter:
+    """Buffers access records in memory and writes them in batches from a background thread.
+
+    Several server processes may append to the same log: whichever finds it over max_bytes
+    rotates it, and the others notice the new file and reopen it.
+    """
+
+    def __init__(self, log_path: Path, max_bytes: int, backup_count: int, flush_interval: float = 0.5, batch_size: int = 512):
+        self.log_path = Path(log_path)
+        self.max_bytes = max_bytes # Rotate once the file grows past this size
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                self._thread.start()
+
+    def log(self, ip: str, route: str, path: str, status: int, nbytes: int | None, duration_ms: float):
+        """Queues one record; never blocks on disk I/O."""
+        if self._thread is None:
+            self.start()
+        self._queue.put(AccessRecord(time.time(), ip, route, quote(path, safe="/"), status, nbytes or 0, duration_ms))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until every record queued so far is on disk (e.g. before the process exits)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done) # Marker: the writer sets it after writing what came before it
+        return done.wait(timeout)
+
+    def _rotated_elsewhere(self, f) -> bool:
+        """True if the log path no longer names the file we have open (another process rotated it)."""
+        try:
+            return os.fstat(f.fileno()).st_ino != os.stat(self.log_path).st_ino
+        except OSError:
+            return True
+
+    def _rotate(self, f):
+        if self._rotated_elsewhere(f):
+            f.close()
+            return open(self.log_path, "a", encoding="utf-8", newline="\n")
+        f.close()
+        backups = rotated_paths(self.log_path, self.backup_count)
+        try:
+            if backups:
+                for older, newer in zip(reversed(backups), reversed([self.log_path] + backups[:-1])):
+                    if newer.exists():
+                        os.replace(newer, older) # log -> log.1 -> log.2 ...
+            else:
+                self.log_path.unlink()
+        except OSError as e:
+            print(f"Error rotating access log {self.log_path}: {e}", file=sys.stderr)
+        return open(self.log_path, "a", encoding="utf-8", newline="\n")
+
+    def _run(self):
+        try:
+            f = open(self.log_path, "a", encoding="utf-8", newline="\n")
+        except OSError as e:
+            print(f"Error opening access log {self.log_path}: {e}", file=sys.stderr)
+            return
+        while True:
+            batch = [self._queue.get()] # Sleep until there is something to write
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            flushed = batch.pop() if isinstance(batch[-1], threading.Event) else None
+            try:
+                f.write("".join(format_record(record) for record in batch))
+                f.flush()
+                if f.tell() >= self.max_bytes:
+                    f = self._rotate(f)
+                elif self._rotated_elsewhere(f):
+                    f.close()
+                    f = open(self.log_path, "a", encoding="utf-8", newline="\n")
+            except Exception as e:
+                print(f"Error writing to access log {self.log_path}: {e}", file=sys.stderr)
+            if flushed is not None:
+                flushed.set()
+
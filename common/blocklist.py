@@ -0,0 +1,113 @@
+import bisect
+import ipaddress
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def _merge_intervals(intervals: list[tuple[int, int]]) -> tuple[list[int], list[int]]:
+    """Sorts and merges overlapping (start, end) intervals into two parallel lists."""
+    starts: list[int] = []
+    ends: list[int] = []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end # Extend the previous range
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def compile_entries(entries) -> tuple[tuple[list[int], list[int]], tuple[list[int], list[int]]]:
+    """Compiles IP / CIDR strings into sorted interval tables for IPv4 and IPv6."""
+    v4: list[tuple[int, int]] = []
+    v6: list[tuple[int, int]] = []
+    for raw in entries:
+        entry = raw.strip()
+        if not entry or entry.startswith('#'):
+            continue
+        try:
+            network = ipaddress.ip_network(entry, strict=False) # Accepts single IPs and CIDR ranges
+        except ValueError:
+            print(f"Warning: Ignoring invalid blocklist entry: {entry}", file=sys.stderr)
+            continue
+        interval = (int(network.network_address), int(network.broadcast_address))
+        if network.version == 4:
+            v4.append(interval)
+        else:
+            v6.append(interval)
+    return _merge_intervals(v4), _merge_intervals(v6)
+
+
+class Blocklist:
+    """In-memory compiled blocklist that reloads itself only when the file changes."""
+
+    def __init__(self, block_file_path: Path, recheck_interval: float = 1.0):
+        self._block_file_path = block_file_path
+        self._recheck_interval = recheck_interval # Seconds between stat() checks of the file
+        self._tables = (([], []), ([], [])) # (IPv4 starts/ends, IPv6 starts/ends), swapped atomically
+        self._signature = None # (mtime_ns, size, inode) of the file the tables were built from
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.entry_count = 0
+        self.reload(force=True)
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self._block_file_path)
+        except OSError:
+            return None # Missing file behaves like an empty blocklist
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompiles the blocklist if the file changed (or always when force=True)."""
+        with self._lock:
+            self._next_check = time.monotonic() + self._recheck_interval
+            signature = self._file_signature()
+            if not force and signature == self._signature:
+                return False
+            entries = []
+            if signature is not None:
+                try:
+                    with open(self._block_file_path, "r", encoding="utf-8") as f:
+                        entries = f.readlines()
+                except Exception as e:
+                    print(f"Error reading blocklist file {self._block_file_path}: {e}", file=sys.stderr)
+                    return False # Keep the previous tables
+            self._install(entries)
+            self._signature = signature
+            return True
+
+    def load_entries(self, entries):
+        """Replaces the compiled tables directly (e.g. entries pushed from the GUI)."""
+        with self._lock:
+            self._install(entries)
+            self._signature = self._file_signature()
+            self._next_check = time.monotonic() + self._recheck_interval
+
+    def _install(self, entries):
+        tables = compile_entries(entries)
+        self._tables = tables
+        self.entry_count = len(tables[0][0]) + len(tables[1][0])
+
+    def contains(self, ip_address: str) -> bool:
+        """Returns True if the address falls inside any blocked IP or CIDR range."""
+        if time.monotonic() >= self._next_check:
+            self.reload()
+        try:
+            address = ipaddress.ip_address(ip_address.split('%', 1)[0]) # Drop IPv6 zone id
+        except (ValueError, AttributeError):
+            return False
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped # ::ffff:a.b.c.d is checked against the IPv4 table
+        v4, v6 = self._tables
+        starts, ends = v4 if address.version == 4 else v6
+        value = int(address)
+        i = bisect.bisect_right(starts, value) - 1
+        return i >= 0 and value <= ends[i]
+
+    def __contains__(self, ip_address: str) -> bool:
+        return self.contains(ip_address)
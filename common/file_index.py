@@ -0,0 +1,356 @@
+import os
+import posixpath
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError: # watchdog is optional, the index falls back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+MTIME_SETTLE_NS = 2_000_000_000 # Folder mtimes this recent may still change within the same tick (FAT: 2 s), so they are checked again
+
+
+class FileEntry(NamedTuple):
+    name: str
+    rel_path: str # POSIX-style path relative to the index root
+    size: int
+    mtime_ns: int
+    is_dir: bool
+    inode: int = 0
+
+
+def normalize_rel_path(filename: str) -> str | None:
+    """Normalizes a URL path to an index key, or returns None if it escapes the root."""
+    if os.sep == '\\':
+        filename = filename.replace('\\', '/') # Windows separators could otherwise smuggle in '..'
+    rel = posixpath.normpath(filename)
+    if rel in ('', '.'):
+        return ''
+    if rel.startswith('/') or rel == '..' or rel.startswith('../'):
+        return None
+    return rel
+
+
+class _WatchHandler(FileSystemEventHandler):
+    """Forwards watchdog events to the owning FileIndex."""
+
+    def __init__(self, file_index: "FileIndex"):
+        super().__init__()
+        self._file_index = file_index
+
+    def on_any_event(self, event):
+        self._file_index.refresh_path(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self._file_index.refresh_path(dest_path)
+
+
+class FileIndex:
+    """In-process index of a served directory tree, kept current in the background.
+
+    Changes are applied per path: a watcher event re-stats the one path it names, and
+    without a watcher each poll stats the indexed folders and re-lists only those whose
+    mtime changed. A full rescan every resync_interval catches what neither shows, such as
+    a file rewritten in place.
+    """
+
+    def __init__(self, root: Path, poll_interval: float = 2.0, resync_interval: float = 60.0, excluded_names=()):
+        self.root = Path(root).resolve()
+        self._root_str = str(self.root)
+        self._poll_interval = poll_interval # Folder mtime check period when no watcher is available
+        self._resync_interval = resync_interval # Full rescan period, with or without a watcher
+        self._excluded_names = frozenset(excluded_names) # Top-level names never indexed (e.g. staging dirs)
+        self._entries: dict[str, FileEntry] = {}
+        self._children: dict[str, dict[str, FileEntry]] = {'': {}} # Updated in place; readers only copy values out
+        self._dir_mtimes: dict[str, int | None] = {} # Folder -> mtime seen before it was listed (None: too recent to trust)
+        self._listing_cache: dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+        self._listeners = []
+        self.generation = 0 # Bumped on every change to the indexed tree
+        self.last_changed = time.time() # Wall-clock time of the last generation bump
+
+    def start(self):
+        """Builds the index and keeps it current in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+            except Exception as e:
+                print(f"Error stopping file watcher: {e}", file=sys.stderr)
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def add_listener(self, callback):
+        """Registers callback(changed_entries, removed_paths), called after every index change."""
+        self._listeners.append(callback)
+
+    def _run(self):
+        self.rescan()
+        self._ready.set()
+        if self._stop_event.is_set():
+            return # Stopped during the first scan (e.g. a mount removed right away): never start the watcher
+        interval = self._poll_interval
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WatchHandler(self), self._root_str, recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+                interval = self._resync_interval
+                print(f"Watching {self.root} for changes.", file=sys.stderr)
+            except Exception as e:
+                print(f"File watcher unavailable ({e}), falling back to polling every {self._poll_interval}s.", file=sys.stderr)
+                self._observer = None
+        next_resync = time.monotonic() + self._resync_interval
+        while not self._stop_event.wait(interval):
+            try:
+                if self._observer is None and time.monotonic() < next_resync:
+                    self.poll()
+                else:
+                    self.rescan()
+                    next_resync = time.monotonic() + self._resync_interval
+            except Exception as e:
+                print(f"Error rescanning {self.root}: {e}", file=sys.stderr)
+
+    def _abs_path(self, rel_path: str) -> str:
+        return os.path.join(self._root_str, rel_path) if rel_path else self._root_str
+
+    @staticmethod
+    def _settled(mtime_ns: int) -> int | None:
+        return mtime_ns if time.time_ns() - mtime_ns >= MTIME_SETTLE_NS else None
+
+    def _scan_tree(self, rel_dir: str, mtime_ns: int, out: dict[str, FileEntry], dir_mtimes: dict[str, int | None]):
+        """Walks rel_dir (whose mtime was mtime_ns before listing) with os.scandir, adding every entry found to out."""
+        stack = [(rel_dir, mtime_ns)]
+        while stack:
+            current, current_mtime_ns = stack.pop()
+            abs_dir = self._abs_path(current)
+            try:
+                iterator = os.scandir(abs_dir)
+            except OSError as e:
+                print(f"Error scanning directory {abs_dir}: {e}", file=sys.stderr)
+                continue
+            dir_mtimes[current] = self._settled(current_mtime_ns)
+            with iterator:
+                for dir_entry in iterator:
+                    if not current and dir_entry.name in self._excluded_names:
+                        continue
+                    entry = self._make_entry(current, dir_entry)
+                    if entry is None:
+                        continue
+                    out[entry.rel_path] = entry
+                    if entry.is_dir:
+                        stack.append((entry.rel_path, entry.mtime_ns))
+
+    def _make_entry(self, rel_dir: str, dir_entry) -> FileEntry | None:
+        rel_path = f"{rel_dir}/{dir_entry.name}" if rel_dir else dir_entry.name
+        try:
+            if dir_entry.is_symlink():
+                target = os.path.realpath(dir_entry.path)
+                if os.path.commonpath([target, self._root_str]) != self._root_str:
+                    return None # Symlink escapes the served root
+                if os.path.isdir(target):
+                    return None # Do not follow directory symlinks (avoids loops)
+            st = dir_entry.stat()
+            is_dir = dir_entry.is_dir()
+        except (OSError, ValueError):
+            return None # Vanished or unreadable while scanning
+        return FileEntry(dir_entry.name, rel_path, 0 if is_dir else st.st_size, st.st_mtime_ns, is_dir, st.st_ino)
+
+    def _stat_entry(self, rel_path: str) -> FileEntry | None:
+        """Entry for one path from a single lstat (stat for file symlinks), as _make_entry would list it."""
+        abs_path = self._abs_path(rel_path)
+        try:
+            st = os.lstat(abs_path)
+            if stat.S_ISLNK(st.st_mode):
+                target = os.path.realpath(abs_path)
+                if os.path.commonpath([target, self._root_str]) != self._root_str or os.path.isdir(target):
+                    return None # Escapes the root, or a directory symlink (never followed)
+                st = os.stat(abs_path)
+        except (OSError, ValueError):
+            return None
+        is_dir = stat.S_ISDIR(st.st_mode)
+        return FileEntry(rel_path.rpartition('/')[2], rel_path, 0 if is_dir else st.st_size, st.st_mtime_ns, is_dir, st.st_ino)
+
+    def rescan(self):
+        """Rescans the whole tree and swaps in the result if anything changed."""
+        fresh: dict[str, FileEntry] = {}
+        dir_mtimes: dict[str, int | None] = {}
+        try:
+            root_mtime_ns = os.stat(self._root_str).st_mtime_ns
+        except OSError:
+            root_mtime_ns = 0 # Unreadable root: the scan below reports it
+        self._scan_tree('', root_mtime_ns, fresh, dir_mtimes)
+        with self._lock:
+            old = self._entries
+            self._dir_mtimes = dir_mtimes
+            changed = [entry for path, entry in fresh.items() if old.get(path) != entry]
+            removed = [path for path in old if path not in fresh]
+            if not changed and not removed and self._ready.is_set():
+                return
+            children: dict[str, dict[str, FileEntry]] = {'': {}}
+            for entry in fresh.values():
+                children.setdefault(entry.rel_path.rpartition('/')[0], {})[entry.name] = entry
+            self._entries = fresh
+            self._children = children
+            self._listing_cache = {}
+            self._bump_generation(changed, removed)
+
+    def poll(self):
+        """Re-lists the folders whose mtime changed since they were listed: one stat per folder, not per file."""
+        for rel_dir, mtime_ns in list(self._dir_mtimes.items()):
+            try:
+                current = os.stat(self._abs_path(rel_dir)).st_mtime_ns
+            except OSError:
+                continue # Removed: re-listing its parent drops it
+            if current != mtime_ns:
+                self._refresh_dir(rel_dir)
+
+    def _refresh_dir(self, rel_dir: str):
+        """Re-lists one folder, scanning only subfolders that are new or were replaced."""
+        abs_dir = self._abs_path(rel_dir)
+        with self._lock:
+            if rel_dir and not getattr(self._entries.get(rel_dir), "is_dir", False):
+                return # Removed meanwhile
+            listed: dict[str, FileEntry] = {}
+            try:
+                mtime_ns = os.stat(abs_dir).st_mtime_ns # Before listing: a change after it shows as a newer mtime
+                with os.scandir(abs_dir) as iterator:
+                    for dir_entry in iterator:
+                        if not rel_dir and dir_entry.name in self._excluded_names:
+                            continue
+                        entry = self._make_entry(rel_dir, dir_entry)
+                        if entry is not None:
+                            listed[entry.name] = entry
+            except OSError:
+                return # Vanished; its parent's change removes it
+            self._dir_mtimes[rel_dir] = self._settled(mtime_ns)
+            old_children = self._children.get(rel_dir, {})
+            changed, removed = [], []
+            for name, entry in listed.items():
+                self._diff_locked(entry.rel_path, old_children.get(name), entry, changed, removed)
+            for name, old in old_children.items():
+                if name not in listed:
+                    self._diff_locked(old.rel_path, old, None, changed, removed)
+            self._apply_locked(changed, removed)
+
+    def refresh_path(self, abs_path: str):
+        """Re-stats a single path after a watcher event; a new or replaced folder is scanned as a whole."""
+        try:
+            rel = os.path.relpath(abs_path, self._root_str)
+        except ValueError:
+            return
+        rel = normalize_rel_path(rel.replace(os.sep, '/'))
+        if not rel:
+            return # Events on the root itself or outside of it
+        if rel.split('/', 1)[0] in self._excluded_names:
+            return
+        with self._lock:
+            changed, removed = [], []
+            self._diff_locked(rel, self._entries.get(rel), self._stat_entry(rel), changed, removed)
+            self._apply_locked(changed, removed)
+
+    def _diff_locked(self, rel_path: str, old: FileEntry | None, entry: FileEntry | None, changed: list, removed: list):
+        """Adds what turns old into entry at rel_path (either may be None) to changed and removed.
+
+        A folder that stays the same folder (same inode) keeps its indexed contents: changes
+        inside it arrive as their own events or show in its own mtime.
+        """
+        if entry == old:
+            return
+        same_dir = old is not None and entry is not None and old.is_dir and entry.is_dir and old.inode == entry.inode
+        if old is not None and old.is_dir and not same_dir:
+            removed.extend(self._subtree_locked(rel_path))
+        if entry is None:
+            removed.append(rel_path)
+            return
+        changed.append(entry)
+        if entry.is_dir and not same_dir:
+            fresh: dict[str, FileEntry] = {}
+            self._scan_tree(rel_path, entry.mtime_ns, fresh, self._dir_mtimes)
+            changed.extend(fresh.values())
+
+    def _subtree_locked(self, rel_dir: str) -> list[str]:
+        """Indexed paths below rel_dir, found through the children map rather than a scan of all entries."""
+        paths, stack = [], [rel_dir]
+        while stack:
+            for entry in self._children.get(stack.pop(), {}).values():
+                paths.append(entry.rel_path)
+                if entry.is_dir:
+                    stack.append(entry.rel_path)
+        return paths
+
+    def _apply_locked(self, changed: list[FileEntry], removed: list[str]):
+        """Updates the entries and the children of the affected folders in place, then notifies listeners."""
+        if changed:
+            changed_paths = {entry.rel_path for entry in changed}
+            removed = [path for path in removed if path not in changed_paths] # Replaced folder: listed again
+        if not changed and not removed:
+            return
+        touched = set()
+        for path in removed:
+            entry = self._entries.pop(path, None)
+            parent = path.rpartition('/')[0]
+            if entry is not None:
+                self._children.get(parent, {}).pop(entry.name, None)
+            self._children.pop(path, None)
+            self._dir_mtimes.pop(path, None)
+            touched.update((parent, path))
+        for entry in changed:
+            parent = entry.rel_path.rpartition('/')[0]
+            self._entries[entry.rel_path] = entry
+            self._children.setdefault(parent, {})[entry.name] = entry
+            if entry.is_dir:
+                self._children.setdefault(entry.rel_path, {})
+            touched.add(parent)
+        self._listing_cache = {rel_dir: listing for rel_dir, listing in self._listing_cache.items() if rel_dir not in touched} # Replaced: a reader still storing into the old one cannot bring back a stale listing
+        self._bump_generation(changed, removed)
+
+    def _bump_generation(self, changed, removed):
+        self.last_changed = time.time()
+        self.generation += 1
+        for callback in self._listeners:
+            try:
+                callback(changed, removed)
+            except Exception as e:
+                print(f"Error in file index listener: {e}", file=sys.stderr)
+
+    def lookup(self, rel_path: str) -> FileEntry | None:
+        """Returns the indexed entry for a normalized relative path, or None."""
+        if not self._ready.is_set():
+            self.wait_ready()
+        return self._entries.get(rel_path)
+
+    def list_dir(self, rel_dir: str = '') -> tuple[FileEntry, ...]:
+        """Returns the entries directly inside rel_dir, sorted by name."""
+        if not self._ready.is_set():
+            self.wait_ready()
+        cache = self._listing_cache
+        listing = cache.get(rel_dir)
+        if listing is None:
+            listing = tuple(sorted(self._children.get(rel_dir, {}).values(), key=lambda e: e.name.lower()))
+            cache[rel_dir] = listing
+        return listing
+
+    def all_entries(self) -> list[FileEntry]:
+        if not self._ready.is_set():
+            self.wait_ready()
+        return list(self._entries.values())
@@ -1,3 +1,5 @@
+import ipaddress
+import json
 import os
 from pathlib import Path
 import sys
@@ -28,6 +30,14 @@ def ensure_file_exists(file_path: Path):
  
 
 
+def format_bytes(n: int) -> str:
+    """Formats a byte count for display (B, KB, MB, GB, TB)."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
 def get_blocked_ips(block_file_path: Path) -> set[str]:
     """Reads the list of blocked IPs from the file."""
     if not block_file_path.is_file():
@@ -55,8 +65,25 @@ def add_blocked_ip(block_file_path: Path, ip_address: str) -> bool:
         print(f"Error writing to blocklist file {block_file_path}: {e}", file=sys.stderr)
         return False
 
+def find_blocking_entries(block_file_path: Path, ip_address: str) -> list[str]:
+    """Returns the blocklist entries (single IPs or CIDR ranges) that cover an address."""
+    try:
+        address = ipaddress.ip_address(ip_address.split('%', 1)[0])
+    except ValueError:
+        return []
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped # Checked against IPv4 entries, as the server does
+    matches = []
+    for entry in sorted(get_blocked_ips(block_file_path)):
+        try:
+            if address in ipaddress.ip_network(entry, strict=False):
+                matches.append(entry)
+        except ValueError:
+            continue # Invalid lines are ignored by the server too
+    return matches
+
 def remove_blocked_ip(block_file_path: Path, ip_address: str) -> bool:
-    """Removes an IP address from the blocklist file."""
+    """Removes an entry (an IP address or a CIDR range, as written) from the blocklist file."""
  
     existing_blocked_ips = get_blocked_ips(block_file_path)
     if ip_address not in existing_blocked_ips:
@@ -79,26 +106,18 @@ def remove_blocked_ip(block_file_path: Path, ip_address: str) -> bool:
         print(f"Error writing to blocklist file {block_file_path}: {e}", file=sys.stderr)
         return False
 
-def get_connected_ips(log_file_path: Path) -> set[str]:
-    """Reads the list of connected IPs from the log file."""
-    if not log_file_path.is_file():
-        return set()
-    try:
-        with open(log_file_path, "r", encoding="utf-8") as f:
- 
-             return set(line.strip() for line in f if line.strip())
-    except Exception as e:
-        print(f"Error reading IP log file {log_file_path}: {e}", file=sys.stderr)
-        return set()
-
-def clear_connected_ips_log(log_file_path: Path):
-    """Clears the connected IPs log file."""
+def clear_access_log(log_file_path: Path, backup_count: int = 0):
+    """Clears the access log file and removes its rotated backups (log.1, log.2, ...)."""
     try:
         with open(log_file_path, "w", encoding="utf-8") as f:
             f.write("")
+        for i in range(1, backup_count + 1):
+            backup_path = log_file_path.with_name(f"{log_file_path.name}.{i}")
+            if backup_path.exists():
+                backup_path.unlink()
  
     except Exception as e:
-        print(f"Warning: Could not clear IP log file {log_file_path}: {e}", file=sys.stderr)
+        print(f"Warning: Could not clear access log file {log_file_path}: {e}", file=sys.stderr)
 
  
 
@@ -137,4 +156,39 @@ def load_served_folder_setting(file_path: Path) -> Path | None:
 
     except Exception as e:
         print(f"Error loading served folder setting from {file_path}: {e}", file=sys.stderr)
-        return None # Tangani error saat membaca
\ No newline at end of file
+        return None # Tangani error saat membaca
+
+def save_mounts_setting(file_path: Path, primary: Path, mounts: dict[str, Path]):
+    """Saves the primary served folder and the named mounts ({name: folder}) as JSON."""
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"primary": str(Path(primary).resolve()), "mounts": {name: str(Path(folder).resolve()) for name, folder in mounts.items()}}
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, file_path) # Never leaves a half-written settings file
+    except Exception as e:
+        print(f"Error saving served folders setting to {file_path}: {e}", file=sys.stderr)
+
+def load_mounts_setting(file_path: Path, legacy_file_path: Path | None = None) -> tuple[Path | None, dict[str, Path]]:
+    """Loads (primary folder, {name: folder}); without the file, falls back to the older single-folder setting."""
+    if not file_path.is_file():
+        return (load_served_folder_setting(legacy_file_path) if legacy_file_path else None), {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error loading served folders setting from {file_path}: {e}", file=sys.stderr)
+        return None, {}
+
+    primary = Path(data["primary"]) if data.get("primary") else None
+    if primary is not None and not primary.is_dir():
+        print(f"Warning: Saved served folder path '{primary}' is not a valid directory.", file=sys.stderr)
+        primary = None
+    mounts = {}
+    for name, folder in (data.get("mounts") or {}).items():
+        if Path(folder).is_dir():
+            mounts[name] = Path(folder)
+        else:
+            print(f"Warning: Folder '{folder}' of mount '{name}' is not a valid directory, skipped.", file=sys.stderr)
+    return primary, mounts
\ No newline at end of file
@@ -0,0 +1,161 @@
+import mimetypes
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+CHUNK_SIZE = 256 * 1024 # Read size used when streaming file bodies
+MAX_RANGES = 32 # More ranges than this in one request are ignored and the full body is sent
+
+
+def http_date(timestamp: float) -> str:
+    """Formats a POSIX timestamp as an IMF-fixdate (e.g. for Last-Modified)."""
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str | None) -> int | None:
+    """Parses an HTTP date header to whole POSIX seconds, or None if invalid."""
+    if not value:
+        return None
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Builds a strong ETag from the file's identity (inode, size, mtime_ns)."""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def guess_mimetype(filename: str) -> str:
+    mimetype, _ = mimetypes.guess_type(filename)
+    if mimetype is None:
+        return "application/octet-stream"
+    if mimetype.startswith("text/") or mimetype in ("application/javascript", "application/json", "application/xml"):
+        return f"{mimetype}; charset=utf-8"
+    return mimetype
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """Builds a Content-Disposition value with an ASCII fallback and an RFC 5987 UTF-8 name."""
+    ascii_name = filename.encode("ascii", "ignore").decode("ascii").replace('\\', '_').replace('"', '_')
+    if ascii_name == filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename=\"{ascii_name or 'download'}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def parse_range_header(value: str | None, size: int) -> list[tuple[int, int]] | None:
+    """Parses a 'bytes=' Range header into sorted, merged (start, end) pairs with inclusive ends.
+
+    Returns None when the header is absent, malformed or should be ignored (the full body
+    is sent), and an empty list when no range is satisfiable (416).
+    """
+    if not value:
+        return None
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    parts = spec.split(',')
+    if len(parts) > MAX_RANGES:
+        return None
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+            return None # Syntactically invalid: ignore the whole header
+        if not first: # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(0, size - length), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue # Unsatisfiable on its own, others may still be valid
+        end = int(last) if last else size - 1
+        ranges.append((start, min(end, size - 1)))
+    ranges.sort()
+    merged: list[tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end)) # Coalesce overlapping/adjacent ranges
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def is_not_modified(if_none_match: str | None, if_modified_since: str | None, etag: str, mtime: float) -> bool:
+    """Evaluates conditional GET headers; If-None-Match takes precedence over If-Modified-Since."""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    since = parse_http_date(if_modified_since)
+    return since is not None and int(mtime) <= since
+
+
+def if_range_allows(if_range: str | None, etag: str, mtime: float) -> bool:
+    """Returns True if a Range request should be honoured given the If-Range precondition."""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag # Strong comparison only, weak tags never match
+    since = parse_http_date(if_range)
+    return since is not None and since == int(mtime)
+
+
+def iter_file_range(f, start: int, length: int, chunk_size: int = CHUNK_SIZE):
+    """Yields length bytes of an open binary file starting at start."""
+    f.seek(start)
+    remaining = length
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            break # File shrank while sending
+        remaining -= len(chunk)
+        yield chunk
+
+
+def new_boundary() -> str:
+    return uuid.uuid4().hex
+
+
+def multipart_part_header(boundary: str, content_type: str, start: int, end: int, size: int) -> bytes:
+    return (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode("latin-1")
+
+
+def multipart_length(boundary: str, content_type: str, ranges: list[tuple[int, int]], size: int) -> int:
+    """Computes the exact Content-Length of a multipart/byteranges body."""
+    total = len(f"\r\n--{boundary}--\r\n")
+    for start, end in ranges:
+        total += len(multipart_part_header(boundary, content_type, start, end, size)) + (end - start + 1)
+    return total
+
+
+def iter_multipart_ranges(f, boundary: str, content_type: str, ranges: list[tuple[int, int]], size: int, chunk_size: int = CHUNK_SIZE):
+    """Yields a multipart/byteranges body for the given ranges of an open binary file."""
+    for start, end in ranges:
+        yield multipart_part_header(boundary, content_type, start, end, size)
+        yield from iter_file_range(f, start, end - start + 1, chunk_size)
+    yield f"\r\n--{boundary}--\r\n".encode("latin-1")
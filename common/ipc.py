@@ -0,0 +1,188 @@
+import os
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+import config
+
+# Server -> manager
+MSG_HELLO = "hello" # Connected but not accepting yet; asks for MSG_STATE
+MSG_READY = "ready" # Listening socket is bound and the app accepts requests
+MSG_CLIENT = "client" # First request from a client IP since the server started
+MSG_METRICS = "metrics" # MetricsRegistry.snapshot(), plus "file_cache" stats when the cache is enabled
+MSG_DRAINED = "drained" # No request in flight after a drain
+# Manager -> server
+MSG_STATE = "state" # Answer to MSG_HELLO: "limits", "folders", "uploads" and "entries" (None: read the blocklist file), applied before accepting
+MSG_BLOCKLIST = "blocklist" # Replace the blocklist with the given entries
+MSG_RELOAD = "reload" # Rescan the served folder and reread the blocklist file
+MSG_DRAIN = "drain" # Refuse new requests and report MSG_DRAINED once idle
+MSG_RATE_LIMITS = "rate_limits" # Replace the rate limits: {route: (rate, burst)}
+MSG_MOUNTS = "mounts" # Replace the served folders: {"": primary folder, name: folder}
+MSG_UPLOADS = "uploads" # Turn uploads on or off: "enabled"
+MSG_SHUTDOWN = "shutdown" # Stop accepting connections, finish running transfers within "timeout" seconds, then exit
+# Synthesized locally when a peer goes away; never sent over the wire
+MSG_DISCONNECTED = "disconnected"
+
+
+class ControlServer:
+    """Manager side of the control channel: accepts server processes and exchanges typed messages.
+
+    Messages are dicts with a "type" key (one of the MSG_* constants). The transport is a
+    Unix domain socket (a named pipe on Windows), authenticated with a random key that the
+    server process receives through its environment.
+    """
+
+    def __init__(self, on_message):
+        self._on_message = on_message # Called as on_message(connection_id, message) from reader threads
+        self._listener: Listener | None = None
+        self._connections: dict[int, object] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.authkey = os.urandom(32)
+        self.address = None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        self._listener = Listener(authkey=self.authkey) # Default family: AF_UNIX on POSIX, AF_PIPE on Windows
+        self.address = self._listener.address
+        threading.Thread(target=self._accept_loop, name="ipc-accept", daemon=True).start()
+
+    def environ(self) -> dict[str, str]:
+        """Environment variables that let a child process connect back."""
+        return {config.IPC_ADDRESS_ENV_VAR: self.address, config.IPC_AUTHKEY_ENV_VAR: self.authkey.hex()}
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._closed:
+                    break
+                print(f"Control channel: rejected connection: {e}", file=sys.stderr)
+                continue
+            if self._closed:
+                conn.close()
+                break
+            with self._lock:
+                connection_id = self._next_id
+                self._next_id += 1
+                self._connections[connection_id] = conn
+            threading.Thread(target=self._read_loop, args=(connection_id, conn), name=f"ipc-read-{connection_id}", daemon=True).start()
+
+    def _read_loop(self, connection_id: int, conn):
+        try:
+            while True:
+                message = conn.recv()
+                try:
+                    self._on_message(connection_id, message)
+                except Exception as e:
+                    print(f"Control channel: error handling {message.get('type')!r}: {e}", file=sys.stderr)
+        except (EOFError, OSError):
+            pass # Peer exited
+        finally:
+            with self._lock:
+                self._connections.pop(connection_id, None)
+            conn.close()
+            if not self._closed:
+                self._on_message(connection_id, {"type": MSG_DISCONNECTED})
+
+    def send(self, message: dict, connection_id: int | None = None) -> int:
+        """Sends to one connection, or to all of them; returns how many peers received it."""
+        with self._lock:
+            targets = list(self._connections.items()) if connection_id is None else [(connection_id, self._connections.get(connection_id))]
+        sent = 0
+        for target_id, conn in targets:
+            if conn is None:
+                continue
+            try:
+                conn.send(message)
+                sent += 1
+            except (OSError, ValueError):
+                with self._lock:
+                    self._connections.pop(target_id, None) # Reader thread reports the disconnect
+        return sent
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return len(self._connections)
+
+    def close(self):
+        if self._listener is None or self._closed:
+            return
+        self._closed = True
+        try:
+            Client(self.address, authkey=self.authkey).close() # Wakes the blocking accept()
+        except Exception:
+            pass
+        self._listener.close()
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+
+
+class ControlClient:
+    """Server side of the control channel; handlers run on a single reader thread."""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._handlers: dict[str, object] = {}
+        self._send_lock = threading.Lock() # Request threads and the telemetry thread share the connection
+
+    @classmethod
+    def from_environ(cls):
+        """Returns a client for the channel named in the environment, or None when run standalone."""
+        address = os.environ.get(config.IPC_ADDRESS_ENV_VAR)
+        authkey = os.environ.get(config.IPC_AUTHKEY_ENV_VAR)
+        if not address or not authkey:
+            return None
+        return cls(address, bytes.fromhex(authkey))
+
+    def on(self, message_type: str, handler):
+        """Registers handler(message) for a message type."""
+        self._handlers[message_type] = handler
+
+    def connect(self) -> bool:
+        try:
+            self._conn = Client(self.address, authkey=self.authkey)
+        except Exception as e:
+            print(f"Control channel unavailable ({e}); running without it.", file=sys.stderr)
+            return False
+        threading.Thread(target=self._read_loop, name="ipc-read", daemon=True).start()
+        return True
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = self._conn.recv()
+                handler = self._handlers.get(message.get("type"))
+                if handler is None:
+                    print(f"Control channel: ignoring unknown message {message.get('type')!r}", file=sys.stderr)
+                    continue
+                try:
+                    handler(message)
+                except Exception as e:
+                    print(f"Control channel: error handling {message.get('type')!r}: {e}", file=sys.stderr)
+        except (EOFError, OSError):
+            pass # Manager went away; keep serving
+        handler = self._handlers.get(MSG_DISCONNECTED)
+        if handler is not None:
+            handler({"type": MSG_DISCONNECTED})
+
+    def send(self, message: dict) -> bool:
+        """Sends a message; returns False (without raising) if the manager is not reachable."""
+        conn = self._conn
+        if conn is None:
+            return False
+        try:
+            with self._send_lock:
+                conn.send(message)
+            return True
+        except (OSError, ValueError):
+            self._conn = None
+            return False
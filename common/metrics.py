@@ -0,0 +1,195 @@
+import bisect
+import math
+import threading
+import time
+from collections import OrderedDict
+
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Upper bounds; +Inf is implicit
+METRIC_PREFIX = "hfs"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative only when rendered)."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_S, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+
+class _Series:
+    __slots__ = ("requests", "bytes", "statuses", "latency", "last_seen")
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.statuses: dict[int, int] = {}
+        self.latency = Histogram()
+        self.last_seen = 0.0
+
+    def observe(self, status: int, nbytes: int, seconds: float, now: float):
+        self.requests += 1
+        self.last_seen = now
+        self.bytes += nbytes
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latency.observe(seconds)
+
+    def summary(self) -> dict:
+        """{"requests", "bytes", "statuses", "buckets" (cumulative counts), "last_seen"}, as sent in metrics snapshots."""
+        cumulative = self.latency.cumulative()
+        return {
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "statuses": {str(status): n for status, n in self.statuses.items()},
+            "buckets": dict(zip(LATENCY_BUCKETS_S + (math.inf,), cumulative)),
+            "last_seen": self.last_seen,
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(bound)
+
+
+class MetricsRegistry:
+    """In-process request counters and latency histograms per route and per client IP."""
+
+    def __init__(self, max_clients: int = 5000):
+        self._routes: dict[str, _Series] = {}
+        self._clients: OrderedDict[str, _Series] = OrderedDict() # Least recently seen first
+        self._max_clients = max_clients
+        self._lock = threading.Lock()
+        self.version = 0 # Bumped on every observation, lets publishers skip unchanged snapshots
+
+    def observe(self, route: str, ip: str, status: int, nbytes: int | None, seconds: float) -> bool:
+        """Records one request; returns True the first time a client IP is seen."""
+        nbytes = nbytes or 0
+        now = time.time()
+        with self._lock: # A handful of dict/int operations; held for well under a microsecond
+            self.version += 1
+            series = self._routes.get(route)
+            if series is None:
+                series = self._routes[route] = _Series()
+            series.observe(status, nbytes, seconds, now)
+            client = self._clients.get(ip)
+            new_client = client is None
+            if new_client:
+                client = self._clients[ip] = _Series()
+                if len(self._clients) > self._max_clients:
+                    self._clients.popitem(last=False) # Forget the least recently seen client
+            else:
+                self._clients.move_to_end(ip)
+            client.observe(status, nbytes, seconds, now)
+        return new_client
+
+    def snapshot(self) -> dict:
+        """Returns {"routes": {name: summary}, "clients": {ip: summary}} as plain picklable data."""
+        with self._lock:
+            return {
+                "routes": {name: series.summary() for name, series in self._routes.items()},
+                "clients": {ip: series.summary() for ip, series in self._clients.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        with self._lock:
+            routes = [(name, s.requests, s.bytes, dict(s.statuses), s.latency.cumulative(), s.latency.sum, s.latency.count) for name, s in self._routes.items()]
+            clients = [(ip, s.requests, s.bytes, dict(s.statuses), s.latency.cumulative(), s.latency.sum, s.latency.count) for ip, s in self._clients.items()]
+        lines = []
+        for scope, label, rows in (("", "route", routes), ("client_", "ip", clients)):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{scope}requests_total counter")
+            for key, _, _, statuses, _, _, _ in rows:
+                for status, n in sorted(statuses.items()):
+                    lines.append(f'{METRIC_PREFIX}_{scope}requests_total{{{label}="{_escape(key)}",status="{status}"}} {n}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_{scope}response_bytes_total counter")
+            for key, _, nbytes, _, _, _, _ in rows:
+                lines.append(f'{METRIC_PREFIX}_{scope}response_bytes_total{{{label}="{_escape(key)}"}} {nbytes}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_{scope}request_duration_seconds histogram")
+            for key, _, _, _, cumulative, total, count in rows:
+                escaped = _escape(key)
+                for bound, n in zip(LATENCY_BUCKETS_S + (math.inf,), cumulative):
+                    lines.append(f'{METRIC_PREFIX}_{scope}request_duration_seconds_bucket{{{label}="{escaped}",le="{_format_le(bound)}"}} {n}')
+                lines.append(f'{METRIC_PREFIX}_{scope}request_duration_seconds_sum{{{label}="{escaped}"}} {total:.6f}')
+                lines.append(f'{METRIC_PREFIX}_{scope}request_duration_seconds_count{{{label}="{escaped}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def render_cache_stats(name: str, stats: dict) -> str:
+    """Renders a cache's stats() ({"hits", "misses", ... , "entries", "bytes"}) as Prometheus samples."""
+    lines = []
+    for key, value in stats.items():
+        kind = "counter" if key in ("hits", "misses", "evictions", "rejected") else "gauge"
+        metric = f"{METRIC_PREFIX}_{name}_{key}{'_total' if kind == 'counter' else ''}"
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_buckets(summaries) -> dict[float, int]:
+    """Adds up cumulative bucket counts from several summaries."""
+    merged: dict[float, int] = {}
+    for summary in summaries:
+        for bound, n in summary["buckets"].items():
+            merged[bound] = merged.get(bound, 0) + n
+    return merged
+
+
+def merge_snapshots(snapshots) -> dict:
+    """Adds up published snapshots (MetricsRegistry.snapshot() plus "file_cache" stats) from several server processes."""
+    merged = {"routes": {}, "clients": {}}
+    for snapshot in snapshots:
+        for scope in ("routes", "clients"):
+            for key, summary in snapshot[scope].items():
+                total = merged[scope].get(key)
+                if total is None:
+                    merged[scope][key] = {**summary, "statuses": dict(summary["statuses"]), "buckets": dict(summary["buckets"])}
+                    continue
+                total["requests"] += summary["requests"]
+                total["bytes"] += summary["bytes"]
+                for status, n in summary["statuses"].items():
+                    total["statuses"][status] = total["statuses"].get(status, 0) + n
+                for bound, n in summary["buckets"].items():
+                    total["buckets"][bound] = total["buckets"].get(bound, 0) + n
+                total["last_seen"] = max(total.get("last_seen", 0.0), summary.get("last_seen", 0.0))
+        if "file_cache" in snapshot: # Counters and sizes add up across processes, each has its own budget
+            merged["file_cache"] = {key: merged.get("file_cache", {}).get(key, 0) + value for key, value in snapshot["file_cache"].items()}
+    return merged
+
+
+def histogram_quantile(q: float, buckets: dict[float, int]) -> float | None:
+    """Estimates a quantile (seconds) from cumulative buckets by linear interpolation."""
+    if not buckets:
+        return None
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total == 0:
+        return None
+    rank = q * total
+    previous_bound, previous_count = 0.0, 0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if math.isinf(bound):
+                return previous_bound # Beyond the last finite bucket: report its upper bound
+            if count == previous_count:
+                return bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / (count - previous_count)
+        previous_bound, previous_count = bound, count
+    return previous_bound
@@ -4,8 +4,28 @@ from pathlib import Path
  
 DEFAULT_FOLDER_NAME = "files"
 FOLDER_ENV_VAR = 'FLASK_SERVE_FOLDER'
+MOUNTS_ENV_VAR = 'FLASK_SERVER_MOUNTS' # JSON {name: folder} of the folders served under /m/<name>/
+MOUNT_NAME_PATTERN = r"[A-Za-z0-9_-]{1,64}" # Mount names appear in URLs as they are
 SERVER_PORT = 8000
 SERVER_HOST = '0.0.0.0'
+ENGINE_ENV_VAR = 'FLASK_SERVER_ENGINE'
+WORKERS_ENV_VAR = 'FLASK_SERVER_WORKERS'
+IPC_ADDRESS_ENV_VAR = 'FLASK_SERVER_IPC_ADDRESS' # Control channel between ServerManager and the server process
+IPC_AUTHKEY_ENV_VAR = 'FLASK_SERVER_IPC_AUTHKEY'
+SERVER_ENGINES = ("threaded", "asyncio", "debug") # "debug" is Flask's development server
+SERVER_ENGINE = "threaded"
+SERVER_WORKER_THREADS = 8 # Worker pool size of the threaded and asyncio engines
+SERVER_PROCESSES = 1 # Server processes sharing the listening socket; more than one uses several CPU cores
+SERVER_BACKLOG = 1024 # Listen queue length
+SERVER_CHANNEL_TIMEOUT_S = 120 # Idle (keep-alive) connections are closed after this long
+SERVER_CONNECTION_LIMIT = 1000 # Max simultaneous connections before new ones wait in the backlog
+SERVER_READY_TIMEOUT_S = 15.0 # A server that has not reported ready by then is stopped
+SERVER_STATE_TIMEOUT_S = 5.0 # How long a server process waits for its startup state before serving with the defaults
+LISTEN_FD_ENV_VAR = 'FLASK_SERVER_LISTEN_FD' # Listening socket owned by ServerManager and inherited by each server process
+SERVER_RESTART_DRAIN_TIMEOUT_S = 600.0 # On a graceful restart, transfers still running after this long are cut off
+SERVER_STOP_DRAIN_TIMEOUT_S = 5.0 # On stop, how long running transfers may take before the process is terminated
+WORKER_RESTART_BACKOFF_S = (1.0, 30.0) # A crashed server process is restarted after 1 s, doubling per repeated crash up to 30 s
+WORKER_STABLE_AFTER_S = 60.0 # A process that ran this long before crashing starts the backoff over
 
  
  
@@ -14,18 +34,58 @@ BASE_DIR = Path(__file__).parent.resolve()
  
 LOG_DIR_NAME = "logs"
 LOG_DIR = BASE_DIR / LOG_DIR_NAME
-CONNECTED_IPS_LOG_FILE_NAME = "connected_ips.log"
+ACCESS_LOG_FILE_NAME = "access.log" # One tab-separated record per request
 BLOCKED_IPS_FILE_NAME = "blocked_ips.txt"
-CONNECTED_IPS_LOG_PATH = LOG_DIR / CONNECTED_IPS_LOG_FILE_NAME
+ACCESS_LOG_PATH = LOG_DIR / ACCESS_LOG_FILE_NAME
+ACCESS_LOG_MAX_BYTES = 10 * 1024 * 1024 # Rotate to access.log.1 once the file grows past this size
+ACCESS_LOG_BACKUP_COUNT = 3
+ACCESS_LOG_FLUSH_INTERVAL_S = 0.5 # The writer batches records for at most this long
 BLOCKED_IPS_FILE_PATH = LOG_DIR / BLOCKED_IPS_FILE_NAME
+BLOCKLIST_RECHECK_INTERVAL_S = 1.0 # How often the server stat()s the blocklist file for changes
+RATE_LIMITS = {"*": (20.0, 40), "index": (5.0, 20), "download_zip": (0.5, 3)} # Route -> (requests per second, burst) per client IP; "*" is shared by all routes, rate 0 disables
+RATE_LIMIT_ROUTES = ("*", "index", "open_file", "download_file", "download_zip", "search_files", "list_files") # Routes offered in the GUI
+RATE_LIMIT_SWEEP_INTERVAL_S = 30.0 # How often refilled (idle) buckets are dropped
+FILE_INDEX_POLL_INTERVAL_S = 2.0 # Without watchdog: how often folder mtimes are checked (one stat per folder; changed folders are re-listed)
+FILE_INDEX_RESYNC_INTERVAL_S = 60.0 # Full rescan period, e.g. for files rewritten in place, which no folder mtime shows
+OPEN_DIR_CACHE_SIZE = 64 # Folder fds kept open per served folder, so file opens walk no path (0 reopens every time)
+COMPRESSION_ENABLED = True # gzip/deflate for text-like responses when the client accepts it
+COMPRESSION_LEVEL = 6
+COMPRESSION_MIN_SIZE = 1024 # Smaller bodies are sent as-is
+COMPRESSION_MAX_FILE_SIZE = 64 * 1024 * 1024 # Larger files are never precompressed
+COMPRESSION_CACHE_DIR = LOG_DIR / "compressed_cache" # Sidecar store of precompressed file variants
+COMPRESSION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024 # In-memory cache of hot small files, per server process (0 disables it)
+FILE_CACHE_MAX_FILE_SIZE = 4 * 1024 * 1024 # Larger files are always streamed from disk
+FILE_CACHE_ADMIT_AFTER = 2 # A file is cached from its second request on; one-off downloads never displace hot files
+LISTING_PAGE_SIZE = 1000 # Files per listing page; bigger folders are split into ?page=2, 3, ...
+LISTING_CACHE_MAX_BYTES = 16 * 1024 * 1024 # Rendered listing pages kept per server process
+ZIP_MAX_FILES = 20000 # Upper bound on members of one /download-zip archive
+SEARCH_DEFAULT_LIMIT = 50 # Results returned by /search unless ?limit= asks for more
+SEARCH_MAX_LIMIT = 500
+LIST_API_DEFAULT_LIMIT = 200 # Entries per /api/list page unless ?limit= asks for another size
+LIST_API_MAX_LIMIT = 1000
+LIST_API_MAX_VIEWS = 32 # Sorted/filtered folder views kept per server process for paging
+UPLOAD_ENABLED = False # Default for each start; switched live from the GUI
+UPLOAD_STAGING_DIR_NAME = ".uploads" # Inside the served folder (same filesystem, so finishing is a rename); never listed
+UPLOAD_MAX_FILE_SIZE = 64 * 1024 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024 # Chunk size suggested to clients
+UPLOAD_STAGING_MAX_BYTES = 128 * 1024 * 1024 * 1024 # Declared sizes of all unfinished uploads of one folder together
+UPLOAD_MAX_SESSIONS = 16 # Unfinished uploads per folder; more are refused until some finish or expire
+UPLOAD_SESSION_TTL_S = 24 * 60 * 60 # Unfinished uploads untouched this long are deleted
+METRICS_MAX_CLIENTS = 5000 # Client IPs tracked by /metrics, least recently seen dropped first
+METRICS_TOP_TALKERS = 5 # Clients listed in the GUI statistics panel
+METRICS_PUBLISH_INTERVAL_S = 1.0 # How often the server pushes a metrics snapshot over the control channel
 
  
 SERVED_FOLDER_SETTING_FILE_NAME = "served_folder.txt" # <--- File baru
 SERVED_FOLDER_SETTING_PATH = LOG_DIR / SERVED_FOLDER_SETTING_FILE_NAME # <--- Jalur file baru
+MOUNTS_SETTING_PATH = LOG_DIR / "served_folders.json" # Primary folder and named mounts; replaces served_folder.txt, which is migrated once
 
  
 DEFAULT_SERVE_PATH = BASE_DIR / DEFAULT_FOLDER_NAME
 
  
 UPDATE_INTERVAL_MS = 1500 # For network stats and device list
-LOG_QUEUE_CHECK_INTERVAL_MS = 50 # For processing log messages from server process
\ No newline at end of file
+LOG_QUEUE_CHECK_INTERVAL_MS = 50 # For processing log messages from server process
+LOG_MAX_LINES = 5000 # Lines kept by the log panel; older ones are dropped
+LOG_TRIM_BATCH_LINES = 500 # Let the textbox overshoot by this much before trimming, so trims happen in bulk
\ No newline at end of file
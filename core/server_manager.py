@@ -1,24 +1,68 @@
 import subprocess
+import socket
 import threading
 import time
 import queue
 import os
+import re
+import json
 import sys
 from pathlib import Path
 import config
 from common import file_utils
+from common import ipc
+from common.metrics import merge_snapshots
+
+class WorkerProcess:
+    """One server process of the pool and the worker slot (W1, W2, ...) it fills."""
+
+    def __init__(self, worker_id: int, process: subprocess.Popen, respawn: bool = False):
+        self.worker_id = worker_id
+        self.process = process
+        self.pid = process.pid
+        self.started = time.monotonic()
+        self.respawn = respawn # Started by the supervisor after a crash rather than by start()/restart_server()
+        self.ready = threading.Event() # Set when it reports its socket is listening
+        self.connection_id: int | None = None # Control connection, learned from its ready message
+
+    @property
+    def label(self) -> str:
+        return f"W{self.worker_id}"
+
 
 class ServerManager:
-    def __init__(self, served_folder_path: Path, log_callback=None):
+    def __init__(self, served_folder_path: Path, log_callback=None, engine: str = config.SERVER_ENGINE, worker_threads: int = config.SERVER_WORKER_THREADS,
+                 mounts: dict[str, Path] | None = None, processes: int = config.SERVER_PROCESSES):
         self._served_folder_path = served_folder_path
+        self._mounts: dict[str, Path] = dict(mounts or {}) # Named folders served at /m/<name>/, replaced whole on change
+        self._engine = engine # Serving engine name, one of config.SERVER_ENGINES
+        self._worker_threads = worker_threads
+        self._processes = processes # Server processes sharing the listening socket
         self._log_callback = log_callback # Function to call with new log messages
 
-        self.server_process: subprocess.Popen | None = None
         self.is_running = False # Status internal manager
+        self._workers: dict[int, WorkerProcess] = {} # worker id -> process serving new connections, replaced whole on change
+        self._live: list[WorkerProcess] = [] # Every live process, including ones starting or draining during a restart
+        self._workers_lock = threading.RLock() # Serializes changes to _workers and _live (restart vs supervisor)
+        self._failures: dict[int, int] = {} # worker id -> crashes in a row, drives the restart backoff
+        self._respawn_due: dict[int, float] = {} # worker id -> monotonic time of its scheduled restart
+        self._listen_socket: socket.socket | None = None # Owned here so a restart never closes the port; inherited by each process
         self._stop_event = threading.Event() # Untuk menghentikan pipe reader threads
         self._log_queue = queue.Queue() # Antrian untuk pesan log server
-        self._stdout_reader_thread: threading.Thread | None = None
-        self._stderr_reader_thread: threading.Thread | None = None
+        self._control = ipc.ControlServer(self._on_control_message) # Typed messages to and from the server processes
+        self._ready = threading.Event() # Set when every process of the current generation reports ready
+        self._start_finished = threading.Event() # Set once the server reported ready, exited or timed out
+        self._exit_status: str | None = None # "Exited (code)" of the last failed start, shown until the next start
+        self._startup_thread: threading.Thread | None = None
+        self._supervisor_thread: threading.Thread | None = None
+        self._restart_thread: threading.Thread | None = None
+        self._worker_metrics: dict[int, dict] = {} # pid -> last metrics snapshot it pushed, kept after a crash
+        self._metrics: dict | None = None # Merged snapshot, rebuilt on demand after a new one arrives
+        self._seen_clients: set[str] = set() # Client IPs already logged, whichever process saw them first
+        self._blocklist_entries: list[str] | None = None # Last entries pushed explicitly, replayed to processes that start later
+        self._rate_limits: dict[str, tuple[float, float]] = dict(config.RATE_LIMITS) # Part of the startup state every server asks for
+        self._uploads_enabled = config.UPLOAD_ENABLED # Off on every launch until switched on in the GUI
+        self._state_lock = threading.Lock() # Orders the startup state against live changes, so a new process never ends on stale settings
 
 
     def _log(self, message: str):
@@ -28,6 +72,16 @@ class ServerManager:
         else:
             print(message, file=sys.stderr) # Fallback to stderr if no callback
 
+    @property
+    def server_process(self) -> subprocess.Popen | None:
+        """The first worker's process (the only one unless several processes are configured)."""
+        worker = self._workers.get(1)
+        return worker.process if worker is not None else None
+
+    def get_pids(self) -> list[int]:
+        """Returns the PIDs of every live server process."""
+        return [worker.pid for worker in self._live if worker.process.poll() is None]
+
     def start(self):
         if self.is_running:
             self._log("Server is already running.")
@@ -39,120 +93,372 @@ class ServerManager:
             return False
 
         self._log("--- Server starting ---")
-        file_utils.clear_connected_ips_log(config.CONNECTED_IPS_LOG_PATH)
+        file_utils.clear_access_log(config.ACCESS_LOG_PATH, config.ACCESS_LOG_BACKUP_COUNT)
+        self._worker_metrics = {}
+        self._metrics = None
+        self._seen_clients = set()
+        self._failures = {}
+        self._respawn_due = {}
+        self._exit_status = None
+        self._ready.clear()
+        self._start_finished.clear()
 
         try:
-            env = os.environ.copy()
-            env[config.FOLDER_ENV_VAR] = str(self._served_folder_path)
-            server_command = [sys.executable, str(server_script_path)]
-            self._log(f"Starting server process: {' '.join(server_command)}")
-            self._log(f"Serving folder: {self._served_folder_path}")
-
-            self.server_process = subprocess.Popen(
-                server_command,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-                cwd=config.BASE_DIR # Set CWD to the base directory for relative paths in server
-            )
-            self._log(f"Server process started (PID: {self.server_process.pid}).")
-
+            self._control.start()
+            self._listen_socket = socket.create_server((config.SERVER_HOST, config.SERVER_PORT), backlog=config.SERVER_BACKLOG) # SO_REUSEADDR on POSIX
             self._stop_event.clear() # Clear stop signal
-            self._stdout_reader_thread = threading.Thread(
-                target=self._read_pipe_thread,
-                args=(self.server_process.stdout, 'stdout', self._log_queue, self._stop_event),
-                daemon=True # Allow GUI to exit even if threads are alive
-            )
-            self._stderr_reader_thread = threading.Thread(
-                target=self._read_pipe_thread,
-                args=(self.server_process.stderr, 'stderr', self._log_queue, self._stop_event),
+            self._log_settings(self._log)
+            workers = [self._spawn(worker_id, self._log) for worker_id in range(1, self._processes + 1)]
+            self._workers = {worker.worker_id: worker for worker in workers}
+            self.is_running = True # Before the watcher starts: a fast failure resets it
+            self._startup_thread = threading.Thread(
+                target=self._watch_startup,
+                args=(workers, time.monotonic()),
                 daemon=True
             )
-
-            self._stdout_reader_thread.start()
-            self._stderr_reader_thread.start()
-            time.sleep(1.0) # Reduced initial wait
-            if self.server_process.poll() is not None:
-                 exit_code = self.server_process.poll()
-                 self._log(f"Server failed to start or exited unexpectedly. Exit Code: {exit_code}")
-                 self._cleanup_process_resources() # Clean up resources
-                 self.is_running = False # Update internal state
-                 return False
-
-            self.is_running = True # Update internal state
-            self._log("Server is running.")
-
+            self._startup_thread.start() # Returns at once; the status reads "Starting" until the server reports ready
+            self._supervisor_thread = threading.Thread(target=self._supervise, name="server-supervisor", daemon=True)
+            self._supervisor_thread.start()
             return True
 
         except Exception as e:
             self._log(f"Error starting server: {e}")
+            self._stop_event.set()
+            for worker in self._live:
+                worker.process.kill()
+            self._cleanup_process_resources()
+            self.is_running = False
+            return False
+
+    def _log_settings(self, log):
+        server_script_path = config.BASE_DIR / "server" / "flask_server.py"
+        log(f"Starting server process: {sys.executable} {server_script_path}")
+        log(f"Serving folder: {self._served_folder_path}")
+        for name, folder in self._mounts.items():
+            log(f"Serving folder: {folder} at /m/{name}/")
+        log(f"Engine: {self._engine} ({self._worker_threads} worker threads, {self._processes} process{'es' if self._processes != 1 else ''})")
+
+    def _spawn(self, worker_id: int, log, respawn: bool = False) -> WorkerProcess:
+        """Launches one server process on the shared listening socket."""
+        env = os.environ.copy()
+        env.update(self._control.environ())
+        env[config.FOLDER_ENV_VAR] = str(self._served_folder_path)
+        env[config.MOUNTS_ENV_VAR] = json.dumps({name: str(folder) for name, folder in self._mounts.items()})
+        env[config.ENGINE_ENV_VAR] = self._engine
+        env[config.WORKERS_ENV_VAR] = str(self._worker_threads)
+        listen_fd = self._listen_socket.fileno()
+        env[config.LISTEN_FD_ENV_VAR] = str(listen_fd)
+        if os.name == 'nt':
+            self._listen_socket.set_inheritable(True) # Only handles in handle_list are inherited, not every inheritable one
+            inherit = {"startupinfo": subprocess.STARTUPINFO(lpAttributeList={"handle_list": [listen_fd]})}
+        else:
+            inherit = {"pass_fds": (listen_fd,)}
+
+        process = subprocess.Popen(
+            [sys.executable, str(config.BASE_DIR / "server" / "flask_server.py")],
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
+            cwd=config.BASE_DIR, # Set CWD to the base directory for relative paths in server
+            **inherit
+        )
+        worker = WorkerProcess(worker_id, process, respawn)
+        with self._workers_lock:
+            self._live = self._live + [worker] # Replaced, never mutated: other threads iterate it
+        log(f"Server process started ({worker.label}, PID: {worker.pid}).")
+
+        for pipe, pipe_name in ((process.stdout, 'stdout'), (process.stderr, 'stderr')):
+            threading.Thread(
+                target=self._read_pipe_thread,
+                args=(pipe, pipe_name, self._log_queue, self._stop_event, worker.label),
+                daemon=True # Allow GUI to exit even if threads are alive
+            ).start()
+        return worker
+
+    def _watch_startup(self, workers: list[WorkerProcess], started: float):
+        """Waits for the servers' ready messages, an exit or the timeout (runs on its own thread)."""
+        try:
+            if self._wait_for_ready(workers, started):
+                self._ready.set()
+            else:
+                self._abandon_start(workers)
+        finally:
+            self._start_finished.set()
+
+    def _abandon_start(self, workers: list[WorkerProcess]):
+        """After a failed start: closes the port and resets the state, so the next start begins clean."""
+        with self._workers_lock:
+            if self._stop_event.is_set() or self._workers.get(workers[0].worker_id) is not workers[0]:
+                return # Stopped from the GUI meanwhile; stop() cleans up
+            self._stop_event.set() # Ends the supervisor
+            for worker in workers:
+                worker.process.wait() # Killed by _wait_for_ready; reaps it for the exit code
+            self._exit_status = f"Exited ({workers[0].process.returncode})"
+            self._failures = {}
+            self._respawn_due = {}
             self._cleanup_process_resources()
             self.is_running = False
+
+    def _wait_for_ready(self, workers: list[WorkerProcess], started: float) -> bool:
+        """True once every process reported ready; if one exits or the timeout passes, kills them all and returns False."""
+        deadline = started + config.SERVER_READY_TIMEOUT_S
+        pending = list(workers)
+        while pending:
+            pending = [worker for worker in pending if not worker.ready.wait(0.05 / len(pending))]
+            failed = next((worker for worker in pending if worker.process.poll() is not None), None)
+            if failed is not None:
+                if not self._stop_event.is_set(): # Not stopped from the GUI while starting
+                    self._log_queue.put(f"Server failed to start or exited unexpectedly ({failed.label}). Exit Code: {failed.process.poll()}")
+            elif pending and time.monotonic() >= deadline:
+                self._log_queue.put(f"Server did not report ready within {config.SERVER_READY_TIMEOUT_S:g} s, stopping it.")
+            else:
+                continue
+            for worker in workers:
+                if worker.process.poll() is None:
+                    worker.process.kill()
+            return False
+        self._log_queue.put(f"Server is running (ready after {(time.monotonic() - started) * 1000:.0f} ms).")
+        return True
+
+    def _supervise(self):
+        """Restarts server processes that crash after having served, with exponential backoff (runs on its own thread)."""
+        while not self._stop_event.wait(0.25) and self._supervisor_thread is threading.current_thread(): # A quick start after a stop gets its own
+            for worker in list(self._workers.values()):
+                exit_code = worker.process.poll()
+                if exit_code is None or not (worker.ready.is_set() or worker.respawn):
+                    continue # Running, or a start()/restart_server() attempt that failed: no crash loop to guard against
+                worker_id = worker.worker_id
+                due = self._respawn_due.get(worker_id)
+                if due is None:
+                    with self._workers_lock: # _finish_restart replaces _failures and _respawn_due under it
+                        if self._stop_event.is_set() or self._workers.get(worker_id) is not worker:
+                            continue # Stopped or restarted meanwhile
+                        failures = 0 if time.monotonic() - worker.started >= config.WORKER_STABLE_AFTER_S else self._failures.get(worker_id, 0)
+                        self._failures[worker_id] = failures + 1
+                        initial, maximum = config.WORKER_RESTART_BACKOFF_S
+                        delay = min(maximum, initial * 2 ** failures)
+                        self._respawn_due[worker_id] = time.monotonic() + delay
+                    self._log_queue.put(f"Server process {worker.label} (PID: {worker.pid}) exited unexpectedly (Exit Code: {exit_code}); restarting it in {delay:g} s.")
+                    self._forget(worker)
+                elif time.monotonic() >= due:
+                    with self._workers_lock:
+                        self._respawn_due.pop(worker_id, None) # _finish_restart may have replaced the dict meanwhile
+                        if self._stop_event.is_set() or self._workers.get(worker_id) is not worker:
+                            continue # Stopped or restarted meanwhile
+                        try:
+                            replacement = self._spawn(worker_id, self._log_queue.put, respawn=True)
+                        except Exception as e:
+                            self._log_queue.put(f"Error restarting server process {worker.label}: {e}")
+                            continue
+                        self._workers = {**self._workers, worker_id: replacement}
+
+    def restart_server(self) -> bool:
+        """Replaces the running server without closing the port: new processes (with the current
+        engine settings) take over new connections once all are ready, the old ones finish their
+        transfers and exit. If the new processes fail to start, the old ones keep serving.
+        """
+        if not self.is_running or self._listen_socket is None:
+            self._log("Server is not running.")
             return False
+        if self._restart_thread is not None and self._restart_thread.is_alive():
+            self._log("A restart is already in progress.")
+            return False
+        self._log("--- Server restarting ---")
+        self._log_settings(self._log)
+        workers = []
+        try:
+            for worker_id in range(1, self._processes + 1):
+                workers.append(self._spawn(worker_id, self._log))
+        except Exception as e:
+            self._log(f"Error starting replacement server: {e}")
+            for worker in workers:
+                worker.process.kill()
+                self._forget(worker)
+            return False
+        self._restart_thread = threading.Thread(target=self._finish_restart, args=(workers, time.monotonic()), daemon=True)
+        self._restart_thread.start()
+        return True
+
+    def _finish_restart(self, workers: list[WorkerProcess], started: float):
+        """Swaps in the new processes once ready, then drains the old ones (runs on its own thread)."""
+        if not self._wait_for_ready(workers, started):
+            for worker in workers:
+                self._forget(worker)
+            if not self._stop_event.is_set():
+                self._log_queue.put("Restart failed; the previous server keeps serving.")
+            return
+        with self._workers_lock:
+            if self._stop_event.is_set():
+                return # Stopped while the new processes were starting; stop() retires them
+            old_workers = [worker for worker in self._live if worker not in workers]
+            self._workers = {worker.worker_id: worker for worker in workers} # New connections already go to both; from here on only to the new ones
+            self._failures = {}
+            self._respawn_due = {}
+        self._worker_metrics = {} # Counters start over in the new processes
+        self._metrics = None
+        self._ready.set()
+        retirements = [threading.Thread(target=self._retire, args=(worker, config.SERVER_RESTART_DRAIN_TIMEOUT_S, self._log_queue.put), daemon=True)
+                       for worker in old_workers]
+        for thread in retirements:
+            thread.start()
+        for thread in retirements:
+            thread.join()
+        self._log_queue.put(f"Restart complete (PID: {', '.join(str(worker.pid) for worker in workers)}).")
+
+    def _retire(self, worker: WorkerProcess, drain_timeout: float, log):
+        """Asks a server process to stop accepting and exit once its requests finish; kills it if it overruns."""
+        process = worker.process
+        if process.poll() is None:
+            if worker.connection_id is None or not self._control.send({"type": ipc.MSG_SHUTDOWN, "timeout": drain_timeout}, worker.connection_id):
+                process.terminate() # Not connected (still starting): nothing to drain
+            log(f"Waiting for server process {worker.label} (PID: {worker.pid}) to finish running requests (up to {drain_timeout:g} s)...")
+            try:
+                process.wait(timeout=drain_timeout + 5) # The process enforces the deadline itself; this is the fallback
+                log(f"Server process {worker.label} (PID: {worker.pid}) exited.")
+            except subprocess.TimeoutExpired:
+                log(f"Server process {worker.label} (PID: {worker.pid}) did not exit, killing...")
+                process.kill()
+                process.wait()
+        self._forget(worker)
+
+    def _forget(self, worker: WorkerProcess):
+        with self._workers_lock:
+            self._live = [w for w in self._live if w is not worker]
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Blocks until the server reports its socket is listening; False if it exited, missed the ready timeout or `timeout` passed."""
+        self._start_finished.wait(timeout)
+        return self._ready.is_set()
 
     def stop(self):
         self._stop_process()
         self._cleanup_process_resources() # Clean up resources
+        self._exit_status = None
         self.is_running = False
         self._log("Server stopped.")
 
     def _stop_process(self):
-        """Attempts to terminate/kill the server subprocess."""
-        if self.server_process and self.server_process.poll() is None:
-            self._log(f"Attempting to stop server process (PID: {self.server_process.pid})....")
+        """Lets every server process finish running requests briefly, then terminates/kills it."""
+        live = [worker for worker in self._live if worker.process.poll() is None]
+        if live:
+            self._log(f"Attempting to stop server process (PID: {', '.join(str(worker.pid) for worker in live)})....")
             try:
-                self._stop_event.set()
-                self.server_process.terminate()
-                try:
-                    self.server_process.wait(timeout=5) # Wait a few seconds for graceful exit
-                    self._log("Server terminated gracefully.")
-                except subprocess.TimeoutExpired:
-                    self._log("Server did not terminate gracefully, killing...")
-                    self.server_process.kill() # Force kill
-                    self.server_process.wait() # Wait for kill to complete
-                    self._log("Server killed.")
+                with self._workers_lock:
+                    self._stop_event.set() # Also stops the supervisor and a restart in progress from swapping processes in
+                retirements = [threading.Thread(target=self._retire, args=(worker, config.SERVER_STOP_DRAIN_TIMEOUT_S, self._log_queue.put), daemon=True)
+                               for worker in live] # In parallel: each gets the full drain time
+                for thread in retirements:
+                    thread.start()
+                for thread in retirements:
+                    thread.join()
+                self.process_log_queue()
+                self._log("Server stopped gracefully.")
             except Exception as e:
                 self._log(f"Error during server process termination: {e}")
-        elif self.server_process and self.server_process.poll() is not None:
-             self._log(f"Server process was already stopped (Exit Code: {self.server_process.poll()}).")
+        elif self._workers:
+             self._stop_event.set()
+             self._log(f"Server process was already stopped (Exit Code: {self.server_process.poll() if self.server_process else '?'}).")
         else:
              self._log("Server process reference is null or not running.")
 
 
     def _cleanup_process_resources(self):
         """Cleans up subprocess and related thread references."""
-        self.server_process = None
-        self._stdout_reader_thread = None
-        self._stderr_reader_thread = None
+        if self._listen_socket is not None:
+            self._listen_socket.close() # Only now does the port stop accepting connections
+            self._listen_socket = None
+        self._workers = {}
+        self._live = []
+        self._startup_thread = None
+        self._supervisor_thread = None
 
     def get_status(self) -> str:
-        """Returns the current status string (e.g., 'Running', 'Stopped', 'Exited')."""
-        if self.server_process is not None and self.server_process.poll() is None:
-             return "Running"
-        elif self.server_process is not None and self.server_process.poll() is not None:
-             return f"Exited ({self.server_process.poll()})"
+        """Returns the current status string (e.g., 'Starting', 'Running', 'Stopped', 'Exited')."""
+        workers = list(self._workers.values())
+        if not workers:
+             return self._exit_status or "Stopped"
+        alive = [worker for worker in workers if worker.process.poll() is None]
+        if any(worker.ready.is_set() for worker in alive):
+             return "Running" # Also while a crashed process waits for its restart
+        elif alive or self._respawn_due:
+             return "Starting"
         else:
-             return "Stopped"
+             return f"Exited ({workers[0].process.poll()})"
 
     def get_served_folder(self) -> Path:
         """Returns the path to the folder currently configured to be served."""
         return self._served_folder_path
 
     def set_served_folder(self, folder_path: Path):
-        """Sets the folder path to be used the *next* time the server starts."""
-        if self.is_running:
-             self._log("Cannot change folder while server is running. Stop server first.")
-             return False
+        """Sets the folder served at /; a running server switches over without a restart."""
         if not folder_path.is_dir():
              self._log(f"Error: Selected path is not a valid directory: {folder_path}")
              return False
 
         self._served_folder_path = folder_path
-        self._log(f"Served folder set to: {self._served_folder_path}. Restart server to apply.")
+        self._push_mounts()
+        self._log(f"Served folder set to: {self._served_folder_path}.")
+        return True
+
+    def get_mounts(self) -> dict[str, Path]:
+        """Returns the named mounts: {name: folder}, served at /m/<name>/."""
+        return dict(self._mounts)
+
+    def add_mount(self, name: str, folder_path: Path) -> bool:
+        """Adds a named mount, or repoints an existing one; applied live if the server is running."""
+        if not re.fullmatch(config.MOUNT_NAME_PATTERN, name):
+             self._log(f"Error: Invalid mount name '{name}' (use letters, digits, '-' and '_').")
+             return False
+        if not folder_path.is_dir():
+             self._log(f"Error: Selected path is not a valid directory: {folder_path}")
+             return False
+        self._mounts = {**self._mounts, name: folder_path} # Replaced, never mutated: a reader thread may be sending it
+        self._push_mounts()
+        self._log(f"Mount '{name}' set to: {folder_path} (/m/{name}/).")
+        return True
+
+    def remove_mount(self, name: str) -> bool:
+        """Removes a named mount; downloads already running from it are not interrupted."""
+        if name not in self._mounts:
+             self._log(f"Error: No mount named '{name}'.")
+             return False
+        self._mounts = {n: folder for n, folder in self._mounts.items() if n != name}
+        self._push_mounts()
+        self._log(f"Mount '{name}' removed.")
         return True
 
-    def _read_pipe_thread(self, pipe, pipe_name, queue, stop_event):
+    def _mount_folders(self) -> dict[str, str]:
+        return {"": str(self._served_folder_path), **{name: str(folder) for name, folder in self._mounts.items()}}
+
+    def _push_mounts(self):
+        """Sends the whole folder table to the running server (no-op while stopped; start() passes it on)."""
+        with self._state_lock:
+            self._control.send({"type": ipc.MSG_MOUNTS, "folders": self._mount_folders()})
+
+    def get_engine(self) -> tuple[str, int, int]:
+        """Returns the configured serving engine, worker thread count and process count."""
+        return self._engine, self._worker_threads, self._processes
+
+    def set_engine(self, engine: str, worker_threads: int, processes: int | None = None):
+        """Sets the serving engine used the next time the server starts or restarts."""
+        if engine not in config.SERVER_ENGINES:
+             self._log(f"Error: Unknown server engine: {engine}")
+             return False
+        if worker_threads < 1:
+             self._log(f"Error: Worker thread count must be at least 1 (got {worker_threads}).")
+             return False
+        if processes is not None and processes < 1:
+             self._log(f"Error: Process count must be at least 1 (got {processes}).")
+             return False
+
+        self._engine = engine
+        self._worker_threads = worker_threads
+        if processes is not None:
+             self._processes = processes
+        return True
+
+    def _read_pipe_thread(self, pipe, pipe_name, queue, stop_event, label):
         """Dedicated thread function to read from a single subprocess pipe."""
         try:
             while not stop_event.is_set():
@@ -165,14 +471,14 @@ class ServerManager:
                      encoding = sys.stderr.encoding if pipe_name == 'stderr' else sys.stdout.encoding
                      line = line_bytes.decode(encoding or 'utf-8', errors='replace').strip()
                      if line:
-                         queue.put(f"[{pipe_name.upper()}] {line}")
+                         queue.put(f"[{pipe_name.upper()}] [{label}] {line}")
                  except Exception as decode_error:
-                     queue.put(f"[{pipe_name.upper()}] Error decoding line: {decode_error}")
+                     queue.put(f"[{pipe_name.upper()}] [{label}] Error decoding line: {decode_error}")
 
         except ValueError:
              pass
         except Exception as e:
-             queue.put(f"[{pipe_name.upper()}] Unexpected error reading pipe: {e}")
+             queue.put(f"[{pipe_name.upper()}] [{label}] Unexpected error reading pipe: {e}")
         finally:
              try:
                  pipe.close()
@@ -194,11 +500,110 @@ class ServerManager:
             self._log(msg) # Gunakan metode _log yang memanggil callback GUI
 
 
-    def get_connected_ips_from_log(self) -> set[str]:
-        """Reads and returns unique connected IPs from the log file using file_utils."""
-        return file_utils.get_connected_ips(config.CONNECTED_IPS_LOG_PATH)
+    def _worker_for(self, connection_id: int) -> WorkerProcess | None:
+        return next((worker for worker in self._live if worker.connection_id == connection_id), None)
+
+    def _on_control_message(self, connection_id: int, message: dict):
+        """Handles a message from a server process (runs on a control channel reader thread)."""
+        message_type = message.get("type")
+        if message_type == ipc.MSG_METRICS:
+            worker = self._worker_for(connection_id)
+            if worker is not None and self._workers.get(worker.worker_id) is worker: # Not a draining or starting process
+                self._worker_metrics = {**self._worker_metrics, worker.pid: message["snapshot"]}
+                self._metrics = None # Merged again on the next read
+        elif message_type == ipc.MSG_CLIENT:
+            ip = message["ip"]
+            if ip not in self._seen_clients: # Each process reports its own first request from the client
+                self._seen_clients.add(ip)
+                self._log_queue.put(f"[IPC] New client: {ip}")
+        elif message_type == ipc.MSG_HELLO:
+            pid = message.get("pid")
+            worker = next((w for w in self._live if w.pid == pid), None)
+            if worker is not None:
+                worker.connection_id = connection_id
+            with self._state_lock: # Changes made after this reach it as regular updates
+                self._control.send({"type": ipc.MSG_STATE, "limits": self._rate_limits, "folders": self._mount_folders(),
+                                    "uploads": self._uploads_enabled, "entries": self._blocklist_entries}, connection_id)
+        elif message_type == ipc.MSG_READY:
+            pid = message.get("pid")
+            worker = next((w for w in self._live if w.pid == pid), None)
+            if worker is not None:
+                worker.connection_id = connection_id
+                worker.ready.set()
+            self._log_queue.put(f"[IPC] Server ready ({worker.label if worker else '?'}, PID: {pid}).")
+        elif message_type == ipc.MSG_DRAINED:
+            worker = self._worker_for(connection_id)
+            self._log_queue.put(f"[IPC] Server drained ({worker.label if worker else '?'}), no requests in flight.")
+        elif message_type == ipc.MSG_DISCONNECTED:
+            worker = self._worker_for(connection_id)
+            self._log_queue.put(f"[IPC] Server closed the control channel ({worker.label if worker else '?'}).")
+
+    def get_metrics(self) -> dict | None:
+        """Returns the latest metrics ({"routes": ..., "clients": ...}) summed over all server processes, or None."""
+        if not self.is_running:
+            return None
+        snapshot = self._metrics
+        if snapshot is None and self._worker_metrics:
+            snapshot = self._metrics = merge_snapshots(self._worker_metrics.values())
+        return snapshot
+
+    def get_connected_ips(self) -> set[str]:
+        """Returns unique client IPs seen since the server started."""
+        snapshot = self.get_metrics()
+        return set(snapshot["clients"]) if snapshot else set()
+
+    def get_client_stats(self) -> dict[str, tuple[int, int, float]]:
+        """Returns {ip: (requests, bytes, last_seen)} for clients seen since the server started."""
+        snapshot = self.get_metrics()
+        if not snapshot:
+            return {}
+        return {ip: (client["requests"], client["bytes"], client["last_seen"]) for ip, client in snapshot["clients"].items()}
+
+    def push_blocklist(self, entries=None) -> bool:
+        """Sends the blocklist file (or the given entries) to every server process so it applies immediately."""
+        with self._state_lock:
+            if entries is None:
+                entries = file_utils.get_blocked_ips(config.BLOCKED_IPS_FILE_PATH)
+                self._blocklist_entries = None # Processes started later read the same file
+            else:
+                self._blocklist_entries = sorted(entries)
+            return self._control.send({"type": ipc.MSG_BLOCKLIST, "entries": sorted(entries)}) > 0
+
+    def get_rate_limits(self) -> dict[str, tuple[float, float]]:
+        """Returns {route: (requests per second, burst)}; "*" is the per-IP budget across routes."""
+        return dict(self._rate_limits)
+
+    def set_rate_limit(self, route: str, rate: float, burst: float) -> bool:
+        """Changes one limit (rate 0 disables it) and applies it to the running server immediately."""
+        if rate < 0 or burst < 1:
+            self._log(f"Error: Invalid rate limit for {route}: rate must be >= 0 and burst >= 1.")
+            return False
+        with self._state_lock:
+            self._rate_limits = {**self._rate_limits, route: (rate, burst)} # Replaced, never mutated: a reader thread may be sending it
+            self._control.send({"type": ipc.MSG_RATE_LIMITS, "limits": self._rate_limits})
+        self._log(f"Rate limit for {route}: {rate:g} requests/s, burst {burst:g}.")
+        return True
+
+    def get_uploads_enabled(self) -> bool:
+        return self._uploads_enabled
+
+    def set_uploads_enabled(self, enabled: bool):
+        """Allows or refuses uploads; applied to the running server immediately."""
+        with self._state_lock:
+            self._uploads_enabled = bool(enabled)
+            self._control.send({"type": ipc.MSG_UPLOADS, "enabled": self._uploads_enabled})
+        self._log(f"Uploads {'enabled' if enabled else 'disabled'}.")
+
+    def reload_server(self) -> bool:
+        """Asks the server to reread the blocklist and rescan the served folder."""
+        return self._control.send({"type": ipc.MSG_RELOAD}) > 0
+
+    def drain_server(self) -> bool:
+        """Asks the server to stop taking new requests; it reports back once idle."""
+        return self._control.send({"type": ipc.MSG_DRAIN}) > 0
 
     def shutdown(self):
         """Performs a full shutdown sequence."""
         self.stop() # Stop the server process and signals its reader threads
+        self._control.close()
         self._log("ServerManager shut down complete.")
\ No newline at end of file
@@ -29,7 +29,7 @@ class ServerControlApp(ctk.CTk):
         self._initialize_files()
 
  
-        saved_folder_path = file_utils.load_served_folder_setting(config.SERVED_FOLDER_SETTING_PATH)
+        saved_folder_path, saved_mounts = file_utils.load_mounts_setting(config.MOUNTS_SETTING_PATH, config.SERVED_FOLDER_SETTING_PATH)
 
  
         initial_served_folder = saved_folder_path if saved_folder_path else config.DEFAULT_SERVE_PATH
@@ -38,6 +38,7 @@ class ServerControlApp(ctk.CTk):
         self.server_manager = ServerManager(
             served_folder_path=initial_served_folder, # Gunakan jalur yang dimuat/default
             log_callback=self._append_log_message, # Pass method to handle logs
+            mounts=saved_mounts,
         )
 
  
@@ -49,7 +50,7 @@ class ServerControlApp(ctk.CTk):
         self.status_frame = StatusFrame(self, server_manager=self.server_manager)
         self.status_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
-        self.stats_frame = StatsFrame(self)
+        self.stats_frame = StatsFrame(self, server_manager=self.server_manager)
         self.stats_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
 
  
@@ -58,6 +59,8 @@ class ServerControlApp(ctk.CTk):
 
         self.log_frame = LogFrame(self)
         self.log_frame.grid(row=3, column=0, padx=10, pady=10, sticky="nsew")
+        if saved_folder_path and not config.MOUNTS_SETTING_PATH.is_file():
+            self._save_mounts_setting() # One-time migration from served_folder.txt
 
  
  
@@ -77,9 +80,8 @@ class ServerControlApp(ctk.CTk):
             file_utils.ensure_dirs_exist(config.LOG_DIR)
 
  
-            file_utils.ensure_file_exists(config.CONNECTED_IPS_LOG_PATH)
+            file_utils.ensure_file_exists(config.ACCESS_LOG_PATH)
             file_utils.ensure_file_exists(config.BLOCKED_IPS_FILE_PATH)
-            file_utils.ensure_file_exists(config.SERVED_FOLDER_SETTING_PATH) # <--- Pastikan file pengaturan ada
 
  
             file_utils.ensure_dirs_exist(config.DEFAULT_SERVE_PATH)
@@ -91,21 +93,22 @@ class ServerControlApp(ctk.CTk):
  
 
  
-    def _save_served_folder_setting(self, folder_path: Path):
-        """Saves the current served folder path using file utilities."""
-        file_utils.save_served_folder_setting(config.SERVED_FOLDER_SETTING_PATH, folder_path)
+    def _save_mounts_setting(self):
+        """Saves the served folder and the named mounts using file utilities."""
+        file_utils.save_mounts_setting(config.MOUNTS_SETTING_PATH, self.server_manager.get_served_folder(), self.server_manager.get_mounts())
  
-        self._append_log_message(f"[GUI] Saved served folder setting: {folder_path}")
+        self._append_log_message(f"[GUI] Saved served folders setting: {config.MOUNTS_SETTING_PATH}")
 
 
     def _append_log_message(self, message: str):
-        """Callback method to receive log messages from ServerManager and update GUI."""
-        self.after(0, self.log_frame.append_log, message)
+        """Callback method to receive log messages from ServerManager; shown on the next log tick."""
+        self.log_frame.append_log(message)
 
 
     def _schedule_log_queue_processing(self):
         """Schedules the periodic processing of the ServerManager's log queue."""
         self.server_manager.process_log_queue()
+        self.log_frame.flush() # One textbox insert per tick, however many lines arrived
         self.after(config.LOG_QUEUE_CHECK_INTERVAL_MS, self._schedule_log_queue_processing)
 
 
@@ -1,26 +1,58 @@
 import customtkinter as ctk
+import ipaddress
+import math
+import time
 import tkinter
 import tkinter.messagebox
+from tkinter import ttk
 import config
 from common import file_utils
+from common.blocklist import Blocklist
 from core.server_manager import ServerManager # Diperlukan untuk type hinting dan memanggil metodenya
 
+COLUMNS = ("ip", "status", "requests", "bytes", "last_seen")
+ALL_ROUTES_LABEL = "All routes (per IP)" # Shown for the "*" rate limit
+HEADINGS = {"ip": "IP Address", "status": "Status", "requests": "Requests", "bytes": "Bytes", "last_seen": "Last Seen"}
+
+
+def _ip_sort_key(ip: str):
+    try:
+        address = ipaddress.ip_address(ip.split('%', 1)[0])
+        return (address.version, int(address))
+    except ValueError:
+        return (9, 0)
+
+
 class DeviceFrame(ctk.CTkFrame):
     def __init__(self, master, server_manager: ServerManager, **kwargs):
         super().__init__(master, **kwargs)
         self.server_manager = server_manager # Need manager to get connected IPs
+        self._blocklist = Blocklist(config.BLOCKED_IPS_FILE_PATH, recheck_interval=math.inf) # Re-stat once per refresh in update_list, reparse only on change
+        self._rows: dict[str, tuple[int, int, float, bool]] = {} # ip -> (requests, bytes, last_seen, blocked) as shown
+        self._sort_column = "last_seen"
+        self._sort_reverse = True # Most recently active first
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
-        self.grid_rowconfigure(1, weight=1) # Allow listbox to expand
-
-        ctk.CTkLabel(self, text="Logged Connections (Since Server Start)", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="w")
-        self.device_listbox = tkinter.Listbox(self, height=8, bg="#2D2D2D", fg="white", borderwidth=0, highlightthickness=0, selectbackground="#1F6AA5", selectforeground="white", selectmode=tkinter.EXTENDED) # Allow extended selection
-        self.device_listbox.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
-
-        self.list_scrollbar = ctk.CTkScrollbar(self, command=self.device_listbox.yview)
+        self.grid_rowconfigure(1, weight=1) # Allow the device list to expand
+
+        ctk.CTkLabel(self, text="Logged Connections (Since Server Start)", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.summary_label = ctk.CTkLabel(self, text="Server stopped.")
+        self.summary_label.grid(row=0, column=1, padx=5, pady=5, sticky="e")
+
+        style = ttk.Style(self)
+        style.configure("Device.Treeview", background="#2D2D2D", fieldbackground="#2D2D2D", foreground="white", borderwidth=0)
+        style.map("Device.Treeview", background=[("selected", "#1F6AA5")], foreground=[("selected", "white")])
+        self.device_tree = ttk.Treeview(self, columns=COLUMNS, show="headings", height=8, selectmode="extended", style="Device.Treeview")
+        for column in COLUMNS:
+            self.device_tree.heading(column, text=HEADINGS[column], command=lambda c=column: self._sort_by(c))
+            self.device_tree.column(column, width=150 if column == "ip" else 90, anchor="w" if column in ("ip", "status") else "e", stretch=True)
+        self.device_tree.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+        self.device_tree.bind("<<TreeviewSelect>>", lambda _: self._update_buttons())
+
+        self.list_scrollbar = ctk.CTkScrollbar(self, command=self.device_tree.yview)
         self.list_scrollbar.grid(row=1, column=2, padx=(0,5), pady=5, sticky='ns')
-        self.device_listbox.configure(yscrollcommand=self.list_scrollbar.set)
+        self.device_tree.configure(yscrollcommand=self.list_scrollbar.set)
 
         self.block_button = ctk.CTkButton(self, text="Block Selected", command=self._block_selected, state="disabled")
         self.block_button.grid(row=2, column=0, padx=5, pady=5, sticky="ew")
@@ -28,14 +60,24 @@ class DeviceFrame(ctk.CTkFrame):
         self.unblock_button = ctk.CTkButton(self, text="Unblock Selected", command=self._unblock_selected, state="disabled")
         self.unblock_button.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
 
+        limit_row = ctk.CTkFrame(self, fg_color="transparent")
+        limit_row.grid(row=3, column=0, columnspan=2, padx=5, pady=(0, 5), sticky="ew")
+        ctk.CTkLabel(limit_row, text="Rate limit:").grid(row=0, column=0, padx=(0, 5), sticky="w")
+        self.limit_route_menu = ctk.CTkOptionMenu(limit_row, values=[ALL_ROUTES_LABEL if r == "*" else r for r in config.RATE_LIMIT_ROUTES], width=170, command=lambda _: self._show_rate_limit())
+        self.limit_route_menu.grid(row=0, column=1, padx=(0, 5), sticky="w")
+        self.limit_rate_entry = ctk.CTkEntry(limit_row, width=60)
+        self.limit_rate_entry.grid(row=0, column=2, sticky="w")
+        ctk.CTkLabel(limit_row, text="req/s, burst (per server process)").grid(row=0, column=3, padx=5, sticky="w") # Each process keeps its own buckets
+        self.limit_burst_entry = ctk.CTkEntry(limit_row, width=50)
+        self.limit_burst_entry.grid(row=0, column=4, sticky="w")
+        self.limit_apply_button = ctk.CTkButton(limit_row, text="Apply", width=70, command=self._apply_rate_limit)
+        self.limit_apply_button.grid(row=0, column=5, padx=5, sticky="w")
+        self._show_rate_limit()
+        self._update_headings()
+
     def get_selected_ips(self) -> list[str]:
-        """Gets the raw IP addresses of selected items in the listbox."""
-        selected_indices = self.device_listbox.curselection()
-        selected_ips = []
-        for i in selected_indices:
-            item = self.device_listbox.get(i)
-            selected_ips.append(item.split(" ")[0])
-        return selected_ips
+        """Gets the IP addresses of the selected rows (row ids are the IPs)."""
+        return list(self.device_tree.selection())
 
     def _block_selected(self):
         """Blocks selected IP addresses using file utilities."""
@@ -50,7 +92,8 @@ class DeviceFrame(ctk.CTkFrame):
                 ips_blocked_count += 1
 
         if ips_blocked_count > 0:
-            self.update_ui() # Gunakan metode update_ui untuk refresh listbox
+            self.server_manager.push_blocklist() # Applied by the server right away
+            self.update_ui() # Gunakan metode update_ui untuk refresh daftar
         else:
             tkinter.messagebox.showinfo("Block IP", "Selected IPs are already blocked or an error occurred.")
 
@@ -63,53 +106,123 @@ class DeviceFrame(ctk.CTkFrame):
             return
 
         ips_unblocked_count = 0
+        kept_ranges = False
         for ip in selected_ips:
-             if file_utils.remove_blocked_ip(config.BLOCKED_IPS_FILE_PATH, ip):
-                 ips_unblocked_count += 1
+             entries = file_utils.find_blocking_entries(config.BLOCKED_IPS_FILE_PATH, ip)
+             ranges = [entry for entry in entries if entry != ip]
+             if ranges and not tkinter.messagebox.askyesno(
+                     "Unblock IP", f"{ip} is blocked by the range {', '.join(ranges)}.\n\n"
+                                   "Remove the range? This unblocks every address in it."):
+                 entries = [entry for entry in entries if entry == ip] # Only its own entry; it stays blocked by the range
+                 kept_ranges = True
+             for entry in entries:
+                 if file_utils.remove_blocked_ip(config.BLOCKED_IPS_FILE_PATH, entry):
+                     ips_unblocked_count += 1
 
         if ips_unblocked_count > 0:
-             self.update_ui() # Gunakan metode update_ui untuk refresh listbox
-        else:
+             self.server_manager.push_blocklist()
+             self.update_ui() # Gunakan metode update_ui untuk refresh daftar
+        elif not kept_ranges:
              tkinter.messagebox.showinfo("Unblock IP", "Selected IPs are not currently blocked or an error occurred.")
-    def update_list(self, connected_ips: set[str] | None = None):
-        """Updates the device listbox with current connected IPs."""
-        ips_to_display = self.server_manager.get_connected_ips_from_log()
-
-        current_selection_ips = set(self.get_selected_ips()) # Simpan seleksi saat ini
-        self.device_listbox.delete(0, tkinter.END) # Hapus list saat ini
 
-        if not ips_to_display:
-            if not self.server_manager.is_running:
-                 self.device_listbox.insert(tkinter.END, "Server stopped.")
-            else:
-                 self.device_listbox.insert(tkinter.END, "No connections logged yet.")
-            self.block_button.configure(state="disabled")
-            self.unblock_button.configure(state="disabled")
+    def _selected_limit_route(self) -> str:
+        route = self.limit_route_menu.get()
+        return "*" if route == ALL_ROUTES_LABEL else route
+
+    def _show_rate_limit(self):
+        """Fills the rate/burst entries with the current limit of the selected route."""
+        rate, burst = self.server_manager.get_rate_limits().get(self._selected_limit_route(), (0, 1))
+        for entry, value in ((self.limit_rate_entry, rate), (self.limit_burst_entry, burst)):
+            entry.delete(0, tkinter.END)
+            entry.insert(0, f"{value:g}")
+
+    def _apply_rate_limit(self):
+        """Applies the rate limit entered for the selected route; takes effect without a restart."""
+        try:
+            rate = float(self.limit_rate_entry.get().strip())
+            burst = float(self.limit_burst_entry.get().strip())
+        except ValueError:
+            tkinter.messagebox.showerror("Invalid Rate Limit", "Rate and burst must be numbers.")
             return
-
-        blocked_ips_set = file_utils.get_blocked_ips(config.BLOCKED_IPS_FILE_PATH) # Dapatkan daftar blokir terbaru
-        sorted_ips = sorted(list(ips_to_display)) # Sortir IP untuk tampilan konsisten
-
-        new_selection_indices = []
-        for index, ip in enumerate(sorted_ips):
-            display_text = ip
-            if ip in blocked_ips_set:
-                display_text += " (Blocked)"
-            self.device_listbox.insert(tkinter.END, display_text)
-            if ip in current_selection_ips:
-                 new_selection_indices.append(index)
-        for idx in new_selection_indices:
-            self.device_listbox.select_set(idx)
-        if new_selection_indices:
-            self.device_listbox.see(new_selection_indices[0])
-        if self.server_manager.is_running and len(ips_to_display) > 0:
-             self.block_button.configure(state="normal")
-             self.unblock_button.configure(state="normal")
+        if not self.server_manager.set_rate_limit(self._selected_limit_route(), rate, burst):
+            tkinter.messagebox.showerror("Invalid Rate Limit", "Rate must be 0 (unlimited) or more, and burst at least 1.")
+
+    def _sort_key(self, ip: str):
+        requests, nbytes, last_seen, blocked = self._rows[ip]
+        if self._sort_column == "requests":
+            return requests
+        if self._sort_column == "bytes":
+            return nbytes
+        if self._sort_column == "status":
+            return blocked
+        if self._sort_column == "ip":
+            return _ip_sort_key(ip)
+        return last_seen
+
+    def _sort_by(self, column: str):
+        """Heading click: sorts by the column, toggling direction on a repeated click."""
+        if column == self._sort_column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column = column
+            self._sort_reverse = column != "ip" # Numbers biggest first, addresses ascending
+        self._update_headings()
+        self._apply_sort()
+
+    def _update_headings(self):
+        for column in COLUMNS:
+            arrow = (" ▼" if self._sort_reverse else " ▲") if column == self._sort_column else ""
+            self.device_tree.heading(column, text=HEADINGS[column] + arrow)
+
+    def _apply_sort(self):
+        """Moves only the rows whose position changed; selection and scroll position are kept."""
+        desired = sorted(self._rows, key=self._sort_key, reverse=self._sort_reverse)
+        current = list(self.device_tree.get_children())
+        for index, ip in enumerate(desired):
+            if current[index] != ip:
+                self.device_tree.move(ip, "", index)
+                current.remove(ip)
+                current.insert(index, ip)
+
+    def update_list(self):
+        """Applies inserts, removals and changed rows from the latest client stats."""
+        stats = self.server_manager.get_client_stats() # Pushed by the server over the control channel
+        blocklist_changed = self._blocklist.reload() # One stat() per refresh; every row is rechecked only on change
+
+        order_changed = False
+        for ip in [ip for ip in self._rows if ip not in stats]: # Server restarted
+            del self._rows[ip]
+            self.device_tree.delete(ip)
+        for ip, (requests, nbytes, last_seen) in stats.items():
+            shown = self._rows.get(ip)
+            blocked = self._blocklist.contains(ip) if shown is None or blocklist_changed else shown[3]
+            row = (requests, nbytes, last_seen, blocked)
+            if row == shown:
+                continue
+            values = (ip, "Blocked" if blocked else "Allowed", requests, file_utils.format_bytes(nbytes), time.strftime("%H:%M:%S", time.localtime(last_seen)))
+            self._rows[ip] = row
+            if shown is None:
+                self.device_tree.insert("", tkinter.END, iid=ip, values=values)
+            else:
+                self.device_tree.item(ip, values=values)
+            order_changed = True
+        if order_changed:
+            self._apply_sort()
+
+        if not self.server_manager.is_running:
+            self.summary_label.configure(text="Server stopped.")
+        elif not self._rows:
+            self.summary_label.configure(text="No connections logged yet.")
         else:
-             self.block_button.configure(state="disabled")
-             self.unblock_button.configure(state="disabled")
+            blocked_count = sum(1 for row in self._rows.values() if row[3])
+            self.summary_label.configure(text=f"{len(self._rows)} clients, {blocked_count} blocked")
+        self._update_buttons()
 
+    def _update_buttons(self):
+        state = "normal" if self.server_manager.is_running and self.device_tree.selection() else "disabled"
+        self.block_button.configure(state=state)
+        self.unblock_button.configure(state=state)
 
     def update_ui(self):
          """Called by the main app's periodic update to refresh UI elements."""
-         self.update_list()
\ No newline at end of file
+         self.update_list()
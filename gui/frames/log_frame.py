@@ -1,14 +1,51 @@
+import collections
 import customtkinter as ctk
 import tkinter
+import config
+
+LEVELS = ("All", "Info", "Warning", "Error")
+SOURCES = ("All", "Server", "Control Panel", "IPC")
+
+
+def classify_line(message: str) -> tuple[str, str]:
+    """Returns (source, level) for a log line, judged from its prefix and keywords."""
+    if message.startswith("[STDOUT]") or message.startswith("[STDERR]"):
+        source = "Server"
+    elif message.startswith("[IPC]"):
+        source = "IPC"
+    else:
+        source = "Control Panel" # ServerManager and GUI messages
+    lowered = message.lower()
+    if "error" in lowered or "traceback" in lowered or "exception" in lowered:
+        level = "Error"
+    elif "warning" in lowered:
+        level = "Warning"
+    else:
+        level = "Info"
+    return source, level
+
 
 class LogFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
+        self._pending: collections.deque[str] = collections.deque() # Filled from any thread, drained by flush()
+        self._lines: collections.deque[tuple[str, str, str]] = collections.deque(maxlen=config.LOG_MAX_LINES) # (source, level, text)
+        self._shown_lines = 0 # Lines currently in the textbox
+
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1) # Allow textbox to expand
 
         ctk.CTkLabel(self, text="Server Log Output", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        filter_bar = ctk.CTkFrame(self, fg_color="transparent")
+        filter_bar.grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="e")
+        ctk.CTkLabel(filter_bar, text="Level:").pack(side="left", padx=(0, 2))
+        self.level_menu = ctk.CTkOptionMenu(filter_bar, values=list(LEVELS), width=100, command=lambda _: self._rerender())
+        self.level_menu.pack(side="left", padx=(0, 8))
+        ctk.CTkLabel(filter_bar, text="Source:").pack(side="left", padx=(0, 2))
+        self.source_menu = ctk.CTkOptionMenu(filter_bar, values=list(SOURCES), width=130, command=lambda _: self._rerender())
+        self.source_menu.pack(side="left")
+
         self.log_box = ctk.CTkTextbox(self, wrap="word", state="disabled")
         self.log_box.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
 
@@ -17,12 +54,65 @@ class LogFrame(ctk.CTkFrame):
         self.log_box.configure(yscrollcommand=self.log_scrollbar.set)
 
     def append_log(self, message: str):
-        """Appends a message to the log textbox."""
-        self.log_box.configure(state="normal") # Enable editing
-        self.log_box.insert(tkinter.END, message + "\n")
-        self.log_box.see(tkinter.END) # Scroll to the bottom
-        self.log_box.configure(state="disabled") # Disable editing
+        """Queues a message; it is shown on the next flush(). Safe to call from any thread."""
+        self._pending.append(message)
+
+    def _matches(self, source: str, level: str) -> bool:
+        wanted_level = self.level_menu.get()
+        wanted_source = self.source_menu.get()
+        if wanted_source != "All" and source != wanted_source:
+            return False
+        if wanted_level == "All":
+            return True
+        return LEVELS.index(level) >= LEVELS.index(wanted_level) # "Warning" also shows errors
+
+    def flush(self):
+        """Moves queued messages into the buffer and the textbox with a single insert."""
+        if not self._pending:
+            return
+        count = len(self._pending)
+        if count > config.LOG_MAX_LINES:
+            for _ in range(count - config.LOG_MAX_LINES):
+                self._pending.popleft() # A burst larger than the buffer: only its tail would survive anyway
+            count = config.LOG_MAX_LINES
+        visible = []
+        for _ in range(count):
+            message = self._pending.popleft()
+            source, level = classify_line(message)
+            self._lines.append((source, level, message))
+            if self._matches(source, level):
+                visible.append(message)
+        if visible:
+            self._insert(visible)
+
+    def _insert(self, messages: list[str], replace: bool = False):
+        at_bottom = self.log_box.yview()[1] >= 0.999 # Only follow new output if the user has not scrolled up
+        self.log_box.configure(state="normal")
+        if replace:
+            self.log_box.delete("1.0", tkinter.END)
+            self._shown_lines = 0
+        self.log_box.insert(tkinter.END, "\n".join(messages) + "\n")
+        self._shown_lines += len(messages)
+        excess = self._shown_lines - config.LOG_MAX_LINES
+        if excess >= config.LOG_TRIM_BATCH_LINES or (replace and excess > 0):
+            self.log_box.delete("1.0", f"{excess + 1}.0") # Trim in bulk rather than a line per insert
+            self._shown_lines -= excess
+        self.log_box.configure(state="disabled")
+        if at_bottom or replace:
+            self.log_box.see(tkinter.END)
+
+    def _rerender(self):
+        """Redraws the textbox from the buffer after a filter change."""
+        self.flush()
+        visible = [text for source, level, text in self._lines if self._matches(source, level)]
+        if visible:
+            self._insert(visible, replace=True)
+            return
+        self.log_box.configure(state="normal")
+        self.log_box.delete("1.0", tkinter.END)
+        self.log_box.configure(state="disabled")
+        self._shown_lines = 0
 
     def update_ui(self):
-         """This frame updates only when append_log is called, not on a timer."""
-         pass # No periodic UI updates needed for the log box itself
\ No newline at end of file
+         """This frame updates only when flush is called, not on the slow periodic timer."""
+         pass # Flushed on the log queue tick instead
@@ -2,10 +2,13 @@ import customtkinter as ctk
 import psutil
 import time
 import config
+from common.file_utils import format_bytes
+from common.metrics import histogram_quantile, merge_buckets
 
 class StatsFrame(ctk.CTkFrame):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, server_manager=None, **kwargs):
         super().__init__(master, **kwargs)
+        self.server_manager = server_manager # Source of the server's own /metrics snapshot
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
@@ -16,6 +19,16 @@ class StatsFrame(ctk.CTkFrame):
         self.recv_label = ctk.CTkLabel(self, text="Receive: 0.00 Mbps")
         self.recv_label.grid(row=1, column=1, padx=5, pady=2, sticky="w")
 
+        ctk.CTkLabel(self, text="Server Metrics", font=ctk.CTkFont(weight="bold")).grid(row=2, column=0, columnspan=2, padx=5, pady=(8, 2), sticky="w")
+        self.requests_label = ctk.CTkLabel(self, text="Requests: -")
+        self.requests_label.grid(row=3, column=0, padx=5, pady=2, sticky="w")
+        self.latency_label = ctk.CTkLabel(self, text="Latency p50/p95/p99: -")
+        self.latency_label.grid(row=3, column=1, padx=5, pady=2, sticky="w")
+        self.cache_label = ctk.CTkLabel(self, text="File cache: -")
+        self.cache_label.grid(row=4, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        self.talkers_label = ctk.CTkLabel(self, text="Top clients: -", justify="left")
+        self.talkers_label.grid(row=5, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+
         self._last_net_io = psutil.net_io_counters()
         self._last_update_time = time.monotonic()
 
@@ -45,6 +58,49 @@ class StatsFrame(ctk.CTkFrame):
             self.send_label.configure(text="Send: Error")
             self.recv_label.configure(text="Receive: Error")
 
+    def update_metrics(self):
+        """Shows request totals, latency percentiles and top talkers from the server's /metrics."""
+        snapshot = self.server_manager.get_metrics() if self.server_manager else None
+        if not snapshot:
+            self.requests_label.configure(text="Requests: -")
+            self.latency_label.configure(text="Latency p50/p95/p99: -")
+            self.cache_label.configure(text="File cache: -")
+            self.talkers_label.configure(text="Top clients: -")
+            return
+        routes = snapshot["routes"].values()
+        total_requests = sum(route["requests"] for route in routes)
+        total_bytes = sum(route["bytes"] for route in routes)
+        errors = sum(n for route in routes for status, n in route["statuses"].items() if status[:1] in ("4", "5"))
+        self.requests_label.configure(text=f"Requests: {total_requests} ({errors} errors), {format_bytes(total_bytes)} sent")
+
+        buckets = merge_buckets(routes)
+        quantiles = [histogram_quantile(q, buckets) for q in (0.5, 0.95, 0.99)]
+        if quantiles[0] is None:
+            self.latency_label.configure(text="Latency p50/p95/p99: -")
+        else:
+            self.latency_label.configure(text="Latency p50/p95/p99: " + " / ".join(f"{q * 1000:.1f}" for q in quantiles) + " ms")
+
+        cache = snapshot.get("file_cache")
+        if cache:
+            lookups = cache["hits"] + cache["misses"]
+            hit_rate = f"{cache['hits'] / lookups * 100:.0f}%" if lookups else "-"
+            self.cache_label.configure(text=f"File cache: {hit_rate} hits ({cache['hits']} hits, {cache['misses']} misses), "
+                                            f"{cache['entries']} files, {format_bytes(cache['bytes'])} of {format_bytes(cache['max_bytes'])}")
+        else:
+            self.cache_label.configure(text="File cache: off")
+
+        talkers = sorted(snapshot["clients"].items(), key=lambda item: item[1]["bytes"], reverse=True)[:config.METRICS_TOP_TALKERS]
+        if not talkers:
+            self.talkers_label.configure(text="Top clients: -")
+            return
+        lines = []
+        for ip, client in talkers:
+            p95 = histogram_quantile(0.95, client["buckets"])
+            latency = f", p95 {p95 * 1000:.1f} ms" if p95 is not None else ""
+            lines.append(f"{ip}: {format_bytes(client['bytes'])} in {client['requests']} requests{latency}")
+        self.talkers_label.configure(text="Top clients:\n" + "\n".join(lines))
+
     def update_ui(self):
          """Called by the main app's periodic update to refresh UI elements."""
-         self.update_stats()
\ No newline at end of file
+         self.update_stats()
+         self.update_metrics()
\ No newline at end of file
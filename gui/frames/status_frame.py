@@ -38,27 +38,83 @@ class StatusFrame(ctk.CTkFrame):
         self.change_folder_button = ctk.CTkButton(self, text="Change Folder", command=self._change_folder)
         self.change_folder_button.grid(row=1, column=2, padx=5, pady=5)
 
+        engine, worker_threads, processes = self.server_manager.get_engine()
+        ctk.CTkLabel(self, text="Engine:", font=ctk.CTkFont(weight="bold")).grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        engine_row = ctk.CTkFrame(self, fg_color="transparent")
+        engine_row.grid(row=2, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+        self.engine_menu = ctk.CTkOptionMenu(engine_row, values=list(config.SERVER_ENGINES))
+        self.engine_menu.set(engine)
+        self.engine_menu.grid(row=0, column=0, padx=(0, 10), sticky="w")
+        ctk.CTkLabel(engine_row, text="Workers:").grid(row=0, column=1, padx=(0, 5), sticky="w")
+        self.workers_entry = ctk.CTkEntry(engine_row, width=60)
+        self.workers_entry.insert(0, str(worker_threads))
+        self.workers_entry.grid(row=0, column=2, sticky="w")
+        ctk.CTkLabel(engine_row, text="Processes:").grid(row=0, column=3, padx=(10, 5), sticky="w")
+        self.processes_entry = ctk.CTkEntry(engine_row, width=50)
+        self.processes_entry.insert(0, str(processes))
+        self.processes_entry.grid(row=0, column=4, sticky="w")
+        self.restart_button = ctk.CTkButton(engine_row, text="Restart", width=90, command=self._restart_server, state="disabled")
+        self.restart_button.grid(row=0, column=5, padx=(10, 0), sticky="w")
+
+        ctk.CTkLabel(self, text="Mounts:", font=ctk.CTkFont(weight="bold")).grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        mount_row = ctk.CTkFrame(self, fg_color="transparent")
+        mount_row.grid(row=3, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+        mount_row.grid_columnconfigure(0, weight=1)
+        self.mount_menu = ctk.CTkOptionMenu(mount_row, values=["(none)"], dynamic_resizing=False)
+        self.mount_menu.grid(row=0, column=0, padx=(0, 10), sticky="ew")
+        ctk.CTkButton(mount_row, text="Add Mount", width=100, command=self._add_mount).grid(row=0, column=1, padx=(0, 5))
+        self.remove_mount_button = ctk.CTkButton(mount_row, text="Remove Mount", width=110, command=self._remove_mount)
+        self.remove_mount_button.grid(row=0, column=2)
+        self.update_mount_menu()
+
+        ctk.CTkLabel(self, text="Uploads:", font=ctk.CTkFont(weight="bold")).grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        self.uploads_switch = ctk.CTkSwitch(self, text="Allow visitors to upload files", command=self._toggle_uploads)
+        if self.server_manager.get_uploads_enabled():
+            self.uploads_switch.select()
+        self.uploads_switch.grid(row=4, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+
  
  
 
 
     def _toggle_server(self):
         """Handles the server on/off button click."""
-        if self.server_manager.is_running:
+        if self.server_manager.get_status() in ("Running", "Starting"): # Matches the button label
             self.server_manager.stop()
         else:
+            if not self._apply_engine_settings():
+                 return
+            if self.server_manager.is_running:
+                 self.server_manager.stop() # Leftovers of a server that exited
             if self.server_manager.start():
                  pass # GUI will update via periodic calls
             else:
                  pass # GUI will update via periodic calls on immediate failure
 
-    def _change_folder(self):
-        """Opens a dialog to select a new folder to serve."""
-        if self.server_manager.is_running:
-            tkinter.messagebox.showwarning("Server Running", "Please stop the server before changing the folder.")
-            return
+    def _restart_server(self):
+        """Restarts with the chosen engine settings; running downloads finish on the old process."""
+        if self._apply_engine_settings():
+            self.server_manager.restart_server()
+
+    def _apply_engine_settings(self) -> bool:
+        """Passes the engine, worker count and process count chosen in the GUI to the manager."""
+        try:
+            worker_threads = int(self.workers_entry.get().strip())
+            processes = int(self.processes_entry.get().strip())
+        except ValueError:
+            tkinter.messagebox.showerror("Invalid Workers", "Worker and process counts must be whole numbers.")
+            return False
+        if not self.server_manager.set_engine(self.engine_menu.get(), worker_threads, processes):
+            tkinter.messagebox.showerror("Invalid Engine Settings", "Check the engine, worker count and process count (must be at least 1).")
+            return False
+        return True
+
+    def _toggle_uploads(self):
+        """Turns uploads on or off; a running server applies it right away."""
+        self.server_manager.set_uploads_enabled(bool(self.uploads_switch.get()))
 
- 
+    def _change_folder(self):
+        """Opens a dialog to select a new folder to serve; a running server switches over live."""
         initial_dir = str(self.server_manager.get_served_folder().parent)
         new_folder_str = tkinter.filedialog.askdirectory(initialdir=initial_dir, title="Select Folder to Serve")
 
@@ -67,12 +123,40 @@ class StatusFrame(ctk.CTkFrame):
  
             if self.server_manager.set_served_folder(resolved_new_folder):
  
-                 self.master._save_served_folder_setting(resolved_new_folder) # <--- Panggil metode simpan
+                 self.master._save_mounts_setting() # <--- Panggil metode simpan
  
                  self.update_folder_label()
- 
-                 if hasattr(self.master, 'device_frame') and self.master.device_frame:
-                      self.master.device_frame.update_list(["Change folder selected. Restart server."])
+
+    def _add_mount(self):
+        """Asks for a folder and a name, then serves the folder at /m/<name>/ (live if running)."""
+        new_folder_str = tkinter.filedialog.askdirectory(initialdir=str(self.server_manager.get_served_folder().parent), title="Select Folder to Mount")
+        if not new_folder_str:
+            return
+        folder = Path(new_folder_str).resolve()
+        dialog = ctk.CTkInputDialog(text=f"Name for {folder} (letters, digits, '-' and '_'; served at /m/<name>/):", title="Add Mount")
+        name = (dialog.get_input() or "").strip()
+        if not name:
+            return
+        if self.server_manager.add_mount(name, folder):
+            self.master._save_mounts_setting()
+            self.update_mount_menu(select=name)
+        else:
+            tkinter.messagebox.showerror("Invalid Mount", "Use a name of letters, digits, '-' and '_' and an existing folder.")
+
+    def _remove_mount(self):
+        name = self.mount_menu.get()
+        if name not in self.server_manager.get_mounts():
+            return
+        if self.server_manager.remove_mount(name):
+            self.master._save_mounts_setting()
+            self.update_mount_menu()
+
+    def update_mount_menu(self, select: str | None = None):
+        """Refills the mount menu from the manager."""
+        names = sorted(self.server_manager.get_mounts())
+        self.mount_menu.configure(values=names or ["(none)"])
+        self.mount_menu.set(select if select in names else (names[0] if names else "(none)"))
+        self.remove_mount_button.configure(state="normal" if names else "disabled")
 
 
     def update_status(self):
@@ -80,18 +164,18 @@ class StatusFrame(ctk.CTkFrame):
         status = self.server_manager.get_status()
         self.status_label.configure(text=status)
 
-        if status == "Running":
-            self.status_label.configure(text_color="green")
-            self.toggle_button.configure(text="Turn Off Server", state="normal")
-            self.change_folder_button.configure(state="disabled")
+        if status in ("Running", "Starting"):
+            self.status_label.configure(text_color="green" if status == "Running" else "goldenrod")
+            self.toggle_button.configure(text="Turn Off Server", state="normal") # Also cancels a start in progress
+            self.restart_button.configure(state="normal" if status == "Running" else "disabled") # Engine changes apply on restart
         elif status.startswith("Exited"):
              self.status_label.configure(text_color="orange")
              self.toggle_button.configure(text="Turn On Server", state="normal")
-             self.change_folder_button.configure(state="normal")
+             self.restart_button.configure(state="disabled")
         else: # Stopped
             self.status_label.configure(text_color="red")
             self.toggle_button.configure(text="Turn On Server", state="normal")
-            self.change_folder_button.configure(state="normal")
+            self.restart_button.configure(state="disabled")
 
     def update_folder_label(self):
          """Updates the served folder label from the manager."""
@@ -4,6 +4,7 @@ echo Menginstall paket-paket...
 pip install customtkinter
 pip install psutil
 pip install flask
+pip install waitress
 
 echo Selesai!
 pause
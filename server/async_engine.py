@@ -0,0 +1,326 @@
+import asyncio
+import io
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+WRITE_HIGH_WATER = 256 * 1024 # Per-connection send buffer before the writer waits for the client
+READ_LIMIT = 64 * 1024 # Per-connection StreamReader buffer, also the request head limit (431 beyond)
+BODY_CHUNK_SIZE = 64 * 1024
+NO_BODY_STATUSES = (204, 304)
+
+
+class FileWrapper:
+    """wsgi.file_wrapper that lets the engine hand whole files to loop.sendfile()."""
+
+    def __init__(self, filelike, block_size: int = BODY_CHUNK_SIZE):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        while True:
+            chunk = self.filelike.read(self.block_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        close = getattr(self.filelike, "close", None)
+        if close is not None:
+            close()
+
+
+class _BodyReader(io.RawIOBase):
+    """Blocking wsgi.input for the worker thread, fed from the connection's StreamReader."""
+
+    def __init__(self, loop, reader: asyncio.StreamReader, content_length: int | None, chunked: bool, timeout: float):
+        super().__init__()
+        self._loop = loop
+        self._reader = reader
+        self._remaining = 0 if chunked else content_length or 0 # Bytes left in the body (or the current chunk)
+        self._chunked = chunked
+        self._timeout = timeout # A client that sends nothing for this long is treated as gone
+        self._done = not chunked and not content_length
+        self.broken = False # Body ended early (stall, disconnect, bad chunk framing): the connection cannot be reused
+
+    def readable(self):
+        return True
+
+    def _await(self, coro):
+        return asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro, self._timeout), self._loop).result()
+
+    async def _next_chunk_size(self):
+        line = await self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ValueError("truncated chunk size line")
+        size_field = line.split(b';', 1)[0].strip()
+        if not size_field or size_field.strip(b"0123456789abcdefABCDEF"):
+            raise ValueError("malformed chunk size")
+        size = int(size_field, 16)
+        if size == 0:
+            while (await self._reader.readline()).strip(): # Discard trailers
+                pass
+        return size
+
+    def readinto(self, buffer) -> int:
+        if self._done:
+            return 0
+        try:
+            return self._read_body(buffer)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            self._done = self.broken = True # The app sees the body end early, like a client that went away
+            return 0
+
+    def _read_body(self, buffer) -> int:
+        if self._chunked and self._remaining == 0:
+            self._remaining = self._await(self._next_chunk_size())
+            if self._remaining == 0:
+                self._done = True
+                return 0
+        data = self._await(self._reader.read(min(len(buffer), self._remaining)))
+        if not data:
+            self._done = self.broken = True # Client went away mid-body
+            return 0
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            if not self._chunked:
+                self._done = True
+            elif self._await(self._reader.readexactly(2)) != b"\r\n": # CRLF after each chunk
+                raise ValueError("chunk not followed by CRLF")
+        return len(data)
+
+    def drain(self):
+        """Consumes whatever the application left unread so the next request parses cleanly."""
+        while self.readinto(bytearray(BODY_CHUNK_SIZE)):
+            pass
+
+
+class AsyncWSGIServer:
+    """HTTP/1.1 server on asyncio that runs a WSGI app in a small thread pool.
+
+    Connections (idle keep-alive or slow readers) live on the event loop and cost only
+    their buffers; a worker thread is used only while the application itself runs or
+    produces the next body chunk. Whole files are pushed with loop.sendfile().
+    """
+
+    def __init__(self, app, host: str, port: int, threads: int, backlog: int, idle_timeout: float):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+        self.connection_count = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.Server | None = None
+
+    def _build_environ(self, method, target, version, headers, peer, body):
+        path, _, query = target.partition('?')
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(path, "latin-1"), # PEP 3333: PATH_INFO is bytes decoded as latin-1
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": peer[0] if peer else "",
+            "REMOTE_PORT": str(peer[1]) if peer else "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BufferedReader(body),
+            "wsgi.input_terminated": True, # The reader stops at the end of the body, even a chunked one
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": FileWrapper,
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            if key == "CONTENT_TYPE" or key == "CONTENT_LENGTH":
+                environ[key] = value
+            else:
+                key = "HTTP_" + key
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def _read_request_head(self, reader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+        except asyncio.LimitOverrunError:
+            return "too_large"
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            return "bad_request"
+        headers = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                return "bad_request"
+            headers.append((name.strip(), value.strip()))
+        return method, target, version, headers
+
+    async def _write_simple(self, writer, status: int):
+        phrase = HTTPStatus(status).phrase
+        body = f"{status} {phrase}\n".encode()
+        writer.write(f"HTTP/1.1 {status} {phrase}\r\nContent-Type: text/plain\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        peer = writer.get_extra_info("peername")
+        self.connection_count += 1
+        try:
+            while True:
+                request = await self._read_request_head(reader)
+                if request is None:
+                    break
+                if request == "too_large":
+                    await self._write_simple(writer, 431)
+                    break
+                if request == "bad_request":
+                    await self._write_simple(writer, 400)
+                    break
+                if not await self._handle_request(loop, reader, writer, peer, *request):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        except Exception as e:
+            print(f"Error handling connection from {peer}: {e}", file=sys.stderr)
+        finally:
+            self.connection_count -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _handle_request(self, loop, reader, writer, peer, method, target, version, headers) -> bool:
+        """Runs one request through the app; returns True if the connection can be reused."""
+        header_map = {name.lower(): value for name, value in headers}
+        codings = [coding.strip().lower() for name, value in headers if name.lower() == "transfer-encoding"
+                   for coding in value.split(",") if coding.strip()]
+        lengths = {value.strip() for name, value in headers if name.lower() == "content-length"}
+        if codings and (lengths or codings[-1] != "chunked"):
+            await self._write_simple(writer, 400) # RFC 9112 6.3: both framings at once, or no chunked at the end, could smuggle a request
+            return False
+        if codings and codings != ["chunked"]:
+            await self._write_simple(writer, 501) # Other transfer codings (gzip, ...) are not decoded
+            return False
+        chunked_body = bool(codings)
+        if len(lengths) > 1 or not all(value.isascii() and value.isdigit() for value in lengths):
+            await self._write_simple(writer, 400) # Conflicting or non-numeric Content-Length
+            return False
+        content_length = int(lengths.pop()) if lengths else 0
+        connection = header_map.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        if header_map.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        body = _BodyReader(loop, reader, content_length, chunked_body, self.idle_timeout)
+        environ = self._build_environ(method, target, version, headers, peer, body)
+        response_start = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            if exc_info and response_start.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start["status"] = status
+            response_start["headers"] = response_headers
+            return lambda data: None # write() callable is not supported, apps return iterables
+
+        result = await loop.run_in_executor(self.executor, self.app, environ, start_response)
+        if body.broken:
+            keep_alive = False # Where the next request starts is unknown
+        try:
+            status = response_start["status"]
+            response_headers = list(response_start["headers"])
+            code = int(status.split(" ", 1)[0])
+            names = {name.lower() for name, _ in response_headers}
+            has_body = method != "HEAD" and code not in NO_BODY_STATUSES and code >= 200
+            chunk_response = has_body and "content-length" not in names and version == "HTTP/1.1"
+            if has_body and "content-length" not in names and not chunk_response:
+                keep_alive = False # HTTP/1.0 without a length: the end of the body is the close
+            if chunk_response:
+                response_headers.append(("Transfer-Encoding", "chunked"))
+            response_headers.append(("Connection", "keep-alive" if keep_alive else "close"))
+            head = f"{version if version in ('HTTP/1.0', 'HTTP/1.1') else 'HTTP/1.1'} {status}\r\n"
+            head += "".join(f"{name}: {value}\r\n" for name, value in response_headers) + "\r\n"
+            writer.write(head.encode("latin-1"))
+            response_start["sent"] = True
+            if has_body:
+                await self._write_body(loop, writer, result, chunk_response, response_headers)
+            await writer.drain()
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+        if keep_alive:
+            await loop.run_in_executor(self.executor, body.drain)
+        return keep_alive and not body.broken
+
+    async def _drain(self, writer):
+        try:
+            await asyncio.wait_for(writer.drain(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("client stopped reading") from None
+
+    async def _write_body(self, loop, writer, result, chunk_response, response_headers):
+        if isinstance(result, FileWrapper) and not chunk_response:
+            content_length = int(next(value for name, value in response_headers if name.lower() == "content-length"))
+            fileobj = result.filelike
+            try:
+                await writer.drain() # Flush headers before handing the socket to sendfile
+                await loop.sendfile(writer.transport, fileobj, fileobj.tell(), content_length)
+                return
+            except (AttributeError, io.UnsupportedOperation, TypeError, ValueError):
+                pass # Not a real file, stream it below
+        iterator = iter(result)
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None) # Blocking reads stay off the loop
+            if chunk is None:
+                break
+            if not chunk:
+                continue
+            if chunk_response:
+                writer.write(b"%x\r\n" % len(chunk) + chunk + b"\r\n")
+            else:
+                writer.write(chunk)
+            await self._drain(writer) # Backpressure: wait while the client is slower than the disk
+        if chunk_response:
+            writer.write(b"0\r\n\r\n")
+
+    async def serve_forever(self, sock: socket.socket | None = None, on_ready=None):
+        if sock is None:
+            server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=self.backlog, limit=READ_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle_connection, sock=sock, backlog=self.backlog, limit=READ_LIMIT)
+        self._loop, self._server = asyncio.get_running_loop(), server
+        if on_ready is not None:
+            on_ready()
+        await self._loop.create_future() # Serves until the process exits; stop_accepting() only closes the listener
+
+    def stop_accepting(self):
+        """Closes the listening socket (thread-safe); open connections keep being served."""
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def serve(server: AsyncWSGIServer, sock: socket.socket | None = None, on_ready=None):
+    """Runs the server on its own event loop until interrupted."""
+    try:
+        asyncio.run(server.serve_forever(sock=sock, on_ready=on_ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown(wait=False)
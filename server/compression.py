@@ -0,0 +1,213 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ENCODINGS = {"gzip": (31, ".gz"), "deflate": (15, ".zz")} # zlib wbits and sidecar suffix per content-coding
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml", "application/xhtml+xml",
+    "application/x-ndjson", "application/sql", "application/rtf", "image/svg+xml",
+)
+STALE_TMP_S = 3600 # Half-written variants older than this were left by a process that died
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Picks gzip or deflate from an Accept-Encoding header, honouring q-values.
+
+    "*" only covers codings the header does not name, so "gzip;q=0, *" still refuses gzip.
+    """
+    if not accept_encoding:
+        return None
+    listed: dict[str, float] = {} # Coding -> q-value given explicitly
+    wildcard_q = 0.0
+    for item in accept_encoding.split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        if name == '*':
+            wildcard_q = q
+        else:
+            listed[name] = q
+    best, best_q = None, 0.0
+    for candidate in ENCODINGS: # gzip first: preferred on ties
+        q = listed.get(candidate, wildcard_q)
+        if q > best_q:
+            best, best_q = candidate, q
+    return best
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding][0])
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionCache:
+    """Bounded on-disk cache of precompressed file variants, keyed by file identity.
+
+    A miss schedules compression in the background and the caller serves the identity
+    body meanwhile, so each file version is compressed once rather than per request.
+    The directory is shared by every server process: the size budget is enforced on a
+    scan of it, recency is the files' mtime, and variants made by another process are
+    picked up on lookup.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, level: int = 6):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.level = level
+        self._lru: OrderedDict[str, int] = OrderedDict() # Variant file name -> size, oldest first
+        self._total_bytes = 0
+        self._pending: set[str] = set()
+        self._incompressible: set[str] = set() # Versions that did not shrink; never retried
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compress")
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._rescan()
+        except OSError as e:
+            print(f"Error preparing compression cache {self.cache_dir}: {e}", file=sys.stderr)
+
+    def _rescan(self, prefix: str | None = None, replaced: str | None = None):
+        """Rebuilds the index from the directory and evicts the least recently used variants over budget.
+
+        replaced names a variant just stored: other versions of that file (same prefix and coding) are deleted.
+        """
+        suffix = os.path.splitext(replaced)[1] if replaced is not None else None
+        now = time.time()
+        existing = []
+        with os.scandir(self.cache_dir) as iterator:
+            for dir_entry in iterator:
+                try:
+                    st = dir_entry.stat()
+                    if dir_entry.name.endswith(".tmp"):
+                        if now - st.st_mtime > STALE_TMP_S:
+                            os.unlink(dir_entry.path) # Left over from an interrupted compression
+                        continue
+                    if replaced is not None and dir_entry.name != replaced and dir_entry.name.startswith(prefix) and dir_entry.name.endswith(suffix):
+                        os.unlink(dir_entry.path) # Older version of the same file
+                        continue
+                except OSError:
+                    continue # Removed by another process meanwhile
+                existing.append((st.st_mtime, dir_entry.name, st.st_size))
+        existing.sort()
+        total = sum(size for _, _, size in existing)
+        while total > self.max_bytes and existing:
+            _, name, size = existing.pop(0)
+            total -= size
+            try:
+                os.unlink(self.cache_dir / name)
+            except OSError:
+                pass # Gone already, or open on Windows
+        with self._lock:
+            self._lru = OrderedDict((name, size) for _, name, size in existing)
+            self._total_bytes = total
+
+    @staticmethod
+    def _variant_name(st: os.stat_result, encoding: str) -> tuple[str, str]:
+        prefix = f"{st.st_dev:x}-{st.st_ino:x}-" # Same source file, any version
+        digest = hashlib.sha1(f"{st.st_size}-{st.st_mtime_ns}".encode()).hexdigest()[:16]
+        return prefix, f"{prefix}{digest}{ENCODINGS[encoding][1]}"
+
+    def lookup(self, source_path: Path, st: os.stat_result, encoding: str) -> Path | None:
+        """Returns the cached variant for this exact file version, scheduling it on a miss."""
+        prefix, name = self._variant_name(st, encoding)
+        path = self.cache_dir / name
+        with self._lock:
+            known = name in self._lru
+            if known:
+                self._lru.move_to_end(name)
+        if not known:
+            try:
+                size = path.stat().st_size # Made by another server process
+            except OSError:
+                size = None
+            if size is not None:
+                with self._lock:
+                    self._lru[name] = size
+                    self._total_bytes += size
+                known = True
+        if known:
+            try:
+                os.utime(path) # Recency as every process's eviction sees it
+            except OSError:
+                pass
+            with self._lock:
+                self.hits += 1
+            return path
+        with self._lock:
+            self.misses += 1
+            if name in self._pending or name in self._incompressible:
+                return None
+            self._pending.add(name)
+        self._executor.submit(self._compress, Path(source_path), st, encoding, prefix, name)
+        return None
+
+    def forget(self, path: Path):
+        """Drops a variant that turned out to be gone (evicted by another process); the next lookup recompresses it."""
+        with self._lock:
+            self._total_bytes -= self._lru.pop(Path(path).name, 0)
+
+    def _compress(self, source_path: Path, st: os.stat_result, encoding: str, prefix: str, name: str):
+        target = self.cache_dir / name
+        tmp_path = None
+        try:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[encoding][0])
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{name}.", suffix=".tmp") # Never shared with another process
+            tmp_path = Path(tmp_path)
+            with open(source_path, "rb") as src, open(fd, "wb") as dst:
+                current = os.fstat(src.fileno())
+                if (current.st_ino, current.st_size, current.st_mtime_ns) != (st.st_ino, st.st_size, st.st_mtime_ns):
+                    return # Source changed since the request; the next request schedules the new version
+                while True:
+                    chunk = src.read(256 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(compressor.compress(chunk))
+                dst.write(compressor.flush())
+            size = tmp_path.stat().st_size
+            if size >= st.st_size:
+                with self._lock:
+                    if len(self._incompressible) > 10000:
+                        self._incompressible.clear()
+                    self._incompressible.add(name)
+                return # Does not compress; not worth caching
+            os.replace(tmp_path, target)
+            self._rescan(prefix, name)
+        except Exception as e:
+            print(f"Error compressing {source_path}: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+            if tmp_path is not None:
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._lru), "bytes": self._total_bytes, "hits": self.hits, "misses": self.misses}
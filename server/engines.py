@@ -0,0 +1,84 @@
+import logging
+import sys
+import threading
+
+try:
+    import waitress
+except ImportError: # waitress is optional, the threaded engine falls back to the debug server
+    waitress = None
+
+
+# Every engine calls on_ready() once its listening socket is bound, before serving the first request.
+# Given `sock` (an already listening socket, e.g. inherited from ServerManager), engines serve it instead of binding.
+
+_stop_accepting = None # Set by the running engine, see stop_accepting()
+
+
+def stop_accepting() -> bool:
+    """Stops the running engine from accepting connections; connections already open keep being served.
+
+    A newer server process sharing the listening socket then gets every new connection.
+    Returns False if no engine is running.
+    """
+    if _stop_accepting is None:
+        return False
+    _stop_accepting()
+    return True
+
+
+def run_debug(app, host: str, port: int, on_ready=None, sock=None):
+    """Runs Flask's development server (single process, unbounded threads, no keep-alive)."""
+    global _stop_accepting
+    from werkzeug.serving import make_server
+    print(f"Starting Flask server on http://{host}:{port} (engine: debug)", file=sys.stderr)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno() if sock is not None else None) # What app.run() uses, minus the reloader
+    stopped = threading.Event()
+
+    def stop():
+        stopped.set()
+        server.shutdown() # Ends the accept loop; request threads carry on
+    _stop_accepting = stop
+    if on_ready is not None:
+        on_ready()
+    try:
+        server.serve_forever()
+        if stopped.is_set():
+            threading.Event().wait() # Open requests finish on their threads; the process exits once they are done
+    except KeyboardInterrupt:
+        pass
+
+
+def run_asyncio(app, host: str, port: int, threads: int, backlog: int, idle_timeout: float, on_ready=None, sock=None):
+    """Runs the app on the asyncio engine: thousands of idle or slow connections in one process."""
+    global _stop_accepting
+    from server import async_engine
+    print(f"Starting Flask server on http://{host}:{port} (engine: asyncio, {threads} app threads, backlog {backlog})", file=sys.stderr)
+    server = async_engine.AsyncWSGIServer(app, host, port, threads, backlog, idle_timeout)
+    _stop_accepting = server.stop_accepting
+    async_engine.serve(server, sock=sock, on_ready=on_ready)
+
+
+def run_threaded(app, host: str, port: int, threads: int, backlog: int, channel_timeout: int, connection_limit: int, on_ready=None, sock=None):
+    """Runs the app on waitress: a bounded worker pool behind an async I/O loop with keep-alive."""
+    global _stop_accepting
+    if waitress is None:
+        print("Warning: 'waitress' is not installed (pip install waitress). Falling back to the debug engine.", file=sys.stderr)
+        run_debug(app, host, port, on_ready=on_ready, sock=sock)
+        return
+    print(f"Starting Flask server on http://{host}:{port} (engine: threaded, {threads} workers, backlog {backlog})", file=sys.stderr)
+    logging.basicConfig() # As waitress.serve() does, so its warnings reach stderr
+    listen = {"sockets": [sock]} if sock is not None else {"host": host, "port": port} # waitress refuses both at once
+    server = waitress.create_server(
+        app,
+        **listen,
+        threads=threads, # Requests are handled by this many worker threads; idle keep-alive sockets cost no thread
+        backlog=backlog,
+        channel_timeout=channel_timeout, # Idle connections (including keep-alive) are closed after this many seconds
+        connection_limit=connection_limit,
+        ident="HostingFolderPython",
+    )
+    server.print_listen("Serving on http://{}:{}")
+    _stop_accepting = lambda: setattr(server, "accepting", False) # The I/O loop stops polling the listener, channels keep running
+    if on_ready is not None:
+        on_ready()
+    server.run()
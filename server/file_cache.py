@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class CachedFile(NamedTuple):
+    body: bytes
+    etag: str
+    mtime: float # Source st_mtime, for Last-Modified and If-Modified-Since
+    encoding: str | None # Content-Encoding of body (a precompressed variant), None for the file itself
+    version: tuple # (size, mtime_ns, inode) of the source file as the file index knows it
+
+
+class FileCache:
+    """Byte-budgeted in-memory cache of small, frequently requested file bodies.
+
+    Every request is counted in a small frequency table (halved as it fills, so old
+    popularity fades). A file is admitted once it has been asked for admit_after times,
+    and only if it is at least as popular as the least recently used entries it would
+    evict. Hits are checked against the file index's size/mtime/inode instead of the
+    disk, so serving one costs no filesystem call.
+    """
+
+    def __init__(self, max_bytes: int, max_file_size: int, admit_after: int = 2, max_tracked: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size # Larger files are always streamed from disk
+        self.admit_after = admit_after
+        self.max_tracked = max_tracked # Frequency table size before it is aged
+        self._entries: OrderedDict[tuple, CachedFile] = OrderedDict() # Least recently used first
+        self._frequency: dict[tuple, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0 # Admissions refused because the entries they would evict were more popular
+
+    def _count_locked(self, key: tuple) -> int:
+        count = self._frequency.get(key, 0) + 1
+        self._frequency[key] = count
+        if len(self._frequency) > self.max_tracked:
+            self._frequency = {k: n // 2 for k, n in self._frequency.items() if n > 1}
+        return count
+
+    def get(self, key: tuple, version: tuple) -> CachedFile | None:
+        """Returns the cached body for key if it is still the version the index reports."""
+        with self._lock:
+            self._count_locked(key)
+            item = self._entries.get(key)
+            if item is not None and item.version != version:
+                self._remove_locked(key) # Changed on disk since it was cached
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def wants(self, key: tuple, size: int) -> bool:
+        """True if a body of this size requested as key should be read into the cache now."""
+        if size > self.max_file_size or size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                return False
+            frequency = self._frequency.get(key, 0)
+            if frequency < self.admit_after:
+                return False
+            needed = self._bytes + size - self.max_bytes
+            for victim in self._entries: # Oldest first, as put() would evict them
+                if needed <= 0:
+                    break
+                if self._frequency.get(victim, 0) > frequency:
+                    self.rejected += 1
+                    return False
+                needed -= len(self._entries[victim].body)
+            return True
+
+    def put(self, key: tuple, item: CachedFile):
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = item
+            self._bytes += len(item.body)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove_locked(self, key: tuple):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item.body)
+
+    def invalidate(self, scope, rel_paths):
+        """Drops every cached body of the given paths within scope (e.g. after a file index change)."""
+        rel_paths = set(rel_paths)
+        if not rel_paths:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scope and key[1] in rel_paths]:
+                self._remove_locked(key)
+
+    def drop_scope(self, scope):
+        """Drops everything cached for scope (e.g. a mount that was removed)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scope]:
+                self._remove_locked(key)
+            self._frequency = {k: n for k, n in self._frequency.items() if k[0] != scope}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "rejected": self.rejected}
@@ -5,9 +5,32 @@ script_dir = Path(__file__).parent.resolve()
 project_root = script_dir.parent.resolve()
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
-from flask import Flask, render_template_string, send_from_directory, request, abort
-import threading # Needed for server's internal IP logging set
-from common.file_utils import get_blocked_ips, get_connected_ips, clear_connected_ips_log
+from flask import Flask, Response, jsonify, request, abort, g
+import time
+import io
+import ipaddress
+import json
+import math
+import socket
+import threading
+from urllib.parse import quote
+from common.file_utils import clear_access_log
+from common.access_log import AccessLogWriter
+from common.blocklist import Blocklist
+from common.metrics import MetricsRegistry, render_cache_stats
+from common import ipc
+from common.file_index import normalize_rel_path
+from common import http_utils
+from server import engines
+from server.zip_stream import iter_zip
+from server.rate_limit import RateLimiter
+from server.mounts import PRIMARY, MountTable
+from server.uploads import UploadError
+from server.search import normalize_extension
+from server.compression import CompressionCache, choose_encoding, compress_bytes, is_compressible
+from server.file_cache import CachedFile, FileCache
+from server.listing import SORT_KEYS, ListingPages, ListingViews, decode_cursor, encode_cursor, page
+from werkzeug.wsgi import ClosingIterator, wrap_file
 import config
 script_dir_server = Path(__file__).parent.resolve() # This is the 'server' directory
 project_root_server = script_dir_server.parent.resolve() # This is the project root
@@ -17,9 +40,6 @@ if folder_name == config.DEFAULT_FOLDER_NAME:
     FILE_DIR = (project_root_server / folder_name).resolve()
 else:
     FILE_DIR = (config.BASE_DIR / folder_name).resolve()
-config.LOG_DIR.mkdir(parents=True, exist_ok=True)
-config.CONNECTED_IPS_LOG_PATH.touch(exist_ok=True)
-config.BLOCKED_IPS_FILE_PATH.touch(exist_ok=True)
 if not FILE_DIR.exists() and folder_name == config.DEFAULT_FOLDER_NAME:
     try:
         FILE_DIR.mkdir(parents=True, exist_ok=True)
@@ -36,98 +56,625 @@ if not FILE_DIR.is_dir():
 print(f"Flask server attempting to serve files from: {FILE_DIR}", file=sys.stderr)
 
 app = Flask(__name__)
-logged_ips_session = set()
-ip_log_lock = threading.Lock() # Protect access to logged_ips_session and the log file append
-
-def server_log_ip(ip_address):
-    """Logs unique IP addresses *for this server instance's session* to a file."""
-    with ip_log_lock:
-        if ip_address not in logged_ips_session:
-            logged_ips_session.add(ip_address)
+blocklist = Blocklist(config.BLOCKED_IPS_FILE_PATH, recheck_interval=config.BLOCKLIST_RECHECK_INTERVAL_S)
+file_cache = FileCache(config.FILE_CACHE_MAX_BYTES, config.FILE_CACHE_MAX_FILE_SIZE, config.FILE_CACHE_ADMIT_AFTER) if config.FILE_CACHE_MAX_BYTES > 0 else None
+mounts = MountTable(file_cache) # The primary folder at / plus named folders at /m/<name>/, changed live over the control channel
+try:
+    named_mounts = json.loads(os.environ.get(config.MOUNTS_ENV_VAR) or "{}")
+except ValueError:
+    print(f"Error: Invalid {config.MOUNTS_ENV_VAR}, serving only {FILE_DIR}.", file=sys.stderr)
+    named_mounts = {}
+mounts.apply({PRIMARY: str(FILE_DIR), **named_mounts})
+compression_cache = CompressionCache(config.COMPRESSION_CACHE_DIR, config.COMPRESSION_CACHE_MAX_BYTES, config.COMPRESSION_LEVEL) if config.COMPRESSION_ENABLED else None
+access_log = AccessLogWriter(config.ACCESS_LOG_PATH, config.ACCESS_LOG_MAX_BYTES, config.ACCESS_LOG_BACKUP_COUNT, config.ACCESS_LOG_FLUSH_INTERVAL_S)
+metrics = MetricsRegistry(max_clients=config.METRICS_MAX_CLIENTS)
+rate_limiter = RateLimiter(config.RATE_LIMITS, sweep_interval=config.RATE_LIMIT_SWEEP_INTERVAL_S)
+control = ipc.ControlClient.from_environ() # Channel to ServerManager, connected in __main__; None when run standalone
+draining = threading.Event() # Set by a drain message: new requests get 503
+stopping = threading.Event() # Set by a shutdown message: no new connections, exit once idle
+idle = threading.Event() # Set whenever no request is in flight
+idle.set()
+state_received = threading.Event() # Set once the manager's startup state is applied
+uploads_enabled = config.UPLOAD_ENABLED # Switched live over the control channel
+in_flight = 0 # Requests from the start of the app call until the server closes the response body
+in_flight_lock = threading.Lock()
+
+
+def request_finished():
+    global in_flight
+    with in_flight_lock:
+        in_flight -= 1
+        now_idle = in_flight == 0
+        if now_idle:
+            idle.set()
+    if now_idle and draining.is_set() and control is not None:
+        control.send({"type": ipc.MSG_DRAINED})
+
+def track_in_flight(wsgi_app):
+    """Counts each request until its body has been sent (or the client dropped), not just until the view returns."""
+    def tracked_app(environ, start_response):
+        global in_flight
+        with in_flight_lock:
+            in_flight += 1
+            idle.clear()
+        try:
+            body = wsgi_app(environ, start_response)
+        except BaseException:
+            request_finished()
+            raise
+        close = getattr(body, "close", None)
+
+        def close_and_finish():
             try:
-                with open(config.CONNECTED_IPS_LOG_PATH, "a", encoding="utf-8") as f:
-                    f.write(f"{ip_address}\n")
-            except Exception as e:
-                print(f"Error writing to IP log {config.CONNECTED_IPS_LOG_PATH}: {e}", file=sys.stderr)
+                if close is not None:
+                    close()
+            finally:
+                request_finished()
+        try:
+            body.close = close_and_finish # Same object back: the engines spot file wrappers by type to send files efficiently
+        except AttributeError:
+            return ClosingIterator(body, request_finished) # Lists and the like
+        return body
+    return tracked_app
+
+app.wsgi_app = track_in_flight(app.wsgi_app)
 
 
+@app.before_request
+def begin_request():
+    """Starts the request clock; refuses new work while draining."""
+    g.request_started = time.perf_counter() # record_request accounts every request, blocked ones included
+    if draining.is_set():
+        return Response("Server is shutting down.\n", 503, {"Retry-After": "1"}, content_type="text/plain")
+
 @app.before_request
 def check_blocklist_and_log_ip():
     """Check if IP is blocked before processing any request and log access."""
     client_ip = request.remote_addr
-    server_log_ip(client_ip) # Log the IP
-    blocked_ips = get_blocked_ips(config.BLOCKED_IPS_FILE_PATH)
-    if client_ip in blocked_ips:
+    if blocklist.contains(client_ip): # Compiled in memory, reloaded only when the file changes
         print(f"Blocked access attempt from: {client_ip}", file=sys.stderr)
         abort(403)
+
+@app.before_request
+def enforce_rate_limit():
+    """Refuses requests beyond the client's per-IP or per-route token bucket with 429."""
+    retry_after = rate_limiter.check(request.remote_addr, request.endpoint)
+    if retry_after:
+        return Response("Too many requests, slow down.\n", 429, {"Retry-After": str(math.ceil(retry_after))}, content_type="text/plain")
+
+@app.after_request
+def record_request(response):
+    """Queues one access record and updates the metrics; registered first so it runs after every other hook."""
+    started = g.get("request_started")
+    duration = time.perf_counter() - started if started is not None else 0.0
+    route = request.endpoint or "-"
+    access_log.log(request.remote_addr, route, request.path, response.status_code, response.content_length, duration * 1000)
+    if metrics.observe(route, request.remote_addr, response.status_code, response.content_length, duration) and control is not None:
+        control.send({"type": ipc.MSG_CLIENT, "ip": request.remote_addr}) # First request from this client
+    return response
 html_template_path = script_dir_server / "main.html" # Path relatif terhadap skrip server
-html_template = "" # Default empty in case of read error
+listing_views = ListingViews(config.LIST_API_MAX_VIEWS) # Sorted folder views behind /api/list paging
+listing_pages = ListingPages(html_template_path, app.jinja_env, config.LISTING_CACHE_MAX_BYTES, config.COMPRESSION_MIN_SIZE, config.COMPRESSION_LEVEL) # Compiled once, each page rendered once per folder change
 
-if not html_template_path.is_file():
-    print(f"Error: Required HTML template not found at {html_template_path}. Cannot start server.", file=sys.stderr)
-    sys.exit(1) # Penting: Exit jika template utama tidak ditemukan
+def get_mount(name):
+    """Returns the mount a request addresses (None is the primary one), aborting with 404 if it does not exist."""
+    mount = mounts.get(name or PRIMARY)
+    if mount is None:
+        abort(404)
+    return mount
 
-try:
-    with open(html_template_path, "r", encoding="utf-8") as f:
-        html_template = f.read()
-        print(f"Using HTML template from {html_template_path}", file=sys.stderr)
-except Exception as e:
-    print(f"Error reading HTML template {html_template_path}: {e}. Cannot start server.", file=sys.stderr)
-    sys.exit(1) # Exit jika gagal membaca template utama
+def not_modified(headers):
+    """Builds an empty 304 response carrying the validators."""
+    return Response(status=304, headers=headers)
+
+def negotiate_encoding():
+    """Returns the content-coding (gzip/deflate) to use for this request, or None."""
+    if not config.COMPRESSION_ENABLED:
+        return None
+    return choose_encoding(request.headers.get("Accept-Encoding"))
+
+@app.after_request
+def compress_response(response):
+    """Compresses in-memory text responses (listing page, error pages) on the fly."""
+    if (not config.COMPRESSION_ENABLED or response.direct_passthrough or response.status_code != 200
+            or "Content-Encoding" in response.headers or not is_compressible(response.mimetype)):
+        return response # Files are streamed and use the precompressed sidecar cache instead
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None or request.method == "HEAD":
+        return response
+    data = response.get_data()
+    if len(data) < config.COMPRESSION_MIN_SIZE:
+        return response
+    response.set_data(compress_bytes(data, encoding, config.COMPRESSION_LEVEL))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+@app.route('/m/<mount>/')
 @app.route('/')
-def index():
+def index(mount=None):
+    current = get_mount(mount)
+    file_index = current.file_index
+    page = request.args.get("page", 1, type=int)
+    generation = file_index.generation # Changes only when the served folder changes
+    encoding = negotiate_encoding() # Pages are stored encoded, the tag must differ per coding
+    uploads = uploads_enabled # Shows the upload bar, so part of the tag and key
+    headers = {
+        "ETag": f'"listing-{current.tag}-{generation:x}-{mounts.version:x}-{page:x}{"-up" if uploads else ""}{"-" + encoding if encoding else ""}"',
+        "Last-Modified": http_utils.http_date(file_index.last_changed),
+        "Cache-Control": "no-cache",
+    }
+    if http_utils.is_not_modified(request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since"), headers["ETag"], file_index.last_changed):
+        return not_modified(headers)
+    key = (current.tag, generation, mounts.version, page, encoding, uploads)
+    cached = listing_pages.get(key)
+    if cached is None:
+        files = [entry.name for entry in file_index.list_dir() if not entry.is_dir] # Served from the in-memory index
+        pages = max(1, math.ceil(len(files) / config.LISTING_PAGE_SIZE))
+        if not 1 <= page <= pages:
+            abort(404)
+        start = (page - 1) * config.LISTING_PAGE_SIZE
+        try:
+            cached = listing_pages.render(key, encoding, files=[(name, quote(name)) for name in files[start:start + config.LISTING_PAGE_SIZE]],
+                                          mount=mount, mounts=mounts.names(), base=f"/m/{mount}" if mount else "",
+                                          page=page, pages=pages, total=len(files), uploads=uploads)
+        except Exception as e:
+            print(f"Error listing files in '{current.root}': {e}", file=sys.stderr)
+            return "Error listing files.", 500
+    body, encoded = cached
+    response = Response(body, 200, headers, content_type="text/html; charset=utf-8")
+    if encoded:
+        response.headers["Content-Encoding"] = encoded # compress_response leaves it alone
+    if config.COMPRESSION_ENABLED:
+        response.vary.add("Accept-Encoding")
+    return response
+
+def lookup_served_file(mount, filename):
+    """Returns the index entry for a requested file, aborting with 404 if it is missing or outside the mount's folder."""
+    rel_path = normalize_rel_path(filename)
+    entry = mount.file_index.lookup(rel_path) if rel_path else None # Only paths inside the mount's folder are ever indexed
+    if entry is None or entry.is_dir:
+        print(f"Attempt to access non-existent or outside file: {filename}", file=sys.stderr)
+        abort(404) # Not Found
+    return entry
+
+def send_served_file(file_path, name, disposition=None, mount=None, entry=None):
+    """Sends a file with conditional GET and byte-range support (single and multipart/byteranges).
+
+    Given the file's mount and index entry, small files requested repeatedly are kept in
+    file_cache and then answered from memory without touching the disk.
+    """
+    content_type = http_utils.guess_mimetype(name)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache", # Clients revalidate, which costs only a 304
+    }
+    if disposition:
+        headers["Content-Disposition"] = http_utils.content_disposition(disposition, name)
+    compressible = compression_cache is not None and is_compressible(content_type)
+
+    cache_key = None
+    if file_cache is not None and entry is not None and entry.size <= file_cache.max_file_size:
+        wanted_encoding = None
+        if compressible and config.COMPRESSION_MIN_SIZE <= entry.size <= config.COMPRESSION_MAX_FILE_SIZE and not request.headers.get("Range"):
+            wanted_encoding = negotiate_encoding() # Same choice as below, so the key names the body this request gets
+        cache_key = (mount.tag, entry.rel_path, wanted_encoding)
+        version = (entry.size, entry.mtime_ns, entry.inode)
+        cached = file_cache.get(cache_key, version)
+        if cached is not None:
+            if compressible and config.COMPRESSION_MIN_SIZE <= entry.size <= config.COMPRESSION_MAX_FILE_SIZE:
+                headers["Vary"] = "Accept-Encoding"
+            if cached.encoding:
+                headers["Content-Encoding"] = cached.encoding
+            return file_body_response(io.BytesIO(cached.body), len(cached.body), cached.etag, cached.mtime, headers, content_type,
+                                      encoded=cached.encoding is not None, body=cached.body)
+
+    if mount is not None and entry is not None:
+        f, st = mount.opener.open(entry.rel_path) # Walked from the mount's root without following symlinks out of it
+    else:
+        f = open(file_path, "rb")
+        st = os.fstat(f.fileno())
     try:
-        files = [f for f in os.listdir(FILE_DIR) if (FILE_DIR / f).is_file()]
-        return render_template_string(html_template, files=files)
-    except FileNotFoundError:
-         print(f"Error: Served directory '{FILE_DIR}' not found during request.", file=sys.stderr)
-         return "Error: Served directory not found.", 500
-    except Exception as e:
-        print(f"Error listing files in '{FILE_DIR}': {e}", file=sys.stderr)
-        return "Error listing files.", 500
+        size = st.st_size # Validators come from the file actually opened
+        etag = http_utils.file_etag(st)
+        encoded = None
+        if compressible and config.COMPRESSION_MIN_SIZE <= size <= config.COMPRESSION_MAX_FILE_SIZE:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate_encoding()
+            if encoding and not request.headers.get("Range"): # Ranges always address the identity body
+                variant_path = compression_cache.lookup(file_path, st, encoding)
+                if variant_path is not None:
+                    try:
+                        variant = open(variant_path, "rb")
+                    except FileNotFoundError:
+                        variant = None # Evicted in the meantime, possibly by another server process
+                        compression_cache.forget(variant_path)
+                    if variant is not None:
+                        f.close()
+                        f = variant
+                        size = os.fstat(f.fileno()).st_size
+                        etag = f'{etag[:-1]}-{encoding}"'
+                        headers["Content-Encoding"] = encoding
+                        encoded = encoding
+        body = None
+        if (cache_key is not None and cache_key[2] == encoded and (st.st_size, st.st_mtime_ns) == (entry.size, entry.mtime_ns)
+                and file_cache.wants(cache_key, size)): # Only the version the index knows, so hits can be checked against it
+            body = f.read(size + 1)
+            f.close()
+            if len(body) == size: # Otherwise it changed while reading: serve what was read, but do not keep it
+                file_cache.put(cache_key, CachedFile(body, etag, st.st_mtime, encoded, version))
+            f = io.BytesIO(body)
+            size = len(body)
+        return file_body_response(f, size, etag, st.st_mtime, headers, content_type, encoded=encoded is not None, body=body)
+    except Exception:
+        f.close()
+        raise
+
+def file_body_response(f, size, etag, mtime, headers, content_type, encoded, body=None):
+    """Answers from an open file (or its bytes in memory, given body): 304, 200, 206 or 416."""
+    headers["ETag"] = etag
+    headers["Last-Modified"] = http_utils.http_date(mtime)
+    if http_utils.is_not_modified(request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since"), etag, mtime):
+        f.close()
+        return not_modified(headers)
+    ranges = None
+    if not encoded and request.method == "GET" and http_utils.if_range_allows(request.headers.get("If-Range"), etag, mtime):
+        ranges = http_utils.parse_range_header(request.headers.get("Range"), size)
 
+    if ranges is None: # No (usable) Range header: full body
+        headers["Content-Length"] = str(size)
+        if body is not None:
+            return Response(body, 200, headers, content_type=content_type, direct_passthrough=True)
+        return Response(wrap_file(request.environ, f, http_utils.CHUNK_SIZE), 200, headers, content_type=content_type, direct_passthrough=True)
+    if not ranges:
+        f.close()
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(b"", 416, headers)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        body = ClosingIterator(http_utils.iter_file_range(f, start, end - start + 1), f.close) # call_on_close is skipped for direct_passthrough
+        return Response(body, 206, headers, content_type=content_type, direct_passthrough=True)
+    boundary = http_utils.new_boundary()
+    headers["Content-Length"] = str(http_utils.multipart_length(boundary, content_type, ranges, size))
+    body = ClosingIterator(http_utils.iter_multipart_ranges(f, boundary, content_type, ranges, size), f.close)
+    return Response(body, 206, headers, content_type=f"multipart/byteranges; boundary={boundary}", direct_passthrough=True)
+
+@app.route('/m/<mount>/open/<path:filename>')
 @app.route('/open/<path:filename>')
-def open_file(filename):
+def open_file(filename, mount=None):
+    current = get_mount(mount)
+    entry = lookup_served_file(current, filename)
     try:
-        requested_path = (FILE_DIR / filename).resolve()
-        if not requested_path.is_file() or not requested_path.is_relative_to(FILE_DIR):
-            print(f"Attempt to access non-existent or outside file: {filename} resolved to {requested_path}", file=sys.stderr)
-            abort(404) # Not Found
-
-        return send_from_directory(FILE_DIR, filename, as_attachment=False)
+        return send_served_file(current.root / entry.rel_path, entry.name, "inline", current, entry) # Ranges let media players seek
     except FileNotFoundError:
-         abort(404)
+         abort(404) # Deleted since the index last saw it
     except Exception as e:
         print(f"Error sending file {filename} for opening: {e}", file=sys.stderr)
         abort(500)
 
+@app.route('/m/<mount>/download/<path:filename>')
 @app.route('/download/<path:filename>')
-def download_file(filename):
+def download_file(filename, mount=None):
+    current = get_mount(mount)
+    entry = lookup_served_file(current, filename)
     try:
-        requested_path = (FILE_DIR / filename).resolve()
-        if not requested_path.is_file() or not requested_path.is_relative_to(FILE_DIR):
-             print(f"Attempt to access non-existent or outside file: {filename} resolved to {requested_path}", file=sys.stderr)
-             abort(404) # Not Found
-
-        return send_from_directory(FILE_DIR, filename, as_attachment=True)
+        return send_served_file(current.root / entry.rel_path, entry.name, "attachment", current, entry) # Ranges let interrupted downloads resume
     except FileNotFoundError:
-         abort(404)
+         abort(404) # Deleted since the index last saw it
     except Exception as e:
         print(f"Error sending file {filename} for download: {e}", file=sys.stderr)
         abort(500)
 
+def collect_folder_files(file_index, rel_dir):
+    """Returns every indexed file below rel_dir: each folder's files by name, then its subfolders by name, depth-first."""
+    files, stack = [], [rel_dir]
+    while stack:
+        listing = file_index.list_dir(stack.pop())
+        files.extend(entry for entry in listing if not entry.is_dir) # A folder's own files first, in name order
+        stack.extend(entry.rel_path for entry in reversed(listing) if entry.is_dir) # Reversed so subfolders pop in name order
+    return files
+
+@app.route('/m/<mount>/download-zip', methods=['GET', 'POST'])
+@app.route('/download-zip', methods=['GET', 'POST'])
+def download_zip(mount=None):
+    """Streams a ZIP of a folder (?folder=) or of selected files (files=...) straight to the client."""
+    current = get_mount(mount)
+    file_index = current.file_index
+    folder = request.values.get("folder")
+    selected = request.values.getlist("files")
+    if folder is not None:
+        rel_dir = normalize_rel_path(folder)
+        if rel_dir is None or (rel_dir and not getattr(file_index.lookup(rel_dir), "is_dir", False)):
+            print(f"Attempt to zip non-existent or outside folder: {folder}", file=sys.stderr)
+            abort(404)
+        entries = collect_folder_files(file_index, rel_dir)
+        members = [(e.rel_path, e.rel_path[len(rel_dir) + 1:] if rel_dir else e.rel_path) for e in entries]
+        archive_name = f"{rel_dir.rpartition('/')[2] or current.root.name or 'files'}.zip"
+    elif selected:
+        entries = [lookup_served_file(current, name) for name in dict.fromkeys(selected)] # Same traversal checks as download_file
+        members = [(e.rel_path, e.rel_path) for e in entries]
+        archive_name = "files.zip"
+    else:
+        abort(400)
+    if len(members) > config.ZIP_MAX_FILES:
+        abort(413)
+    headers = {"Content-Disposition": http_utils.content_disposition("attachment", archive_name), "Cache-Control": "no-store"}
+    return Response(iter_zip(members, current.opener.open), 200, headers, content_type="application/zip", direct_passthrough=True)
+
+def upload_session_json(session, status=200):
+    return jsonify(id=session.id, path=session.rel_path, size=session.size, received=session.received(),
+                   missing=session.missing(), chunk_size=config.UPLOAD_CHUNK_SIZE), status
+
+@app.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify(error=e.message), e.status
+
+def require_uploads():
+    if not uploads_enabled:
+        abort(404)
+
+@app.route('/m/<mount>/upload', methods=['POST'])
+@app.route('/upload', methods=['POST'])
+def upload_create(mount=None):
+    """Starts an upload: path and size (and optionally sha256) as JSON or form fields."""
+    require_uploads()
+    uploads = get_mount(mount).uploads
+    params = request.get_json(silent=True) or request.values
+    try:
+        size = int(params.get("size"))
+    except (TypeError, ValueError):
+        abort(400)
+    session = uploads.create(params.get("path"), size, params.get("sha256"))
+    print(f"Upload started: {session.rel_path} ({size} bytes) from {request.remote_addr}", file=sys.stderr)
+    return upload_session_json(session, 201)
+
+@app.route('/m/<mount>/upload/<upload_id>', methods=['GET'])
+@app.route('/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id, mount=None):
+    """Reports received and missing byte ranges so an interrupted upload can resume."""
+    require_uploads()
+    return upload_session_json(get_mount(mount).uploads.get(upload_id))
+
+@app.route('/m/<mount>/upload/<upload_id>', methods=['PUT'])
+@app.route('/upload/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id, mount=None):
+    """Writes the request body at ?offset= (streamed, any order, chunks may run in parallel)."""
+    require_uploads()
+    uploads = get_mount(mount).uploads
+    session = uploads.get(upload_id)
+    try:
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        abort(400)
+    written = uploads.write_chunk(session, offset, request.stream, request.content_length) # Chunked bodies have no length
+    if request.content_length is not None and written < request.content_length:
+        abort(400) # Body ended early; the part that arrived is kept for a retry
+    return upload_session_json(session)
+
+@app.route('/m/<mount>/upload/<upload_id>/finalize', methods=['POST'])
+@app.route('/upload/<upload_id>/finalize', methods=['POST'])
+def upload_finalize(upload_id, mount=None):
+    """Verifies the upload (sha256 if given here or at creation) and moves it into the served folder."""
+    require_uploads()
+    current = get_mount(mount)
+    file_index, uploads = current.file_index, current.uploads
+    session = uploads.get(upload_id)
+    params = request.get_json(silent=True) or request.values
+    target, digest = uploads.finalize(session, params.get("sha256"))
+    parts = session.rel_path.split('/')
+    created = next((i for i in range(1, len(parts)) if file_index.lookup('/'.join(parts[:i])) is None), len(parts)) # Topmost new folder, if any
+    file_index.refresh_path(str(current.root.joinpath(*parts[:created]))) # Listed and searchable right away
+    print(f"Upload finished: {session.rel_path} ({session.size} bytes, sha256 {digest})", file=sys.stderr)
+    return jsonify(path=session.rel_path, size=session.size, sha256=digest)
+
+@app.route('/m/<mount>/upload/<upload_id>', methods=['DELETE'])
+@app.route('/upload/<upload_id>', methods=['DELETE'])
+def upload_discard(upload_id, mount=None):
+    require_uploads()
+    uploads = get_mount(mount).uploads
+    uploads.discard(uploads.get(upload_id))
+    return Response(status=204)
+
+@app.route('/m/<mount>/search')
+@app.route('/search')
+def search_files(mount=None):
+    """Finds files and folders by name or path: ?q=, &mode=substring|prefix, &ext=pdf,txt, &limit=."""
+    current = get_mount(mount)
+    query = request.args.get("q", "")
+    mode = request.args.get("mode", "substring")
+    extensions = [ext for value in request.args.getlist("ext") for ext in value.split(',') if ext.strip()]
+    if mode not in ("substring", "prefix") or (not query.strip() and not extensions):
+        abort(400)
+    try:
+        limit = min(max(int(request.args.get("limit", config.SEARCH_DEFAULT_LIMIT)), 1), config.SEARCH_MAX_LIMIT)
+    except ValueError:
+        abort(400)
+    current.file_index.wait_ready()
+    started = time.perf_counter()
+    total, entries = current.search_index.search(query, mode, extensions, limit)
+    results = [{"name": e.name, "path": e.rel_path, "is_dir": e.is_dir, "size": e.size, "mtime": e.mtime_ns // 1_000_000_000} for e in entries]
+    response = jsonify(query=query, mode=mode, total=total, took_ms=round((time.perf_counter() - started) * 1000, 2), results=results)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/m/<mount>/api/list')
+@app.route('/api/list')
+def list_files(mount=None):
+    """Lists one folder as JSON, a page at a time: ?path=, &sort=name|size|mtime, &order=asc|desc, &type=file|dir, &ext=pdf,txt, &q=, &limit=, &cursor=."""
+    current = get_mount(mount)
+    rel_dir = normalize_rel_path(request.args.get("path", ""))
+    sort = request.args.get("sort", "name")
+    order = request.args.get("order", "asc")
+    kind = request.args.get("type") or None
+    extensions = tuple(sorted({normalize_extension(ext) for value in request.args.getlist("ext") for ext in value.split(',') if ext.strip()}))
+    if sort not in SORT_KEYS or order not in ("asc", "desc") or kind not in (None, "file", "dir"):
+        abort(400)
+    try:
+        limit = min(max(int(request.args.get("limit", config.LIST_API_DEFAULT_LIMIT)), 1), config.LIST_API_MAX_LIMIT)
+        after = decode_cursor(request.args["cursor"], sort, order) if request.args.get("cursor") else None
+    except ValueError:
+        abort(400)
+    if rel_dir is None:
+        abort(404)
+    if rel_dir:
+        entry = current.file_index.lookup(rel_dir)
+        if entry is None or not entry.is_dir:
+            abort(404)
+    entries, keys = listing_views.view(current.tag, current.file_index, rel_dir, sort, kind, extensions, request.args.get("q", ""))
+    items, last = page(entries, keys, after, order == "desc", limit) # Keyset cursor: stays correct when the folder changes between pages
+    response = jsonify(path=rel_dir, sort=sort, order=order, total=len(entries), next_cursor=encode_cursor(sort, order, last) if last is not None else None,
+                       items=[{"name": e.name, "path": e.rel_path, "type": "dir" if e.is_dir else "file", "size": e.size, "mtime": e.mtime_ns // 1_000_000_000} for e in items])
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/metrics')
+def serve_metrics():
+    """Prometheus-style counters and latency histograms, only for clients on this machine."""
+    try:
+        addr = ipaddress.ip_address(request.remote_addr.split('%', 1)[0])
+        local = (getattr(addr, "ipv4_mapped", None) or addr).is_loopback
+    except ValueError:
+        local = False
+    if not local:
+        abort(404) # Per-client data is not for the network at large
+    text = metrics.render_prometheus()
+    if file_cache is not None:
+        text += render_cache_stats("file_cache", file_cache.stats())
+    return Response(text, 200, {"Cache-Control": "no-store"}, content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route('/style.css') # Ubah route dari /web.css menjadi /style.css
 def serve_css():
     css_path = script_dir_server / 'style.css'
     if css_path.is_file():
          print(f"Serving CSS from {css_path}", file=sys.stderr)
-         return send_from_directory(script_dir_server, 'style.css')
+         return send_served_file(css_path, 'style.css')
     else:
          print(f"Error: CSS file not found at {css_path}", file=sys.stderr)
          abort(404)
+def apply_blocklist(message):
+    """Control message: replaces the blocklist without waiting for the file check."""
+    blocklist.load_entries(message["entries"])
+    print(f"Blocklist updated by the control panel ({blocklist.entry_count} entries).", file=sys.stderr)
+
+def apply_rate_limits(message):
+    """Control message: replaces the rate limits live."""
+    rate_limiter.configure({route: tuple(limit) for route, limit in message["limits"].items()})
+    print(f"Rate limits updated: {rate_limiter.limits()}", file=sys.stderr)
+
+def reload_state(message):
+    """Control message: rereads the blocklist file and rescans the served folder."""
+    blocklist.reload(force=True)
+    for mount in mounts.all():
+        mount.file_index.rescan()
+    print("Reloaded blocklist and file indexes.", file=sys.stderr)
+
+def apply_mounts(message):
+    """Control message: adds, removes and repoints served folders without a restart."""
+    added, removed = mounts.apply(message["folders"])
+    for name in added:
+        print(f"Serving {mounts.get(name).root} at /{'m/' + name + '/' if name else ''}", file=sys.stderr)
+    for name in removed:
+        print(f"Mount '{name}' removed.", file=sys.stderr)
+
+def apply_uploads(message):
+    """Control message: allows or refuses uploads; pages rendered after this show or hide the upload bar."""
+    global uploads_enabled
+    uploads_enabled = bool(message["enabled"])
+    print(f"Uploads {'enabled' if uploads_enabled else 'disabled'}.", file=sys.stderr)
+
+def apply_state(message):
+    """Control message: the manager's current settings, applied before the engine accepts connections."""
+    apply_rate_limits(message)
+    apply_mounts(message)
+    apply_uploads(message)
+    if message["entries"] is not None: # Otherwise the blocklist file already loaded is current
+        apply_blocklist(message)
+    state_received.set()
+
+def start_drain(message):
+    """Control message: stops taking new requests and reports back once none are in flight."""
+    draining.set()
+    print("Draining: refusing new requests.", file=sys.stderr)
+    if idle.is_set():
+        control.send({"type": ipc.MSG_DRAINED})
+
+def begin_shutdown(message):
+    """Control message: stops accepting connections (a newer process takes the shared socket), exits once idle."""
+    if stopping.is_set():
+        return
+    stopping.set()
+    engines.stop_accepting()
+    with in_flight_lock:
+        running = in_flight
+    print(f"Stopped accepting connections; finishing {running} running request(s).", file=sys.stderr)
+    threading.Thread(target=exit_when_idle, args=(float(message.get("timeout", config.SERVER_STOP_DRAIN_TIMEOUT_S)),), name="shutdown", daemon=True).start()
+
+def exit_when_idle(timeout):
+    try:
+        if idle.wait(timeout):
+            print("All requests finished, exiting.", file=sys.stderr)
+        else:
+            print(f"Drain timeout ({timeout:g} s) reached with {in_flight} request(s) running, exiting.", file=sys.stderr)
+        access_log.flush(timeout=2.0)
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally: # Also when the manager has stopped reading our output (broken pipe)
+        os._exit(0) # Idle keep-alive connections are dropped; their clients reconnect to the new process
+
+def publish_metrics():
+    """Pushes a metrics snapshot to the manager whenever something changed."""
+    published_version = -1
+    while True:
+        time.sleep(config.METRICS_PUBLISH_INTERVAL_S)
+        if metrics.version != published_version:
+            published_version = metrics.version
+            snapshot = metrics.snapshot()
+            if file_cache is not None:
+                snapshot["file_cache"] = file_cache.stats()
+            if not control.send({"type": ipc.MSG_METRICS, "snapshot": snapshot}):
+                return # Manager is gone
+
+def connect_control_channel():
+    """Connects to ServerManager, if it started us; returns the on_ready callback for the engine."""
+    if control is None:
+        return None
+    control.on(ipc.MSG_BLOCKLIST, apply_blocklist)
+    control.on(ipc.MSG_RELOAD, reload_state)
+    control.on(ipc.MSG_RATE_LIMITS, apply_rate_limits)
+    control.on(ipc.MSG_DRAIN, start_drain)
+    control.on(ipc.MSG_MOUNTS, apply_mounts)
+    control.on(ipc.MSG_SHUTDOWN, begin_shutdown)
+    control.on(ipc.MSG_UPLOADS, apply_uploads)
+    control.on(ipc.MSG_STATE, apply_state)
+    if not control.connect():
+        return None
+    control.send({"type": ipc.MSG_HELLO, "pid": os.getpid()})
+    if not state_received.wait(config.SERVER_STATE_TIMEOUT_S):
+        print(f"No startup state from the control panel within {config.SERVER_STATE_TIMEOUT_S:g} s; serving with the defaults.", file=sys.stderr)
+    threading.Thread(target=publish_metrics, name="metrics-publisher", daemon=True).start()
+    return lambda: control.send({"type": ipc.MSG_READY, "pid": os.getpid()})
+
 if __name__ == '__main__':
-    clear_connected_ips_log(config.CONNECTED_IPS_LOG_PATH)
-    logged_ips_session.clear() # Clear internal set too
+    config.LOG_DIR.mkdir(parents=True, exist_ok=True)
+    if control is None: # ServerManager clears it once per start; its other processes and restarts append
+        clear_access_log(config.ACCESS_LOG_PATH, config.ACCESS_LOG_BACKUP_COUNT)
+    access_log.start() # Writer opens the log only after it has been cleared
+    threading.Thread(target=listing_pages.load, name="template-load", daemon=True).start() # Compiled while the engine binds, not on the first request
 
-    print(f"Starting Flask server on http://{config.SERVER_HOST}:{config.SERVER_PORT}", file=sys.stderr)
-    app.run(host=config.SERVER_HOST, port=config.SERVER_PORT, debug=False)
\ No newline at end of file
+    on_ready = connect_control_channel()
+    listen_fd = os.environ.get(config.LISTEN_FD_ENV_VAR)
+    sock = socket.socket(fileno=int(listen_fd)) if listen_fd else None # Owned by ServerManager and shared across restarts
+    engine = os.environ.get(config.ENGINE_ENV_VAR, config.SERVER_ENGINE)
+    workers = max(1, int(os.environ.get(config.WORKERS_ENV_VAR, config.SERVER_WORKER_THREADS)))
+    if engine == "debug":
+        engines.run_debug(app, config.SERVER_HOST, config.SERVER_PORT, on_ready=on_ready, sock=sock)
+    elif engine == "asyncio":
+        engines.run_asyncio(app, config.SERVER_HOST, config.SERVER_PORT, threads=workers, backlog=config.SERVER_BACKLOG,
+                            idle_timeout=config.SERVER_CHANNEL_TIMEOUT_S, on_ready=on_ready, sock=sock)
+    else:
+        if engine != "threaded":
+            print(f"Warning: Unknown server engine '{engine}', using 'threaded'.", file=sys.stderr)
+        engines.run_threaded(app, config.SERVER_HOST, config.SERVER_PORT, threads=workers, backlog=config.SERVER_BACKLOG,
+                             channel_timeout=config.SERVER_CHANNEL_TIMEOUT_S, connection_limit=config.SERVER_CONNECTION_LIMIT, on_ready=on_ready, sock=sock)
\ No newline at end of file
@@ -0,0 +1,148 @@
+import base64
+import bisect
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from server.compression import compress_bytes
+
+SORT_KEYS = { # Total orders: ties are broken by name, so a cursor always points between two distinct keys
+    "name": lambda e: (e.name.lower(), e.name),
+    "size": lambda e: (e.size, e.name.lower(), e.name),
+    "mtime": lambda e: (e.mtime_ns, e.name.lower(), e.name),
+}
+
+
+class ListingPages:
+    """Renders listing pages from a template compiled once, keeping each rendered page for reuse.
+
+    Pages are keyed by (mount tag, folder generation, mounts version, page, coding, uploads), so a
+    page is rendered (and compressed) once per change of the folder. Rendered pages live in
+    a byte-budgeted LRU; pages of a folder's older generations are dropped as soon as a newer
+    one is stored, since they can never be requested again.
+    """
+
+    def __init__(self, template_path: Path, environment, max_bytes: int, min_compress_size: int, compress_level: int):
+        self.template_path = template_path
+        self._environment = environment # The app's Jinja environment (autoescaping, filters)
+        self.max_bytes = max_bytes
+        self._min_compress_size = min_compress_size
+        self._compress_level = compress_level
+        self._template = None
+        self._pages: OrderedDict[tuple, tuple[bytes, str | None]] = OrderedDict() # Least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Reads and compiles the template if that has not happened yet; returns it."""
+        with self._load_lock:
+            if self._template is None:
+                with open(self.template_path, "r", encoding="utf-8") as f:
+                    self._template = self._environment.from_string(f.read())
+                print(f"Using HTML template from {self.template_path}", file=sys.stderr)
+        return self._template
+
+    def get(self, key: tuple) -> tuple[bytes, str | None] | None:
+        """Returns (body, content-coding) of a page rendered earlier, or None."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def render(self, key: tuple, encoding: str | None, **context) -> tuple[bytes, str | None]:
+        """Renders and stores a page; the body is compressed with encoding unless it is too small."""
+        body = self.load().render(**context).encode("utf-8")
+        if encoding is None or len(body) < self._min_compress_size:
+            encoding = None
+        else:
+            body = compress_bytes(body, encoding, self._compress_level)
+        if len(body) <= self.max_bytes:
+            with self._lock:
+                for stale in [k for k in self._pages if k[0] == key[0] and k[1:3] != key[1:3]]:
+                    self._remove_locked(stale) # Older generation of the same folder
+                self._remove_locked(key)
+                self._pages[key] = (body, encoding)
+                self._bytes += len(body)
+                while self._bytes > self.max_bytes:
+                    self._remove_locked(next(iter(self._pages)))
+        return body, encoding
+
+    def _remove_locked(self, key: tuple):
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self._bytes -= len(page[0])
+
+
+class ListingViews:
+    """Sorted, filtered views of indexed folders for /api/list, kept per folder generation.
+
+    A view is built once with a single sort of the folder's entries; every page after that
+    is a binary search for the cursor and a slice, so paging through a big folder never
+    rescans or resorts it.
+    """
+
+    def __init__(self, max_views: int):
+        self.max_views = max_views
+        self._views: OrderedDict[tuple, tuple[list, list]] = OrderedDict() # Least recently used first
+        self._lock = threading.Lock()
+
+    def view(self, scope, file_index, rel_dir: str, sort: str, kind: str | None, extensions: tuple, query: str) -> tuple[list, list]:
+        """Returns (entries, sort keys) of rel_dir matching the filters, in ascending sort order."""
+        generation = file_index.generation # Read before listing: a change while building only makes the view newer
+        key = (scope, generation, rel_dir, sort, kind, extensions, query)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+        query = query.lower()
+        entries = [e for e in file_index.list_dir(rel_dir)
+                   if (kind is None or e.is_dir == (kind == "dir"))
+                   and (not extensions or (not e.is_dir and os.path.splitext(e.name)[1].lower() in extensions))
+                   and query in e.name.lower()]
+        sort_key = SORT_KEYS[sort]
+        entries.sort(key=sort_key)
+        view = (entries, [sort_key(e) for e in entries])
+        with self._lock:
+            for stale in [k for k in self._views if k[0] == scope and k[1] != generation]:
+                del self._views[stale] # Older generation of the same folder
+            self._views[key] = view
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+
+def page(entries: list, keys: list, after: tuple | None, descending: bool, limit: int) -> tuple[list, tuple | None]:
+    """Returns up to limit entries following the key after, and the key to continue from (None at the end)."""
+    if descending:
+        end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+        start = max(0, end - limit)
+        return entries[start:end][::-1], (keys[start] if start > 0 else None)
+    start = bisect.bisect_right(keys, after) if after is not None else 0
+    end = min(len(keys), start + limit)
+    return entries[start:end], (keys[end - 1] if end < len(keys) else None)
+
+
+def encode_cursor(sort: str, order: str, key: tuple) -> str:
+    data = json.dumps([sort, order, *key], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+    """Returns the sort key a cursor continues from; raises ValueError if it is malformed or for another sort."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError("malformed cursor") from e
+    if not isinstance(data, list) or data[:2] != [sort, order]:
+        raise ValueError("cursor belongs to another sort order")
+    key = tuple(data[2:])
+    expected = (int, str, str) if sort != "name" else (str, str)
+    if len(key) != len(expected) or any(type(value) is not kind for value, kind in zip(key, expected)):
+        raise ValueError("malformed cursor")
+    return key
@@ -0,0 +1,105 @@
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import config
+from common.file_index import FileIndex
+from server.safe_open import SafeOpener
+from server.search import SearchIndex
+from server.uploads import UploadManager
+
+PRIMARY = "" # Name of the mount served at the site root; named mounts live under /m/<name>/
+_PROCESS_TAG = f"{os.getpid():x}-{time.time_ns():x}" # Tells processes and restarts apart
+_mount_counter = itertools.count(1) # Tells mounts of this process apart, however coarse the clock
+
+
+class Mount:
+    """One served folder with its own file index, search index and upload staging area."""
+
+    def __init__(self, name: str, root: Path, file_cache=None):
+        self.name = name
+        self.root = Path(root).resolve()
+        self.tag = f"{_PROCESS_TAG}-{next(_mount_counter):x}" # Unique per mount instance: keeps listing ETags apart across repoints and restarts
+        self.file_index = FileIndex(self.root, poll_interval=config.FILE_INDEX_POLL_INTERVAL_S, resync_interval=config.FILE_INDEX_RESYNC_INTERVAL_S,
+                                    excluded_names=(config.UPLOAD_STAGING_DIR_NAME,)) # Half-uploaded files are never listed or served
+        self.search_index = SearchIndex()
+        self.file_index.add_listener(self.search_index.update) # Registered before start() so it sees the initial scan
+        self.opener = SafeOpener(self.root, config.OPEN_DIR_CACHE_SIZE) # Opens served files without following symlinks out of root
+        self.file_index.add_listener(self.opener.invalidate)
+        self.file_cache = file_cache # Shared by all mounts; entries are keyed by this mount's tag
+        if file_cache is not None:
+            self.file_index.add_listener(self._invalidate_cached)
+        self.uploads = UploadManager(self.root, self.root / config.UPLOAD_STAGING_DIR_NAME, config.UPLOAD_MAX_FILE_SIZE, config.UPLOAD_SESSION_TTL_S,
+                                     max_staged_bytes=config.UPLOAD_STAGING_MAX_BYTES, max_sessions=config.UPLOAD_MAX_SESSIONS)
+
+    def start(self):
+        self.file_index.start() # Built once in the background, kept current by a watcher or polling
+
+    def _invalidate_cached(self, changed, removed):
+        self.file_cache.invalidate(self.tag, [entry.rel_path for entry in changed] + list(removed)) # Frees memory early; hits recheck the version anyway
+
+    def close(self):
+        """Stops index maintenance; requests already holding this mount finish normally."""
+        self.file_index.stop()
+        self.opener.close()
+        if self.file_cache is not None:
+            self.file_cache.drop_scope(self.tag)
+
+
+class MountTable:
+    """Named mounts, swapped whole on every change so request threads never see a half-applied update."""
+
+    def __init__(self, file_cache=None):
+        self._mounts: dict[str, Mount] = {}
+        self._file_cache = file_cache # Handed to every mount
+        self.version = 0 # Bumped on every change; part of the listing ETag since the page links every mount
+        self._lock = threading.Lock() # Serializes changes; lookups read the current dict without locking
+
+    def get(self, name: str) -> Mount | None:
+        return self._mounts.get(name)
+
+    def all(self) -> list[Mount]:
+        return list(self._mounts.values())
+
+    def names(self) -> list[str]:
+        """Named mounts in display order (the primary mount is not included)."""
+        return sorted(name for name in self._mounts if name != PRIMARY)
+
+    def apply(self, folders: dict[str, str]) -> tuple[list[str], list[str]]:
+        """Makes the table match {name: folder}; returns (names added or repointed, names removed).
+
+        Mounts whose folder did not change keep their index. Invalid names and folders are
+        skipped with a message, keeping whatever that name pointed to before.
+        """
+        with self._lock:
+            current = self._mounts
+            mounts, started = {}, []
+            for name, folder in folders.items():
+                existing = current.get(name)
+                if name != PRIMARY and not re.fullmatch(config.MOUNT_NAME_PATTERN, name):
+                    print(f"Error: Invalid mount name '{name}', ignored.", file=sys.stderr)
+                    continue
+                root = Path(folder).resolve()
+                if existing is not None and existing.root == root:
+                    mounts[name] = existing
+                    continue
+                if not root.is_dir():
+                    print(f"Error: Folder '{root}' for mount '{name or '/'}' is not a directory.", file=sys.stderr)
+                    if existing is not None:
+                        mounts[name] = existing
+                    continue
+                mounts[name] = Mount(name, root, self._file_cache)
+                started.append(mounts[name])
+            closed = [mount for name, mount in current.items() if mounts.get(name) is not mount]
+            for mount in started:
+                mount.start()
+            self._mounts = mounts
+            if started or closed:
+                self.version += 1
+        for mount in closed:
+            mount.close()
+        return [mount.name for mount in started], [mount.name for mount in closed if mount.name not in mounts]
@@ -0,0 +1,106 @@
+import threading
+import time
+
+ALL_ROUTES = "*" # Limit key for the per-IP budget shared by every route
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client (or client and route), refilled lazily on access.
+
+    Each active key costs one small list; buckets idle long enough to have refilled
+    completely are indistinguishable from new ones and are dropped by a periodic sweep.
+    """
+
+    def __init__(self, rate: float, burst: float, sweep_interval: float = 30.0):
+        self.rate = rate # Tokens (requests) per second; 0 disables the limit
+        self.burst = burst # Bucket capacity: requests allowed back to back
+        self.sweep_interval = sweep_interval
+        self._buckets: dict[object, list] = {} # key -> [tokens, last_update]
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def configure(self, rate: float, burst: float):
+        with self._lock:
+            self.rate = rate
+            self.burst = burst
+            self._buckets.clear() # Start everyone on a full bucket under the new limits
+
+    def take(self, key) -> float:
+        """Takes one token; returns 0 if allowed, otherwise seconds until a token is available."""
+        rate = self.rate
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if now >= self._next_sweep:
+                self._sweep_locked(now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate # Refused requests cost nothing
+
+    def refund(self, key):
+        """Gives back a token taken by take(), e.g. when another budget refused the request."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)
+
+    def _sweep_locked(self, now: float):
+        rate, burst = self.rate, self.burst
+        for key in [k for k, (tokens, last) in self._buckets.items() if tokens + (now - last) * rate >= burst]:
+            del self._buckets[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Per-IP budget across all routes ("*") plus optional per-route budgets per IP."""
+
+    def __init__(self, limits: dict[str, tuple[float, float]], sweep_interval: float = 30.0):
+        self.sweep_interval = sweep_interval
+        self._limiters: dict[str, TokenBucketLimiter] = {}
+        self.configure(limits)
+
+    def configure(self, limits: dict[str, tuple[float, float]]):
+        """Replaces the limits: {route or "*": (requests per second, burst)}; rate 0 means unlimited."""
+        limiters = {}
+        for route, (rate, burst) in limits.items():
+            limiter = self._limiters.get(route)
+            if limiter is None:
+                limiter = TokenBucketLimiter(float(rate), float(burst), self.sweep_interval)
+            elif (limiter.rate, limiter.burst) != (rate, burst):
+                limiter.configure(float(rate), float(burst))
+            limiters[route] = limiter
+        self._limiters = limiters # Swapped whole; request threads see either the old or the new set
+
+    def limits(self) -> dict[str, tuple[float, float]]:
+        return {route: (limiter.rate, limiter.burst) for route, limiter in self._limiters.items()}
+
+    def check(self, ip: str, route: str | None) -> float:
+        """Returns 0 if the request may proceed, else the Retry-After delay in seconds.
+
+        A request is charged to both budgets or to neither: refused requests never drain
+        the route budget or the IP budget.
+        """
+        limiters = self._limiters
+        route_limiter = limiters.get(route) if route else None
+        if route_limiter is not None:
+            wait = route_limiter.take(ip)
+            if wait:
+                return wait
+        ip_limiter = limiters.get(ALL_ROUTES)
+        wait = ip_limiter.take(ip) if ip_limiter is not None else 0.0
+        if wait and route_limiter is not None:
+            route_limiter.refund(ip) # The IP budget refused it: the route token was never used
+        return wait
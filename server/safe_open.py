@@ -0,0 +1,152 @@
+import errno
+import os
+import stat
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+_DIRECTORY = getattr(os, "O_DIRECTORY", 0)
+_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_NONBLOCK = getattr(os, "O_NONBLOCK", 0) # A FIFO in the folder must not hang the request
+_NOT_FOUND = (errno.ENOENT, errno.ENOTDIR, errno.ELOOP, getattr(errno, "EMLINK", errno.ELOOP)) # EMLINK: O_NOFOLLOW on a symlink (BSD)
+SUPPORTED = bool(os.open in os.supports_dir_fd and _NOFOLLOW and _DIRECTORY) # Linux, macOS, BSD; Windows checks paths instead
+
+
+class _DirHandle:
+    """An open directory, closed once nothing refers to it.
+
+    Requests hold the handle while they open files in it, so dropping it from the cache
+    never closes (and lets the OS reuse) an fd another thread is about to pass to openat.
+    """
+
+    __slots__ = ("fd",)
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __del__(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class SafeOpener:
+    """Opens files below a root one path component at a time with openat and O_NOFOLLOW.
+
+    A symlink or a folder swapped in after the file index looked can therefore never lead
+    outside the root. Directory fds along the way are cached, so opening a file in a folder
+    seen before costs a single openat; entries are dropped when the file index reports
+    those folders changed or removed.
+    """
+
+    def __init__(self, root: Path, max_dirs: int = 64):
+        self.root = Path(root)
+        self._root_str = str(self.root)
+        self.max_dirs = max_dirs
+        self._dirs: OrderedDict[str, _DirHandle] = OrderedDict() # Relative folder ('' is the root) -> handle, least recently used first
+        self._lock = threading.Lock()
+
+    def open(self, rel_path: str):
+        """Opens a normalized relative path for reading; returns (file, stat).
+
+        Raises FileNotFoundError unless it is a regular file inside the root. File symlinks
+        are followed only to targets inside the root, as the file index lists them.
+        """
+        if not SUPPORTED:
+            return self._open_checked_path(rel_path)
+        try:
+            return self._open_beneath(rel_path)
+        except OSError as e:
+            if e.errno not in (errno.ELOOP, getattr(errno, "EMLINK", errno.ELOOP)):
+                raise
+        target = os.path.realpath(os.path.join(self._root_str, rel_path)) # Only reached for symlinked files
+        if target == self._root_str or os.path.commonpath([target, self._root_str]) != self._root_str:
+            raise FileNotFoundError(errno.ENOENT, "Symlink leads outside the served folder", rel_path)
+        try:
+            return self._open_beneath(os.path.relpath(target, self._root_str).replace(os.sep, '/')) # Canonical path: no more symlinks to follow
+        except OSError as e:
+            if e.errno in _NOT_FOUND:
+                raise FileNotFoundError(errno.ENOENT, "Not a file inside the served folder", rel_path) from e
+            raise
+
+    def _open_beneath(self, rel_path: str):
+        rel_dir, _, name = rel_path.rpartition('/')
+        try:
+            directory = self._directory(rel_dir)
+        except OSError as e:
+            if e.errno in _NOT_FOUND:
+                raise FileNotFoundError(errno.ENOENT, "Folder not found inside the served folder", rel_path) from e
+            raise
+        fd = os.open(name, os.O_RDONLY | _NOFOLLOW | _CLOEXEC | _NONBLOCK, dir_fd=directory.fd)
+        return self._regular_file(fd, rel_path)
+
+    def _directory(self, rel_dir: str) -> _DirHandle:
+        with self._lock:
+            handle = self._dirs.get(rel_dir)
+            if handle is not None:
+                self._dirs.move_to_end(rel_dir)
+                return handle
+        if rel_dir:
+            parent_dir, _, name = rel_dir.rpartition('/')
+            handle = _DirHandle(os.open(name, os.O_RDONLY | _DIRECTORY | _NOFOLLOW | _CLOEXEC, dir_fd=self._directory(parent_dir).fd))
+        else:
+            handle = _DirHandle(os.open(self._root_str, os.O_RDONLY | _DIRECTORY | _CLOEXEC))
+        with self._lock:
+            self._dirs[rel_dir] = handle
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        return handle
+
+    @staticmethod
+    def _regular_file(fd: int, rel_path: str):
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise FileNotFoundError(errno.ENOENT, "Not a regular file", rel_path)
+            return os.fdopen(fd, "rb"), st
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def _open_checked_path(self, rel_path: str):
+        """Fallback without openat (Windows): checks the resolved path against the root, then opens it."""
+        target = os.path.realpath(os.path.join(self._root_str, rel_path))
+        if target == self._root_str or os.path.commonpath([target, self._root_str]) != self._root_str:
+            raise FileNotFoundError(errno.ENOENT, "Path leads outside the served folder", rel_path)
+        f = open(target, "rb")
+        try:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise FileNotFoundError(errno.ENOENT, "Not a regular file", rel_path)
+        except BaseException:
+            f.close()
+            raise
+        return f, st
+
+    def invalidate(self, changed, removed):
+        """File index listener: forgets cached folders that were changed, removed or replaced."""
+        paths = set(removed)
+        paths.update(entry.rel_path for entry in changed)
+        if not paths:
+            return
+        with self._lock:
+            stale = [rel_dir for rel_dir in self._dirs if rel_dir and self._under(rel_dir, paths)]
+            if any('/' not in path for path in paths):
+                stale.append('') # Top-level change: the root itself may have been replaced
+            for rel_dir in stale:
+                self._dirs.pop(rel_dir, None)
+
+    @staticmethod
+    def _under(rel_dir: str, paths: set) -> bool:
+        while rel_dir:
+            if rel_dir in paths:
+                return True
+            rel_dir = rel_dir.rpartition('/')[0]
+        return False
+
+    def close(self):
+        """Drops every cached folder; each fd closes once the last request using it is done."""
+        with self._lock:
+            self._dirs.clear()
@@ -0,0 +1,140 @@
+import heapq
+import threading
+
+from common.file_index import FileEntry
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def normalize_extension(ext: str) -> str:
+    ext = ext.strip().lower()
+    return ext if not ext or ext.startswith('.') else '.' + ext
+
+
+def _extension(name: str) -> str:
+    dot = name.rfind('.')
+    return name[dot:].lower() if dot > 0 else ''
+
+
+class SearchIndex:
+    """Trigram index over the relative paths of a FileIndex, updated from its change events.
+
+    A query's trigrams select candidates by intersecting posting sets (smallest first);
+    candidates are then verified with a real substring test, so results are exact.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, FileEntry] = {} # Document id -> entry
+        self._keys: dict[int, str] = {} # Document id -> lowercased relative path
+        self._names: dict[int, str] = {} # Document id -> lowercased name
+        self._ids: dict[str, int] = {} # Relative path -> document id
+        self._postings: dict[str, set[int]] = {} # Trigram -> document ids
+        self._by_extension: dict[str, set[int]] = {} # ".pdf" -> document ids (files only)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def update(self, changed, removed):
+        """FileIndex listener: indexes changed entries and forgets removed paths."""
+        with self._lock:
+            for rel_path in removed:
+                self._remove_locked(rel_path)
+            for entry in changed:
+                doc_id = self._ids.get(entry.rel_path)
+                if doc_id is not None and self._entries[doc_id].is_dir == entry.is_dir:
+                    self._entries[doc_id] = entry # Same path, new size/mtime: trigrams unchanged
+                    continue
+                if doc_id is not None:
+                    self._remove_locked(entry.rel_path)
+                self._add_locked(entry)
+
+    def _add_locked(self, entry: FileEntry):
+        doc_id = self._next_id
+        self._next_id += 1
+        key = entry.rel_path.lower()
+        self._ids[entry.rel_path] = doc_id
+        self._entries[doc_id] = entry
+        self._keys[doc_id] = key
+        self._names[doc_id] = key.rpartition('/')[2]
+        for gram in trigrams(key):
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = {doc_id}
+            else:
+                postings.add(doc_id)
+        if not entry.is_dir:
+            self._by_extension.setdefault(_extension(entry.name), set()).add(doc_id)
+
+    def _remove_locked(self, rel_path: str):
+        doc_id = self._ids.pop(rel_path, None)
+        if doc_id is None:
+            return
+        entry = self._entries.pop(doc_id)
+        del self._names[doc_id]
+        for gram in trigrams(self._keys.pop(doc_id)):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self._postings[gram]
+        if not entry.is_dir:
+            ids = self._by_extension.get(_extension(entry.name))
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._by_extension[_extension(entry.name)]
+
+    def _candidates_locked(self, query: str, extensions: list[str]) -> set[int] | None:
+        """Narrows the documents to check; None means every document."""
+        sets = []
+        if extensions:
+            sets.append(set().union(*(self._by_extension.get(ext, ()) for ext in extensions)))
+        if len(query) >= 3:
+            for gram in trigrams(query):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    return set() # A trigram nobody has: no match possible
+                sets.append(postings)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, mode: str = "substring", extensions=(), limit: int = 50) -> tuple[int, list[FileEntry]]:
+        """Returns (number of matches, best `limit` matches).
+
+        mode "substring" matches anywhere in the relative path, "prefix" matches the start of
+        the file name. Ranking prefers exact names, then name prefixes, then matches in the
+        name over matches in a parent folder, then shorter paths.
+        """
+        query = query.strip().lower()
+        extensions = [normalize_extension(ext) for ext in extensions if ext.strip()]
+        with self._lock:
+            candidates = self._candidates_locked(query, extensions)
+            ids = self._entries.keys() if candidates is None else candidates
+            keys, names = self._keys, self._names
+            tiers = [[] for _ in range(8)] # Indexed by the three ranking flags; avoids building a sort key per match
+            for doc_id in ids:
+                name = names[doc_id]
+                if mode == "prefix":
+                    if not name.startswith(query):
+                        continue
+                    tiers[(name != query) << 2].append(doc_id)
+                elif query in keys[doc_id]:
+                    tiers[(name != query) << 2 | (not name.startswith(query)) << 1 | (query not in name)].append(doc_id)
+            total = sum(len(tier) for tier in tiers)
+            best = []
+            for tier in tiers:
+                if len(best) >= limit:
+                    break
+                best.extend(heapq.nsmallest(limit - len(best), tier, key=lambda d: (len(keys[d]), keys[d])))
+            return total, [self._entries[doc_id] for doc_id in best]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,397 @@
+import contextlib
+import errno
+import hashlib
+import json
+import os
+import re
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+from common.file_index import normalize_rel_path
+from server.safe_open import SUPPORTED as OPENAT_SUPPORTED
+
+READ_SIZE = 256 * 1024
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+MOVE_BENEATH = OPENAT_SUPPORTED and {os.mkdir, os.link, os.rename, os.stat, os.unlink} <= os.supports_dir_fd # os.replace shares rename's dir_fd support; Windows checks paths instead
+_NO_HARD_LINKS = (errno.EPERM, errno.EXDEV, errno.EMLINK, getattr(errno, "ENOTSUP", errno.EPERM), getattr(errno, "EOPNOTSUPP", errno.EPERM)) # FAT, exFAT, ...
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path):
+    """Holds an exclusive lock on path (created if missing), shared by every server process."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1) # Gives up after about 10 s of retries
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd) # Also drops a flock
+
+
+class UploadError(Exception):
+    """Upload request that cannot be honoured; status is the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class UploadSession:
+    """One file being uploaded: target path, declared size and the byte ranges received so far."""
+
+    def __init__(self, upload_id: str, rel_path: str, size: int, sha256: str | None, created: float, ranges=()):
+        self.id = upload_id
+        self.rel_path = rel_path
+        self.size = size
+        self.sha256 = sha256 # Expected digest given at creation, if any
+        self.created = created
+        self.ranges: list[list[int]] = [list(r) for r in ranges] # Sorted, merged [start, end) pairs
+        self.lock = threading.Lock()
+
+    def add_range(self, start: int, end: int):
+        if end <= start:
+            return
+        merged = []
+        for s, e in self.ranges:
+            if e < start or s > end:
+                merged.append([s, e])
+            else:
+                start, end = min(start, s), max(end, e)
+        merged.append([start, end])
+        merged.sort()
+        self.ranges = merged
+
+    def received(self) -> int:
+        return sum(e - s for s, e in self.ranges)
+
+    def missing(self) -> list[list[int]]:
+        gaps, position = [], 0
+        for s, e in self.ranges:
+            if s > position:
+                gaps.append([position, s])
+            position = max(position, e)
+        if position < self.size:
+            gaps.append([position, self.size])
+        return gaps
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "path": self.rel_path, "size": self.size, "sha256": self.sha256, "created": self.created, "ranges": self.ranges}
+
+
+class UploadManager:
+    """Resumable uploads staged in a hidden directory of the served root, then moved into place.
+
+    Chunks are written at their offsets into a preallocated staging file, each request through
+    its own file handle, so chunks of one upload may arrive in any order and in parallel.
+    Sessions are persisted next to the staging file and survive a server restart. Every server
+    process records chunks there, so updates to a session's record are made under a lock file
+    of that session, never under session.lock alone.
+    """
+
+    def __init__(self, root: Path, staging_dir: Path, max_file_size: int, session_ttl: float, max_staged_bytes: int | None = None, max_sessions: int | None = None):
+        self.root = Path(root).resolve()
+        self.staging_dir = Path(staging_dir)
+        self.max_file_size = max_file_size
+        self.session_ttl = session_ttl # Unfinished uploads idle longer than this are deleted
+        self.max_staged_bytes = max_staged_bytes # Declared sizes of all unfinished uploads together; None: no limit
+        self.max_sessions = max_sessions # Unfinished uploads at once; None: no limit
+        self._create_lock = threading.Lock() # Quota check and staging file creation happen as one step
+        self._sessions: dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.staging_dir / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.staging_dir / f"{upload_id}.json"
+
+    def _lock_path(self, upload_id: str) -> Path:
+        return self.staging_dir / f"{upload_id}.lock"
+
+    def _locked(self, session: UploadSession):
+        """Serializes read-merge-write of the session record within this process and across processes."""
+        stack = contextlib.ExitStack()
+        stack.enter_context(session.lock)
+        stack.enter_context(_file_lock(self._lock_path(session.id)))
+        return stack
+
+    def _save(self, session: UploadSession):
+        fd, tmp_path = tempfile.mkstemp(dir=self.staging_dir, prefix=f"{session.id}.", suffix=".json.tmp") # Unique: never shared with another writer
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(session.to_dict(), f)
+            os.replace(tmp_path, self._meta_path(session.id))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _refresh(self, session: UploadSession) -> bool:
+        """Merges in chunks another server process recorded; False if the upload was finished or discarded there."""
+        try:
+            with open(self._meta_path(session.id), "r", encoding="utf-8") as f:
+                ranges = json.load(f).get("ranges", ())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            return True # Being replaced right now: keep what we know
+        for start, end in ranges:
+            session.add_range(start, end)
+        return True
+
+    def target_path(self, rel_path: str | None) -> tuple[str, Path]:
+        """Validates an upload target with the same rules as downloads; returns (rel_path, abs_path)."""
+        rel_path = normalize_rel_path(rel_path or "")
+        if not rel_path:
+            raise UploadError(400, "Invalid upload path.")
+        if rel_path.split('/', 1)[0] == self.staging_dir.name:
+            raise UploadError(403, "Uploads cannot target the staging directory.")
+        target = self.root / rel_path
+        parent = os.path.realpath(target.parent)
+        if os.path.commonpath([parent, str(self.root)]) != str(self.root):
+            raise UploadError(403, "Upload path leaves the served folder.") # Through a symlinked folder
+        if MOVE_BENEATH and parent != str(target.parent):
+            raise UploadError(403, "Uploads cannot go through a symlinked folder.") # finalize() never follows folder symlinks
+        return rel_path, target
+
+    def staged(self) -> tuple[int, int]:
+        """Returns (unfinished uploads, their declared bytes), counted on disk so all server processes are included."""
+        count = total = 0
+        try:
+            iterator = os.scandir(self.staging_dir)
+        except OSError:
+            return 0, 0
+        with iterator:
+            for dir_entry in iterator:
+                if dir_entry.name.endswith(".part"):
+                    try:
+                        total += dir_entry.stat(follow_symlinks=False).st_size # Preallocated to the declared size
+                    except OSError:
+                        continue # Finished or discarded meanwhile
+                    count += 1
+        return count, total
+
+    def create(self, rel_path: str | None, size: int, sha256: str | None = None) -> UploadSession:
+        rel_path, target = self.target_path(rel_path)
+        if size < 0 or size > self.max_file_size:
+            raise UploadError(413, f"Upload size must be between 0 and {self.max_file_size} bytes.")
+        if target.exists():
+            raise UploadError(409, "A file or folder with that name already exists.")
+        if sha256 is not None and not re.fullmatch(r"[0-9a-fA-F]{64}", sha256):
+            raise UploadError(400, "sha256 must be 64 hex digits.")
+        self.sweep()
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        session = UploadSession(uuid.uuid4().hex, rel_path, size, sha256.lower() if sha256 else None, time.time())
+        with self._create_lock:
+            count, total = self.staged()
+            if self.max_sessions is not None and count >= self.max_sessions:
+                raise UploadError(503, "Too many uploads in progress; try again later.")
+            if self.max_staged_bytes is not None and total + size > self.max_staged_bytes:
+                raise UploadError(507, "Not enough upload staging space left; try again later.")
+            with open(self._part_path(session.id), "wb") as f:
+                f.truncate(size) # Sparse where supported; chunks fill it in at their offsets
+        self._save(session)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        if not UPLOAD_ID_RE.match(upload_id):
+            raise UploadError(404, "Unknown upload.")
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                if self._refresh(session):
+                    return session
+                del self._sessions[upload_id] # Finished or discarded by another server process
+                raise UploadError(404, "Unknown upload.")
+            try:
+                with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                    data = json.load(f) # Started before a server restart
+            except (OSError, ValueError):
+                raise UploadError(404, "Unknown upload.") from None
+            session = UploadSession(data["id"], data["path"], data["size"], data.get("sha256"), data["created"], data.get("ranges", ()))
+            self._sessions[upload_id] = session
+            return session
+
+    def write_chunk(self, session: UploadSession, offset: int, stream, length: int | None) -> int:
+        """Streams a request body into the staging file at offset; returns the bytes written."""
+        if offset < 0 or offset > session.size:
+            raise UploadError(416, "Chunk offset outside the declared file size.")
+        limit = session.size - offset
+        if length is not None and length > limit:
+            raise UploadError(413, "Chunk extends past the declared file size.")
+        written = 0
+        try:
+            with open(self._part_path(session.id), "r+b") as f: # Own handle per request: parallel chunks never share a file position
+                f.seek(offset)
+                while length is None or written < length:
+                    data = stream.read(READ_SIZE if length is None else min(READ_SIZE, length - written))
+                    if not data:
+                        break
+                    if written + len(data) > limit:
+                        raise UploadError(413, "Chunk extends past the declared file size.")
+                    f.write(data)
+                    written += len(data)
+        except FileNotFoundError:
+            raise UploadError(404, "Unknown upload.") from None
+        finally:
+            if written:
+                with self._locked(session):
+                    if self._refresh(session): # Other server processes may have written chunks too
+                        session.add_range(offset, offset + written) # Keep what arrived even if the client dropped mid-chunk
+                        self._save(session)
+        return written
+
+    def finalize(self, session: UploadSession, sha256: str | None = None) -> tuple[Path, str]:
+        """Verifies completeness and checksum, then moves the file into the served folder."""
+        with self._locked(session):
+            if not self._refresh(session):
+                raise UploadError(404, "Unknown upload.")
+            if session.missing():
+                raise UploadError(409, "Upload is incomplete.")
+            expected = (sha256 or session.sha256 or "").lower() or None
+            digest = hashlib.sha256()
+            part_path = self._part_path(session.id)
+            with open(part_path, "rb") as f:
+                while True:
+                    data = f.read(READ_SIZE)
+                    if not data:
+                        break
+                    digest.update(data)
+            actual = digest.hexdigest()
+            if expected is not None and actual != expected:
+                raise UploadError(422, f"Checksum mismatch: received data hashes to {actual}.")
+            rel_path, target = self.target_path(session.rel_path) # Recheck, the tree may have changed since creation
+            if MOVE_BENEATH:
+                self._move_beneath(part_path, rel_path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.exists():
+                    raise UploadError(409, "A file or folder with that name already exists.")
+                os.replace(part_path, target) # Same filesystem: the staging directory lives inside the root
+            self._forget(session.id)
+            return target, actual
+
+    def _move_beneath(self, part_path: Path, rel_path: str):
+        """Moves the staging file to rel_path through folder fds opened without following symlinks.
+
+        A folder swapped for a symlink after target_path() looked can therefore not redirect
+        the file, and a hard link (where the filesystem has them) never replaces an existing
+        file that appeared meanwhile.
+        """
+        parent_fd = self._open_parent(rel_path)
+        try:
+            staging_fd = os.open(self.staging_dir, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | getattr(os, "O_CLOEXEC", 0))
+            try:
+                name = rel_path.rpartition('/')[2]
+                try:
+                    os.link(part_path.name, name, src_dir_fd=staging_fd, dst_dir_fd=parent_fd, follow_symlinks=False)
+                except FileExistsError:
+                    raise UploadError(409, "A file or folder with that name already exists.") from None
+                except OSError as e:
+                    if e.errno not in _NO_HARD_LINKS:
+                        raise
+                    try: # No hard links here: check, then rename, both against the folder fd
+                        os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+                    except FileNotFoundError:
+                        os.replace(part_path.name, name, src_dir_fd=staging_fd, dst_dir_fd=parent_fd)
+                    else:
+                        raise UploadError(409, "A file or folder with that name already exists.") from None
+                else:
+                    os.unlink(part_path.name, dir_fd=staging_fd)
+            finally:
+                os.close(staging_fd)
+        finally:
+            os.close(parent_fd)
+
+    def _open_parent(self, rel_path: str) -> int:
+        """Opens (creating as needed) the folder rel_path goes into, one component at a time."""
+        flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | getattr(os, "O_CLOEXEC", 0)
+        fd = os.open(self.root, flags & ~os.O_NOFOLLOW)
+        try:
+            for name in rel_path.split('/')[:-1]:
+                try:
+                    next_fd = os.open(name, flags, dir_fd=fd)
+                except FileNotFoundError:
+                    try:
+                        os.mkdir(name, dir_fd=fd)
+                    except FileExistsError:
+                        pass # Created by a parallel finalize
+                    next_fd = os.open(name, flags, dir_fd=fd)
+                except OSError as e:
+                    if e.errno not in (errno.ENOTDIR, errno.ELOOP, getattr(errno, "EMLINK", errno.ELOOP)):
+                        raise
+                    if stat.S_ISLNK(os.stat(name, dir_fd=fd, follow_symlinks=False).st_mode): # Linux reports ENOTDIR for these too
+                        raise UploadError(403, "Uploads cannot go through a symlinked folder.") from None
+                    raise UploadError(409, "A file is in the way of the upload path.") from None
+                os.close(fd)
+                fd = next_fd
+            return fd
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def discard(self, session: UploadSession):
+        with self._locked(session):
+            self._forget(session.id)
+        try:
+            self._part_path(session.id).unlink()
+        except OSError:
+            pass
+
+    def _forget(self, upload_id: str):
+        """Drops the session record; the caller holds its lock, so no writer can save it again."""
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        for path in (self._meta_path(upload_id), self._lock_path(upload_id)): # Later lock holders find no record and write nothing
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def sweep(self):
+        """Deletes staged uploads that have not been touched within session_ttl."""
+        cutoff = time.time() - self.session_ttl
+        try:
+            iterator = os.scandir(self.staging_dir)
+        except OSError:
+            return
+        with iterator:
+            for dir_entry in iterator:
+                try:
+                    if dir_entry.stat().st_mtime < cutoff:
+                        upload_id = dir_entry.name.split('.', 1)[0]
+                        if dir_entry.name.endswith(".lock") and self._meta_path(upload_id).exists():
+                            continue # Session still recorded: a new lock file would not exclude holders of this one
+                        with self._lock:
+                            self._sessions.pop(upload_id, None)
+                        os.unlink(dir_entry.path)
+                except OSError as e:
+                    print(f"Error removing stale upload {dir_entry.path}: {e}", file=sys.stderr)
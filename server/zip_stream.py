@@ -0,0 +1,82 @@
+import io
+import os
+import sys
+import time
+import zipfile
+
+READ_SIZE = 256 * 1024
+ZIP64_THRESHOLD = 0x7FFFFFFF # Entries at or above this size need ZIP64 extra fields up front
+STORED_EXTENSIONS = frozenset((
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".lz4",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".mp3", ".aac", ".ogg", ".opus", ".flac", ".m4a",
+    ".mp4", ".mkv", ".webm", ".mov", ".avi", ".m4v",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".epub", ".jar", ".apk",
+)) # Already compressed formats: deflating them again only burns CPU
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target that collects zipfile output until the generator yields it."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_info(arcname: str, st: os.stat_result) -> zipfile.ZipInfo:
+    """ZipInfo for a member from the stat of the file actually opened (as ZipInfo.from_file with strict_timestamps=False)."""
+    date_time = time.localtime(st.st_mtime)[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    elif date_time[0] > 2107:
+        date_time = (2107, 12, 31, 23, 59, 59)
+    info = zipfile.ZipInfo(arcname, date_time)
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    info.file_size = st.st_size
+    return info
+
+
+def iter_zip(members, open_member):
+    """Yields a ZIP archive of (rel_path, archive_name) members without buffering it whole.
+
+    open_member(rel_path) returns (file, stat); each member is opened only when its turn
+    comes. Members are written with data descriptors since the output cannot seek back, so
+    memory use stays at roughly one read buffer regardless of archive size.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for rel_path, arcname in members:
+            try:
+                src, st = open_member(rel_path)
+            except OSError as e:
+                print(f"Skipping {arcname} in ZIP download: {e}", file=sys.stderr)
+                continue
+            with src:
+                info = zip_info(arcname, st)
+                stored = os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+                info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                with archive.open(info, "w", force_zip64=st.st_size >= ZIP64_THRESHOLD) as dst:
+                    while True:
+                        chunk = src.read(READ_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        data = sink.take()
+                        if data:
+                            yield data
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take() # Central directory
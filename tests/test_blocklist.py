@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from common.blocklist import Blocklist, compile_entries
+from common.file_utils import find_blocking_entries
+
+ENTRIES = ["10.0.0.0/8", "10.1.0.0/16", "192.168.1.7", "192.168.1.8", "# comment", "", "not-an-ip", "2001:db8::/32"]
+
+
+@pytest.fixture
+def blocklist(tmp_path):
+    path = tmp_path / "blocked.txt"
+    path.write_text("\n".join(ENTRIES) + "\n", encoding="utf-8")
+    return Blocklist(path, recheck_interval=0)
+
+
+def test_compile_merges_overlapping_and_adjacent_ranges():
+    (v4_starts, v4_ends), (v6_starts, v6_ends) = compile_entries(ENTRIES)
+    assert len(v4_starts) == 2 # 10.1/16 lies inside 10/8; .7 and .8 touch
+    assert len(v6_starts) == 1
+    assert v4_ends[0] - v4_starts[0] == 2 ** 24 - 1
+    assert v4_ends[1] - v4_starts[1] == 1
+
+
+@pytest.mark.parametrize("address, blocked", [
+    ("10.0.0.0", True), ("10.255.255.255", True), ("9.255.255.255", False), ("11.0.0.0", False),
+    ("192.168.1.6", False), ("192.168.1.7", True), ("192.168.1.8", True), ("192.168.1.9", False),
+    ("::ffff:10.2.3.4", True), ("2001:db8::1%eth0", True), ("2001:db9::1", False), ("garbage", False),
+])
+def test_contains(blocklist, address, blocked):
+    assert blocklist.contains(address) is blocked
+
+
+def test_reloads_when_file_changes(blocklist, tmp_path):
+    assert "8.8.8.8" not in blocklist
+    (tmp_path / "blocked.txt").write_text("8.8.8.0/24\n", encoding="utf-8")
+    assert "8.8.8.8" in blocklist
+    assert "10.0.0.1" not in blocklist
+
+
+def test_find_blocking_entries_lists_every_covering_entry(tmp_path):
+    path = tmp_path / "blocked.txt"
+    path.write_text("\n".join(ENTRIES) + "\n", encoding="utf-8")
+    assert find_blocking_entries(path, "10.1.2.3") == ["10.0.0.0/8", "10.1.0.0/16"]
+    assert find_blocking_entries(path, "::ffff:192.168.1.7") == ["192.168.1.7"]
+    assert find_blocking_entries(path, "172.16.0.1") == []
+
+
+def test_blocked_client_gets_403(tmp_path):
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(tmp_path)})
+    client = flask_server.app.test_client()
+    flask_server.blocklist.load_entries(["203.0.113.0/24"])
+    try:
+        assert client.get("/style.css", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code == 403
+        assert client.get("/style.css", environ_base={"REMOTE_ADDR": "203.0.114.9"}).status_code == 200
+    finally:
+        flask_server.blocklist.reload(force=True) # Back to the blocklist file
@@ -0,0 +1,102 @@
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+from server.compression import STALE_TMP_S, CompressionCache, choose_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None), ("", None), ("identity", None), ("br", None),
+    ("gzip", "gzip"), ("deflate", "deflate"), ("gzip, deflate", "gzip"), ("deflate, gzip", "gzip"),
+    ("gzip;q=0.5, deflate", "deflate"), ("GZIP ; Q=1", "gzip"), ("gzip;level=1;q=0.2, deflate;q=0.1", "gzip"),
+    ("*", "gzip"), ("gzip;q=0, *", "deflate"), ("*;q=0.5, deflate;q=0.2", "gzip"), ("gzip;q=0, deflate;q=0, *", None),
+    ("*;q=0", None), ("gzip;q=abc", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def compressed(cache: CompressionCache, path: Path, encoding: str = "gzip", timeout: float = 10) -> Path:
+    """Looks the file up until its variant has been compressed in the background."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        variant = cache.lookup(path, os.stat(path), encoding)
+        if variant is not None:
+            return variant
+        time.sleep(0.01)
+    raise AssertionError(f"{path} was never compressed")
+
+
+def text_file(folder: Path, name: str, size: int = 100000) -> Path:
+    path = folder / name
+    path.write_bytes((name.encode() + b" compresses well\n") * (size // (len(name) + 17)))
+    return path
+
+
+def test_variant_is_compressed_once_and_replaced_on_change(tmp_path):
+    cache = CompressionCache(tmp_path / "cache", 1 << 20)
+    source = text_file(tmp_path, "page.html")
+    assert cache.lookup(source, os.stat(source), "gzip") is None # Miss: served uncompressed meanwhile
+    variant = compressed(cache, source)
+    assert gzip.decompress(variant.read_bytes()) == source.read_bytes()
+    with source.open("ab") as f:
+        f.write(b"more\n")
+    new_variant = compressed(cache, source)
+    assert new_variant != variant and not variant.exists() # Older version of the same file deleted
+    assert cache.stats()["entries"] == 1
+
+
+def test_incompressible_files_are_not_cached(tmp_path):
+    cache = CompressionCache(tmp_path / "cache", 1 << 20)
+    source = tmp_path / "random.bin"
+    source.write_bytes(os.urandom(50000))
+    cache.lookup(source, os.stat(source), "gzip")
+    cache._executor.submit(lambda: None).result() # Let the queued compression finish
+    assert cache.lookup(source, os.stat(source), "gzip") is None
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_budget_is_shared_by_processes(tmp_path):
+    first = CompressionCache(tmp_path / "cache", 1 << 20) # As two server processes would
+    second = CompressionCache(tmp_path / "cache", 1 << 20)
+    sources = [text_file(tmp_path, f"file{i}.txt") for i in range(4)]
+    variants = []
+    for i, source in enumerate(sources):
+        variants.append(compressed(first if i % 2 == 0 else second, source))
+        os.utime(variants[-1], (time.time() - 100 + i, time.time() - 100 + i)) # Distinct recency, oldest first
+        if i == 0:
+            first.max_bytes = second.max_bytes = variants[0].stat().st_size * 5 // 2 # Room for two variants: each process alone stays under it
+    assert [variant.exists() for variant in variants] == [False, False, True, True] # Least recently used went first
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path / "cache")) <= first.max_bytes
+
+
+def test_lookup_adopts_variants_of_other_processes(tmp_path):
+    first = CompressionCache(tmp_path / "cache", 1 << 20)
+    second = CompressionCache(tmp_path / "cache", 1 << 20)
+    source = text_file(tmp_path, "shared.css")
+    variant = compressed(first, source)
+    assert second.lookup(source, os.stat(source), "gzip") == variant # Hit at once, never compressed again
+    assert second.stats()["misses"] == 0
+    variant.unlink() # Evicted by another process
+    second.forget(variant)
+    assert second.stats()["bytes"] == 0
+
+
+def test_only_stale_temporary_files_are_removed(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    fresh, stale = cache_dir / "a.gz.123.tmp", cache_dir / "b.gz.456.tmp"
+    fresh.write_bytes(b"being written by another process")
+    stale.write_bytes(b"left by a crash")
+    old = time.time() - STALE_TMP_S - 10
+    os.utime(stale, (old, old))
+    CompressionCache(cache_dir, 1 << 20)
+    assert fresh.exists() and not stale.exists()
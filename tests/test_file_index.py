@@ -0,0 +1,114 @@
+import shutil
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+from common import file_index as file_index_module
+from common.file_index import FileIndex
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_index_module, "MTIME_SETTLE_NS", 0) # Trust fresh folder mtimes: the test changes folders right away
+    root = tmp_path / "root"
+    for rel_path in ("a.txt", "docs/b.txt", "docs/old/c.txt", "pics/d.jpg", ".uploads/x.part"):
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_bytes(rel_path.encode())
+    index = FileIndex(root, poll_interval=3600, resync_interval=3600, excluded_names=(".uploads",)) # Background thread stays idle
+    index.start()
+    assert index.wait_ready(10)
+    events = []
+    index.add_listener(lambda changed, removed: events.append(({e.rel_path for e in changed}, set(removed))))
+    yield root, index, events
+    index.stop()
+
+
+def snapshot(index: FileIndex) -> dict:
+    return {path: (entry.size, entry.is_dir) for path, entry in sorted((e.rel_path, e) for e in index.all_entries())}
+
+
+def assert_matches_fresh_scan(index: FileIndex):
+    fresh = FileIndex(index.root, excluded_names=(".uploads",))
+    fresh.rescan()
+    fresh._ready.set()
+    assert snapshot(index) == snapshot(fresh)
+    for rel_dir in [""] + [e.rel_path for e in fresh.all_entries() if e.is_dir]:
+        assert [e.name for e in index.list_dir(rel_dir)] == [e.name for e in fresh.list_dir(rel_dir)]
+
+
+def test_initial_scan(tree):
+    root, index, events = tree
+    assert index.lookup("docs/old/c.txt").size == len("docs/old/c.txt")
+    assert index.lookup(".uploads") is None
+    assert [e.name for e in index.list_dir("docs")] == ["b.txt", "old"]
+
+
+def test_poll_relists_only_changed_folders(tree, monkeypatch):
+    root, index, events = tree
+    refreshed = []
+    original = index._refresh_dir
+    monkeypatch.setattr(index, "_refresh_dir", lambda rel_dir: (refreshed.append(rel_dir), original(rel_dir)))
+    generation = index.generation
+    index.poll()
+    assert refreshed == [] and index.generation == generation # Nothing changed: one stat per folder and no listing
+    (root / "docs" / "new.txt").write_bytes(b"new")
+    (root / "pics" / "d.jpg").unlink()
+    index.poll()
+    assert sorted(refreshed) == ["docs", "pics"]
+    assert set().union(*(changed for changed, _ in events)) == {"docs/new.txt"}
+    assert set().union(*(removed for _, removed in events)) == {"pics/d.jpg"}
+    assert_matches_fresh_scan(index)
+
+
+def test_poll_follows_renamed_and_replaced_folders(tree):
+    root, index, events = tree
+    (root / "docs" / "old").rename(root / "docs" / "renamed")
+    (root / "docs" / "renamed" / "e.txt").write_bytes(b"e")
+    shutil.rmtree(root / "pics")
+    (root / "pics").write_bytes(b"now a file")
+    index.poll()
+    assert index.lookup("docs/old/c.txt") is None and index.lookup("pics/d.jpg") is None
+    assert index.lookup("docs/renamed/e.txt") is not None
+    assert not index.lookup("pics").is_dir
+    assert_matches_fresh_scan(index)
+
+
+def test_refresh_path_stats_one_path(tree):
+    root, index, events = tree
+    (root / "a.txt").write_bytes(b"longer content")
+    index.refresh_path(str(root / "a.txt"))
+    assert index.lookup("a.txt").size == len(b"longer content")
+    assert events == [({"a.txt"}, set())]
+    (root / "docs").rename(root / "moved")
+    index.refresh_path(str(root / "docs"))
+    index.refresh_path(str(root / "moved"))
+    assert events[1] == (set(), {"docs", "docs/b.txt", "docs/old", "docs/old/c.txt"}) # The whole subtree, from the children map
+    assert events[2] == ({"moved", "moved/b.txt", "moved/old", "moved/old/c.txt"}, set())
+    assert_matches_fresh_scan(index)
+
+
+def test_refresh_path_skips_escaping_links_and_excluded_names(tree, tmp_path):
+    root, index, events = tree
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+    (root / "escape.txt").symlink_to(tmp_path / "secret.txt")
+    (root / "loop").symlink_to(root, target_is_directory=True)
+    (root / "inside.txt").symlink_to(root / "a.txt")
+    (root / ".uploads" / "y.part").write_bytes(b"y")
+    for name in ("escape.txt", "loop", "inside.txt", ".uploads/y.part", "missing.txt"):
+        index.refresh_path(str(root / name))
+    assert events == [({"inside.txt"}, set())]
+    assert_matches_fresh_scan(index)
+
+
+def test_listing_cache_drops_only_touched_folders(tree):
+    root, index, events = tree
+    docs, pics = index.list_dir("docs"), index.list_dir("pics")
+    (root / "docs" / "z.txt").write_bytes(b"z")
+    index.refresh_path(str(root / "docs" / "z.txt"))
+    assert index.list_dir("pics") is pics
+    assert [e.name for e in index.list_dir("docs")] == [e.name for e in docs] + ["z.txt"]
@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from server.listing import decode_cursor, encode_cursor
+
+NAMES = [f"file{i:02d}.txt" for i in range(25)]
+
+
+@pytest.fixture
+def served(tmp_path):
+    for i, name in enumerate(NAMES):
+        (tmp_path / name).write_bytes(b"x" * (i % 5)) # Equal sizes: ties broken by name
+    (tmp_path / "Sub").mkdir()
+    (tmp_path / "notes.pdf").write_bytes(b"pdf")
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(tmp_path)})
+    mount = flask_server.mounts.get("")
+    assert mount.file_index.wait_ready(10)
+    return tmp_path, mount, flask_server.app.test_client()
+
+
+def walk(client, **params):
+    """Follows next_cursor to the end; returns the names of every page."""
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/list", query_string=query)
+        assert response.status_code == 200
+        pages.append([item["name"] for item in response.json["items"]])
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_the_folder_once(served):
+    folder, mount, client = served
+    pages = walk(client, type="file", ext="txt", limit=10)
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert sum(pages, []) == NAMES
+
+
+def test_descending_size_order(served):
+    folder, mount, client = served
+    names = sum(walk(client, type="file", sort="size", order="desc", limit=7), [])
+    expected = sorted(NAMES + ["notes.pdf"], key=lambda n: ((folder / n).stat().st_size, n.lower(), n), reverse=True)
+    assert names == expected
+
+
+def test_filters(served):
+    folder, mount, client = served
+    assert sum(walk(client, type="dir"), []) == ["Sub"]
+    assert sum(walk(client, ext="pdf"), []) == ["notes.pdf"]
+    assert sum(walk(client, q="FILE2"), []) == ["file20.txt", "file21.txt", "file22.txt", "file23.txt", "file24.txt"]
+
+
+def test_cursor_survives_folder_changes(served):
+    folder, mount, client = served
+    first = client.get("/api/list", query_string={"type": "file", "ext": "txt", "limit": 10}).json
+    (folder / "file00a.txt").write_bytes(b"new") # Sorts before the cursor
+    (folder / "file05.txt").unlink() # Was on the first page
+    (folder / "file15b.txt").write_bytes(b"new") # Sorts after the cursor
+    for name in ("file00a.txt", "file05.txt", "file15b.txt"):
+        mount.file_index.refresh_path(str(folder / name))
+    second = client.get("/api/list", query_string={"type": "file", "ext": "txt", "limit": 10, "cursor": first["next_cursor"]}).json
+    assert [item["name"] for item in second["items"]] == ["file10.txt", "file11.txt", "file12.txt", "file13.txt", "file14.txt",
+                                                          "file15.txt", "file15b.txt", "file16.txt", "file17.txt", "file18.txt"]
+
+
+def test_bad_requests(served):
+    folder, mount, client = served
+    name_cursor = encode_cursor("name", "asc", ("a", "a"))
+    assert client.get("/api/list", query_string={"cursor": "%%%"}).status_code == 400
+    assert client.get("/api/list", query_string={"cursor": name_cursor, "sort": "size"}).status_code == 400
+    assert client.get("/api/list", query_string={"sort": "random"}).status_code == 400
+    assert client.get("/api/list", query_string={"path": "../"}).status_code == 404
+    assert client.get("/api/list", query_string={"path": "file01.txt"}).status_code == 404
+
+
+def test_cursor_round_trip():
+    key = (1234, "a b", "A B")
+    assert decode_cursor(encode_cursor("size", "desc", key), "size", "desc") == key
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("size", "desc", key), "size", "asc")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("size", "desc", ("1234", "a", "a")), "size", "desc")
@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+
+GIB = 1024 ** 3
+SIZE = 6 * GIB + 12345 # Sparse: only the marked blocks below take disk space
+MARKS = {0: b"first-bytes", 4 * GIB - 5: b"across-4GiB", 5 * GIB: b"beyond-4GiB", SIZE - 9: b"last-byte"}
+
+
+def expected(start: int, end: int) -> bytes:
+    """Content of the sparse file between inclusive offsets start and end."""
+    data = bytearray(end - start + 1)
+    for offset, mark in MARKS.items():
+        for i, byte in enumerate(mark):
+            if start <= offset + i <= end:
+                data[offset + i - start] = byte
+    return bytes(data)
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("served")
+    with open(folder / "big.bin", "wb") as f:
+        f.truncate(SIZE)
+        for offset, mark in MARKS.items():
+            f.seek(offset)
+            f.write(mark)
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(folder)})
+    assert flask_server.mounts.get("").file_index.wait_ready(30)
+    return flask_server.app.test_client()
+
+
+def get(client, **headers):
+    return client.get("/download/big.bin", headers=headers)
+
+
+def test_full_body_headers(client):
+    response = get(client)
+    assert response.status_code == 200
+    assert response.headers["Content-Length"] == str(SIZE)
+    assert response.headers["Accept-Ranges"] == "bytes"
+    response.close() # Never read 6 GiB
+
+
+def test_single_range(client):
+    response = get(client, Range="bytes=0-10")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 0-10/{SIZE}"
+    assert response.data == expected(0, 10)
+
+
+def test_suffix_range(client):
+    response = get(client, Range="bytes=-9")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes {SIZE - 9}-{SIZE - 1}/{SIZE}"
+    assert response.data == b"last-byte"
+
+
+def test_open_ended_range(client):
+    start = SIZE - 100
+    response = get(client, Range=f"bytes={start}-")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes {start}-{SIZE - 1}/{SIZE}"
+    assert response.data == expected(start, SIZE - 1)
+
+
+def test_range_across_and_beyond_4gib(client):
+    start, end = 4 * GIB - 5, 4 * GIB + 5
+    response = get(client, Range=f"bytes={start}-{end}")
+    assert response.status_code == 206
+    assert response.headers["Content-Length"] == "11"
+    assert response.data == b"across-4GiB"
+    response = get(client, Range=f"bytes={5 * GIB}-{5 * GIB + 10}")
+    assert response.headers["Content-Range"] == f"bytes {5 * GIB}-{5 * GIB + 10}/{SIZE}"
+    assert response.data == b"beyond-4GiB"
+
+
+def test_multipart_byteranges(client):
+    ranges = [(0, 10), (5 * GIB, 5 * GIB + 10), (SIZE - 9, SIZE - 1)]
+    response = get(client, Range="bytes=" + ",".join(f"{start}-{end}" for start, end in ranges))
+    assert response.status_code == 206
+    content_type = response.headers["Content-Type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=", 1)[1]
+    body = response.data
+    assert len(body) == int(response.headers["Content-Length"])
+    parts = body.split(f"--{boundary}".encode())[1:-1]
+    assert len(parts) == len(ranges)
+    for part, (start, end) in zip(parts, ranges):
+        head, _, data = part.partition(b"\r\n\r\n")
+        assert f"Content-Range: bytes {start}-{end}/{SIZE}".encode() in head
+        assert data[:-2] == expected(start, end) # Each part ends with CRLF before the next boundary
+
+
+def test_unsatisfiable_range(client):
+    response = get(client, Range=f"bytes={SIZE}-{SIZE + 10}")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{SIZE}"
+
+
+def test_if_range_matching_etag(client):
+    etag = get(client, Range="bytes=0-0").headers["ETag"]
+    response = get(client, Range=f"bytes={5 * GIB}-{5 * GIB + 10}", **{"If-Range": etag})
+    assert response.status_code == 206
+    assert response.data == b"beyond-4GiB"
+
+
+def test_if_range_stale_etag(client):
+    response = get(client, Range="bytes=0-10", **{"If-Range": '"stale-etag"'})
+    assert response.status_code == 200 # Precondition failed: the whole (current) file instead of a range
+    assert response.headers["Content-Length"] == str(SIZE)
+    assert "Content-Range" not in response.headers
+    response.close()
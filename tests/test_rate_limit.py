@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import config
+from server.rate_limit import ALL_ROUTES, RateLimiter, TokenBucketLimiter
+
+SLOW = 0.001 # Tokens per second: nothing refills during a test
+
+
+def test_bucket_allows_burst_then_refuses():
+    limiter = TokenBucketLimiter(SLOW, 3)
+    assert [limiter.take("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.take("a") > 0
+    assert limiter.take("b") == 0 # Buckets are per key
+
+
+def test_refused_requests_cost_nothing():
+    limiter = TokenBucketLimiter(SLOW, 1)
+    limiter.take("a")
+    first = limiter.take("a")
+    assert limiter.take("a") <= first # Still waiting for the same token, not queued behind refusals
+
+
+def test_rate_zero_is_unlimited():
+    limiter = TokenBucketLimiter(0, 1)
+    assert all(limiter.take("a") == 0 for _ in range(100))
+    assert len(limiter) == 0
+
+
+def test_sweep_drops_full_buckets():
+    limiter = TokenBucketLimiter(1000, 1, sweep_interval=0)
+    limiter.take("a")
+    limiter.take("b")
+    assert len(limiter) <= 1 # "a" refilled by the time "b" swept
+
+
+def test_ip_refusal_refunds_route_budget():
+    limiter = RateLimiter({ALL_ROUTES: (SLOW, 1), "download_file": (SLOW, 2)})
+    assert limiter.check("ip", "download_file") == 0
+    assert limiter.check("ip", "download_file") > 0 # IP budget spent
+    limiter.configure({ALL_ROUTES: (SLOW, 2), "download_file": (SLOW, 2)}) # Fresh IP budget, route budget kept
+    assert limiter.check("ip", "download_file") == 0 # The route token of the refused request was refunded
+    assert limiter.check("ip", "download_file") > 0
+
+
+def test_route_refusal_leaves_ip_budget():
+    limiter = RateLimiter({ALL_ROUTES: (SLOW, 2), "download_file": (SLOW, 1)})
+    assert limiter.check("ip", "download_file") == 0
+    assert limiter.check("ip", "download_file") > 0 # Route budget spent
+    assert limiter.check("ip", "index") == 0 # IP budget was charged once, not twice
+    assert limiter.check("ip", "index") > 0
+
+
+def test_limited_client_gets_429(tmp_path):
+    from server import flask_server
+    flask_server.mounts.apply({"": str(tmp_path)})
+    flask_server.rate_limiter.configure({ALL_ROUTES: (0, 1), "serve_css": (SLOW, 1)})
+    client = flask_server.app.test_client()
+    try:
+        assert client.get("/style.css").status_code == 200
+        response = client.get("/style.css")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    finally:
+        flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from common.file_index import FileEntry
+from server.search import SearchIndex
+
+
+def entry(rel_path: str, is_dir: bool = False) -> FileEntry:
+    return FileEntry(rel_path.rpartition('/')[2], rel_path, 0, 0, is_dir)
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.update([entry("Reports", True), entry("Reports/report.pdf"), entry("Reports/2024/annual report.PDF"),
+                  entry("report"), entry("notes/reportage.txt"), entry("misc/ab.txt")], [])
+    return index
+
+
+def paths(result):
+    return [e.rel_path for e in result[1]]
+
+
+def test_substring_ranking(index):
+    total, results = index.search("report")
+    assert total == 5 # Everything but misc/ab.txt (its path has none of the query's trigrams)
+    assert paths((total, results)) == ["report", "Reports", "Reports/report.pdf", "notes/reportage.txt", "Reports/2024/annual report.PDF"]
+
+
+def test_prefix_mode_matches_names_only(index):
+    assert paths(index.search("rep", mode="prefix")) == ["report", "Reports", "Reports/report.pdf", "notes/reportage.txt"]
+
+
+def test_extension_filter_and_limit(index):
+    assert paths(index.search("", extensions=["pdf"])) == ["Reports/report.pdf", "Reports/2024/annual report.PDF"]
+    assert paths(index.search("report", extensions=[".PDF", "txt"], limit=2)) == ["Reports/report.pdf", "notes/reportage.txt"]
+
+
+def test_short_queries_scan_without_trigrams(index):
+    assert paths(index.search("ab")) == ["misc/ab.txt"]
+
+
+def test_updates_and_removals(index):
+    index.update([entry("Reports/report.pdf")], ["notes/reportage.txt", "Reports"]) # Removed first, then changed
+    assert paths(index.search("report")) == ["report", "Reports/report.pdf", "Reports/2024/annual report.PDF"]
+    index.update([entry("report", True)], []) # Same path, now a folder
+    assert paths(index.search("report", extensions=["pdf"])) == ["Reports/report.pdf", "Reports/2024/annual report.PDF"]
+    assert len(index) == 4
+    index.update([], ["Reports/report.pdf", "Reports/2024/annual report.PDF", "report", "misc/ab.txt"])
+    assert len(index) == 0 and index._postings == {} and index._by_extension == {}
+
+
+def test_search_endpoint_follows_the_folder(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "Budget 2024.xlsx").write_bytes(b"1")
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(tmp_path)})
+    mount = flask_server.mounts.get("")
+    assert mount.file_index.wait_ready(10)
+    client = flask_server.app.test_client()
+    response = client.get("/search", query_string={"q": "budget"})
+    assert response.status_code == 200
+    assert [r["path"] for r in response.json["results"]] == ["docs/Budget 2024.xlsx"]
+    (tmp_path / "docs" / "Budget 2024.xlsx").rename(tmp_path / "docs" / "Forecast.xlsx")
+    mount.file_index.refresh_path(str(tmp_path / "docs" / "Budget 2024.xlsx"))
+    mount.file_index.refresh_path(str(tmp_path / "docs" / "Forecast.xlsx"))
+    assert client.get("/search", query_string={"q": "budget"}).json["total"] == 0
+    assert client.get("/search", query_string={"q": "cast", "ext": "xlsx"}).json["total"] == 1
+    assert client.get("/search").status_code == 400
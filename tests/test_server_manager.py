@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from core.server_manager import ServerManager
+
+
+@pytest.fixture
+def manager_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SERVER_HOST", "127.0.0.1")
+    monkeypatch.setattr(config, "SERVER_PORT", 0) # Any free port
+    monkeypatch.setattr(config, "ACCESS_LOG_PATH", tmp_path / "access.log")
+    return tmp_path
+
+
+def test_failed_start_resets_state_for_the_next_start(manager_config):
+    served = manager_config / "served"
+    manager = ServerManager(served, log_callback=lambda message: None, processes=1) # Folder does not exist yet: the server exits
+    try:
+        assert manager.start()
+        assert not manager.wait_ready(30)
+        assert manager.get_status().startswith("Exited (")
+        assert not manager.is_running
+        assert manager._listen_socket is None and manager._workers == {} and manager._respawn_due == {}
+        served.mkdir()
+        assert manager.start() # Not refused as "already running"
+        assert manager.wait_ready(30)
+        assert manager.get_status() == "Running"
+    finally:
+        manager.stop()
+    assert manager.get_status() == "Stopped"
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from server.uploads import UploadError, UploadManager, UploadSession
+
+DATA = bytes(range(256)) * 1000 # 256000 bytes
+CHUNK = 100000
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    folder = tmp_path / "served"
+    folder.mkdir()
+    (folder / "existing.txt").write_bytes(b"already here")
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(folder)})
+    mount = flask_server.mounts.get("")
+    assert mount.file_index.wait_ready(10)
+    monkeypatch.setattr(flask_server, "uploads_enabled", True)
+    return folder, mount, flask_server.app.test_client()
+
+
+def create(client, path, size=len(DATA), **params):
+    return client.post("/upload", json={"path": path, "size": size, **params})
+
+
+def put(client, upload_id, offset, data):
+    return client.put(f"/upload/{upload_id}?offset={offset}", data=data)
+
+
+def test_add_range_merges_overlaps_and_neighbours():
+    session = UploadSession("0" * 32, "f", 100, None, 0)
+    for start, end in [(50, 60), (10, 20), (20, 30), (55, 70), (90, 100)]:
+        session.add_range(start, end)
+    assert session.ranges == [[10, 30], [50, 70], [90, 100]]
+    assert session.received() == 50
+    assert session.missing() == [[0, 10], [30, 50], [70, 90]]
+    session.add_range(0, 100)
+    assert session.ranges == [[0, 100]] and session.missing() == []
+
+
+def test_chunks_in_any_order_then_finalize(served):
+    folder, mount, client = served
+    response = create(client, "new/sub/file.bin", sha256=hashlib.sha256(DATA).hexdigest())
+    assert response.status_code == 201
+    upload_id = response.json["id"]
+    for offset in (2 * CHUNK, 0):
+        assert put(client, upload_id, offset, DATA[offset:offset + CHUNK]).status_code == 200
+    status = client.get(f"/upload/{upload_id}").json
+    assert status["received"] == len(DATA) - CHUNK
+    assert status["missing"] == [[CHUNK, 2 * CHUNK]]
+    assert client.post(f"/upload/{upload_id}/finalize").status_code == 409 # Incomplete
+    put(client, upload_id, CHUNK, DATA[CHUNK:2 * CHUNK])
+    response = client.post(f"/upload/{upload_id}/finalize")
+    assert response.status_code == 200
+    assert response.json["sha256"] == hashlib.sha256(DATA).hexdigest()
+    assert (folder / "new" / "sub" / "file.bin").read_bytes() == DATA
+    assert mount.file_index.lookup("new/sub/file.bin").size == len(DATA) # Indexed without waiting for a poll
+    assert os.listdir(folder / config.UPLOAD_STAGING_DIR_NAME) == [] # Record and lock file gone too
+    assert client.get(f"/upload/{upload_id}").status_code == 404
+
+
+def test_checksum_mismatch_keeps_the_upload(served):
+    folder, mount, client = served
+    upload_id = create(client, "bad.bin", size=3).json["id"]
+    put(client, upload_id, 0, b"abc")
+    response = client.post(f"/upload/{upload_id}/finalize", json={"sha256": "0" * 64})
+    assert response.status_code == 422
+    assert not (folder / "bad.bin").exists()
+    assert client.post(f"/upload/{upload_id}/finalize", json={"sha256": hashlib.sha256(b"abc").hexdigest()}).status_code == 200
+
+
+def test_chunk_past_declared_size(served):
+    folder, mount, client = served
+    upload_id = create(client, "small.bin", size=10).json["id"]
+    assert put(client, upload_id, 5, b"x" * 6).status_code == 413
+    assert put(client, upload_id, 11, b"").status_code == 416
+
+
+def test_refused_targets(served, tmp_path):
+    folder, mount, client = served
+    assert create(client, "existing.txt").status_code == 409
+    assert create(client, "../outside.bin").status_code == 400
+    assert create(client, f"{config.UPLOAD_STAGING_DIR_NAME}/x").status_code == 403
+    (folder / "link").symlink_to(tmp_path, target_is_directory=True)
+    assert create(client, "link/escape.bin").status_code == 403
+
+
+def test_target_created_meanwhile_is_not_replaced(served):
+    folder, mount, client = served
+    upload_id = create(client, "race.bin", size=3).json["id"]
+    put(client, upload_id, 0, b"new")
+    (folder / "race.bin").write_bytes(b"old")
+    assert client.post(f"/upload/{upload_id}/finalize").status_code == 409
+    assert (folder / "race.bin").read_bytes() == b"old"
+
+
+def test_folder_swapped_for_symlink_before_finalize(served, tmp_path):
+    folder, mount, client = served
+    upload_id = create(client, "docs/file.bin", size=3).json["id"]
+    put(client, upload_id, 0, b"abc")
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (folder / "docs").symlink_to(outside, target_is_directory=True)
+    assert client.post(f"/upload/{upload_id}/finalize").status_code == 403
+    assert os.listdir(outside) == []
+
+
+def test_session_and_staging_caps(served, monkeypatch):
+    folder, mount, client = served
+    monkeypatch.setattr(mount.uploads, "max_sessions", 2)
+    monkeypatch.setattr(mount.uploads, "max_staged_bytes", 1000)
+    first = create(client, "a.bin", size=600).json["id"]
+    assert create(client, "b.bin", size=600).status_code == 507
+    create(client, "c.bin", size=100)
+    assert create(client, "d.bin", size=1).status_code == 503
+    client.delete(f"/upload/{first}")
+    assert create(client, "d.bin", size=1).status_code == 201
+
+
+def test_disabled_uploads_are_not_found(served, monkeypatch):
+    folder, mount, client = served
+    from server import flask_server
+    monkeypatch.setattr(flask_server, "uploads_enabled", False)
+    assert create(client, "off.bin").status_code == 404
+
+
+def test_processes_sharing_a_session_keep_each_others_chunks(tmp_path):
+    root = tmp_path / "served"
+    root.mkdir()
+    first, second = (UploadManager(root, root / ".uploads", 1 << 30, 3600) for _ in range(2)) # As two server processes would
+    session = first.create("shared.bin", len(DATA))
+    other = second.get(session.id)
+    for index, offset in enumerate(range(0, len(DATA), CHUNK)):
+        manager, current = (first, session) if index % 2 == 0 else (second, other)
+        manager.write_chunk(current, offset, io.BytesIO(DATA[offset:offset + CHUNK]), None)
+    assert second.get(session.id).missing() == []
+    target, digest = second.finalize(other)
+    assert target.read_bytes() == DATA
+    with pytest.raises(UploadError) as error:
+        first.get(session.id)
+    assert error.value.status == 404 # Finished by the other process
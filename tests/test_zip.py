@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+
+import config
+from server.safe_open import SUPPORTED as OPENAT_SUPPORTED
+from server.zip_stream import iter_zip, zip_info
+
+FILES = {"b.txt": b"bee" * 1000, "a.jpg": os.urandom(5000), "sub/z.txt": b"zed", "sub/deeper/x.txt": b"", "sub/c.txt": b"see"}
+
+
+@pytest.fixture
+def served(tmp_path):
+    folder = tmp_path / "served"
+    for rel_path, data in FILES.items():
+        (folder / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (folder / rel_path).write_bytes(data)
+    from server import flask_server
+    flask_server.rate_limiter.configure({route: (0, 1) for route in config.RATE_LIMIT_ROUTES})
+    flask_server.mounts.apply({"": str(folder)})
+    mount = flask_server.mounts.get("")
+    assert mount.file_index.wait_ready(10)
+    return folder, mount, flask_server.app.test_client()
+
+
+def read_zip(data: bytes) -> zipfile.ZipFile:
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    return archive
+
+
+def test_folder_zip_order_and_contents(served):
+    folder, mount, client = served
+    response = client.get("/download-zip", query_string={"folder": "sub"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/zip"
+    assert 'filename="sub.zip"' in response.headers["Content-Disposition"]
+    archive = read_zip(response.data)
+    assert archive.namelist() == ["c.txt", "z.txt", "deeper/x.txt"] # A folder's files first, then its subfolders
+    assert archive.read("c.txt") == b"see"
+
+
+def test_whole_tree_compression_by_type(served):
+    folder, mount, client = served
+    archive = read_zip(client.get("/download-zip", query_string={"folder": ""}).data)
+    assert archive.namelist() == ["a.jpg", "b.txt", "sub/c.txt", "sub/z.txt", "sub/deeper/x.txt"]
+    assert archive.getinfo("a.jpg").compress_type == zipfile.ZIP_STORED # Already compressed formats are stored
+    assert archive.getinfo("b.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert {name: archive.read(name) for name in archive.namelist()} == FILES
+
+
+def test_selected_files(served):
+    folder, mount, client = served
+    response = client.post("/download-zip", data={"files": ["sub/z.txt", "b.txt", "sub/z.txt"]})
+    assert read_zip(response.data).namelist() == ["sub/z.txt", "b.txt"]
+    assert client.post("/download-zip", data={"files": ["../etc/passwd"]}).status_code == 404
+    assert client.get("/download-zip", query_string={"folder": "missing"}).status_code == 404
+    assert client.get("/download-zip").status_code == 400
+
+
+@pytest.mark.skipif(not OPENAT_SUPPORTED, reason="needs openat without following symlinks")
+def test_folder_swapped_for_symlink_is_skipped(served, tmp_path):
+    folder, mount, client = served
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "z.txt").write_bytes(b"secret")
+    members = [("b.txt", "b.txt"), ("sub/z.txt", "sub/z.txt")] # Listed before the swap
+    (folder / "sub").rename(tmp_path / "moved")
+    (folder / "sub").symlink_to(outside, target_is_directory=True)
+    mount.opener.invalidate([], ["sub"])
+    archive = read_zip(b"".join(iter_zip(members, mount.opener.open)))
+    assert archive.namelist() == ["b.txt"]
+
+
+def test_zip_info_from_stat(tmp_path):
+    path = tmp_path / "old.txt"
+    path.write_bytes(b"12345")
+    os.utime(path, (0, 0)) # Before 1980: clamped, not rejected
+    info = zip_info("old.txt", os.stat(path))
+    assert info.date_time == (1980, 1, 1, 0, 0, 0)
+    assert info.file_size == 5
+    assert info.external_attr >> 16 == os.stat(path).st_mode
+    os.utime(path, (time.time(), time.time()))
+    assert zip_info("old.txt", os.stat(path)).date_time[0] >= 2024